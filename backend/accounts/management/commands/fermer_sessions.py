@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.sessions_agents import (
+    DELAI_INACTIVITE_MINUTES, RETENTION_JOURS, archiver_sessions, fermer_sessions_inactives
+)
+
+
+class Command(BaseCommand):
+    help = "Ferme les sessions d'agents sans activité et archive les sessions anciennes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutes', type=int, default=DELAI_INACTIVITE_MINUTES,
+            help="Délai sans activité après lequel une session est fermée"
+        )
+        parser.add_argument(
+            '--retention-jours', type=int, default=RETENTION_JOURS,
+            help="Ancienneté à partir de laquelle les sessions fermées sont archivées"
+        )
+
+    def handle(self, *args, **options):
+        if options['minutes'] < 1 or options['retention_jours'] < 1:
+            raise CommandError("Le délai et la rétention doivent être positifs.")
+
+        fermees = fermer_sessions_inactives(options['minutes'])
+        archivees = archiver_sessions(options['retention_jours'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{fermees} session(s) inactive(s) fermée(s), {archivees} session(s) archivée(s)"
+        ))
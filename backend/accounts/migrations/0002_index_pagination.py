@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sessionagent',
+            index=models.Index(fields=['heure_connexion', 'id'], name='accounts_se_heure_c_c789c9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sessionagent',
+            index=models.Index(fields=['agent', 'heure_connexion'], name='accounts_se_agent_i_88255a_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_index_pagination'),
+        ('collectes', '0004_collecte_resultat_uuid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SegmentTrajet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('debut', models.DateTimeField()),
+                ('fin', models.DateTimeField()),
+                ('points', models.BinaryField()),
+                ('nombre_points_recus', models.PositiveIntegerField()),
+                ('nombre_points', models.PositiveIntegerField()),
+                ('distance_km', models.DecimalField(decimal_places=3, default=0, max_digits=8)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='accounts.sessionagent')),
+                ('tournee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='segments_trajet', to='collectes.tournee')),
+            ],
+            options={
+                'verbose_name': 'Segment de trajet',
+                'verbose_name_plural': 'Segments de trajet',
+                'ordering': ['session', 'debut', 'id'],
+                'indexes': [models.Index(fields=['session', 'debut'], name='accounts_se_session_adeaf4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_segment_trajet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoriqueSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('heure_connexion', models.DateTimeField()),
+                ('heure_deconnexion', models.DateTimeField(blank=True, null=True)),
+                ('duree_session', models.DurationField(blank=True, null=True)),
+                ('latitude_connexion', models.DecimalField(decimal_places=8, max_digits=10)),
+                ('longitude_connexion', models.DecimalField(decimal_places=8, max_digits=11)),
+                ('distance_km', models.DecimalField(decimal_places=3, default=0, max_digits=8)),
+                ('nombre_points', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Historique de session',
+                'verbose_name_plural': 'Historique des sessions',
+                'ordering': ['-heure_connexion'],
+            },
+        ),
+        migrations.AddField(
+            model_name='sessionagent',
+            name='derniere_activite',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sessionagent',
+            name='duree_session',
+            field=models.DurationField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='sessionagent',
+            index=models.Index(fields=['is_active', 'derniere_activite'], name='accounts_se_is_acti_5439fe_idx'),
+        ),
+        migrations.AddField(
+            model_name='historiquesession',
+            name='agent',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historique_sessions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='historiquesession',
+            index=models.Index(fields=['agent', 'heure_connexion'], name='accounts_hi_agent_i_804d5e_idx'),
+        ),
+    ]
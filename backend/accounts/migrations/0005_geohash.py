@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:15
+
+from django.db import migrations, models
+
+from ete_project.geohash import remplir_geohash
+
+
+def remplir_geohashs(apps, schema_editor):
+    remplir_geohash(apps.get_model('accounts', 'UserProfile'), 'latitude', 'longitude')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_fermeture_archivage_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['geohash', 'id'], name='accounts_us_geohash_a6927d_idx'),
+        ),
+        migrations.RunPython(remplir_geohashs, migrations.RunPython.noop),
+    ]
@@ -45,6 +45,8 @@ class UserProfile(models.Model):
     # Coordonnées GPS
     latitude = models.DecimalField(max_digits=10, decimal_places=8, blank=True, null=True)
     longitude = models.DecimalField(max_digits=11, decimal_places=8, blank=True, null=True)
+    # Geohash de la position (requêtes par boîte englobante)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
     
     # Préférences
     receive_notifications = models.BooleanField(default=True)
@@ -53,6 +55,11 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['geohash', 'id']),
+        ]
+    
     def __str__(self):
         return f"Profil de {self.user.full_name}"
 
@@ -118,6 +125,9 @@ class SessionAgent(models.Model):
     # Timestamps
     heure_connexion = models.DateTimeField(auto_now_add=True)
     heure_deconnexion = models.DateTimeField(null=True, blank=True)
+    # Dernier signe de vie de l'application (positions, heartbeat)
+    derniere_activite = models.DateTimeField(null=True, blank=True)
+    duree_session = models.DurationField(null=True, blank=True)
     
     # Statut de la session
     is_active = models.BooleanField(default=True)
@@ -129,6 +139,73 @@ class SessionAgent(models.Model):
         verbose_name = 'Session Agent'
         verbose_name_plural = 'Sessions Agents'
         ordering = ['-heure_connexion']
+        indexes = [
+            models.Index(fields=['heure_connexion', 'id']),
+            models.Index(fields=['agent', 'heure_connexion']),
+            models.Index(fields=['is_active', 'derniere_activite']),
+        ]
     
     def __str__(self):
         return f"Session {self.agent.full_name} - {self.heure_connexion}"
+
+
+class SegmentTrajet(models.Model):
+    """Positions GPS d'une session, reçues en un lot et stockées sous forme compacte"""
+    
+    session = models.ForeignKey(SessionAgent, on_delete=models.CASCADE, related_name='segments')
+    tournee = models.ForeignKey(
+        'collectes.Tournee',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='segments_trajet'
+    )
+    
+    debut = models.DateTimeField()
+    fin = models.DateTimeField()
+    
+    # Points simplifiés (Douglas-Peucker), tableau int32 little-endian de triplets
+    # (secondes depuis `debut`, latitude et longitude en micro-degrés)
+    points = models.BinaryField()
+    nombre_points_recus = models.PositiveIntegerField()
+    nombre_points = models.PositiveIntegerField()
+    
+    # Distance des positions brutes, raccord depuis le segment précédent compris
+    distance_km = models.DecimalField(max_digits=8, decimal_places=3, default=0)
+    
+    class Meta:
+        verbose_name = 'Segment de trajet'
+        verbose_name_plural = 'Segments de trajet'
+        ordering = ['session', 'debut', 'id']
+        indexes = [
+            models.Index(fields=['session', 'debut']),
+        ]
+    
+    def __str__(self):
+        return f"Trajet session {self.session_id} - {self.debut}"
+
+
+class HistoriqueSession(models.Model):
+    """Sessions archivées après la durée de rétention (sans infos appareil ni trace GPS)"""
+    
+    agent = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='historique_sessions')
+    heure_connexion = models.DateTimeField()
+    heure_deconnexion = models.DateTimeField(null=True, blank=True)
+    duree_session = models.DurationField(null=True, blank=True)
+    latitude_connexion = models.DecimalField(max_digits=10, decimal_places=8)
+    longitude_connexion = models.DecimalField(max_digits=11, decimal_places=8)
+    
+    # Résumé du trajet GPS de la session
+    distance_km = models.DecimalField(max_digits=8, decimal_places=3, default=0)
+    nombre_points = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Historique de session'
+        verbose_name_plural = 'Historique des sessions'
+        ordering = ['-heure_connexion']
+        indexes = [
+            models.Index(fields=['agent', 'heure_connexion']),
+        ]
+    
+    def __str__(self):
+        return f"Session archivée {self.agent_id} - {self.heure_connexion}"
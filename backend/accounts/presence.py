@@ -0,0 +1,161 @@
+"""
+Registre de présence des agents en session
+
+Dernière position et statut de chaque agent en session, tenus dans le cache
+(une clé par agent) : la carte de supervision peut être rafraîchie toutes les
+quelques secondes sans requête en base.
+
+Chaque clé n'est écrite que pour son agent. La liste des agents à lire n'est
+jamais modifiée en place (deux écritures simultanées perdraient un agent) :
+elle est relue depuis la base, en une requête, après chaque ouverture de
+session (version incrémentée) ou si elle a été perdue. Cette relecture
+complète les clés manquantes depuis les sessions actives sans écraser les
+positions déjà publiées.
+
+Les réponses différentielles (`depuis`) ne renvoient que les agents modifiés
+depuis un horodatage, et les agents passés hors ligne dans `retires`.
+"""
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SessionAgent
+
+PRESENCE_TIMEOUT = 60 * 60 * 12
+INDEX_CACHE_KEY = 'accounts:presence:index'
+VERSION_CACHE_KEY = 'accounts:presence:version'
+# Marge sur l'horodatage renvoyé : une mise à jour écrite pendant la lecture est renvoyée au tour suivant
+MARGE_SECONDES = 1
+
+
+def _cle_agent(agent_id):
+    return f'accounts:presence:{agent_id}'
+
+
+def _entree(session, latitude, longitude, horodatage_position):
+    return {
+        'agent': session.agent_id,
+        'agent_name': session.agent.full_name,
+        'agent_type': session.agent.user_type,
+        'session': session.id,
+        'statut': 'en_ligne',
+        'latitude': float(latitude),
+        'longitude': float(longitude),
+        'horodatage_position': horodatage_position,
+        # Heure serveur de la mise à jour (les horloges des appareils ne servent pas aux deltas)
+        'maj': time.time(),
+    }
+
+
+def _version():
+    cache.add(VERSION_CACHE_KEY, time.time_ns(), None)
+    return cache.get(VERSION_CACHE_KEY)
+
+
+def invalider_index():
+    """Liste des agents relue à la prochaine lecture (après l'ouverture d'une session)"""
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, time.time_ns(), None)
+
+
+def _index():
+    # Version lue avant la requête : une session ouverte pendant la relecture la périme
+    version = _version()
+    index = cache.get(INDEX_CACHE_KEY)
+    if index is None or index['version'] != version:
+        index = {'version': version, 'agents': reconstruire_presence()}
+        cache.set(INDEX_CACHE_KEY, index, PRESENCE_TIMEOUT)
+    return index['agents']
+
+
+def reconstruire_presence():
+    """
+    Agents en session ou déconnectés depuis moins de PRESENCE_TIMEOUT. Les
+    agents actifs absents du cache y sont ajoutés à leur position de connexion.
+    """
+    limite = timezone.now() - timedelta(seconds=PRESENCE_TIMEOUT)
+    sessions = SessionAgent.objects.filter(
+        Q(is_active=True) | Q(heure_deconnexion__gte=limite)
+    ).select_related('agent').order_by('-heure_connexion')
+
+    agents = set()
+    for session in sessions:
+        agents.add(session.agent_id)
+        if session.is_active:
+            # add() n'écrase pas une position publiée entre-temps (session la plus récente d'abord)
+            cache.add(_cle_agent(session.agent_id), _entree(
+                session, session.latitude_connexion, session.longitude_connexion,
+                session.heure_connexion.timestamp()
+            ), PRESENCE_TIMEOUT)
+    return agents
+
+
+def publier_presence(session, latitude=None, longitude=None, horodatage_position=None):
+    """Agent en ligne à sa dernière position connue (position de connexion par défaut)"""
+    precedente = cache.get(_cle_agent(session.agent_id))
+    if precedente is not None and precedente['session'] == session.id and precedente['statut'] == 'en_ligne':
+        # Nom et type déjà connus : pas de requête pour un simple déplacement
+        entree = dict(precedente, maj=time.time())
+        if latitude is not None:
+            entree.update(
+                latitude=float(latitude), longitude=float(longitude), horodatage_position=horodatage_position
+            )
+    elif latitude is not None:
+        entree = _entree(session, latitude, longitude, horodatage_position)
+    else:
+        entree = _entree(
+            session, session.latitude_connexion, session.longitude_connexion,
+            session.heure_connexion.timestamp()
+        )
+    cache.set(_cle_agent(session.agent_id), entree, PRESENCE_TIMEOUT)
+
+
+def retirer_presence(agent_id, session_id):
+    """Agent hors ligne : conservé (sans position) pour les réponses différentielles"""
+    precedente = cache.get(_cle_agent(agent_id))
+    if precedente is not None and precedente['session'] != session_id:
+        # Une session plus récente de l'agent est déjà publiée
+        return
+    cache.set(_cle_agent(agent_id), {
+        'agent': agent_id,
+        'session': session_id,
+        'statut': 'hors_ligne',
+        'maj': time.time(),
+    }, PRESENCE_TIMEOUT)
+
+
+def dans_bbox(entree, bbox):
+    min_lng, min_lat, max_lng, max_lat = bbox
+    return min_lat <= entree['latitude'] <= max_lat and min_lng <= entree['longitude'] <= max_lng
+
+
+def agents_presents(bbox=None, depuis=None):
+    """
+    Agents en ligne (dans `bbox` si donnée) et, avec `depuis`, seulement ceux
+    modifiés depuis cet horodatage ainsi que les agents retirés entre-temps.
+    """
+    horodatage = time.time() - MARGE_SECONDES
+    index = _index()
+    entrees = cache.get_many([_cle_agent(agent_id) for agent_id in index])
+
+    agents, retires = [], []
+    for entree in entrees.values():
+        if depuis is not None and entree['maj'] < depuis:
+            continue
+        if entree['statut'] == 'hors_ligne' or (bbox is not None and not dans_bbox(entree, bbox)):
+            # Sortie de la zone affichée : retirée de la carte comme un agent déconnecté
+            if depuis is not None:
+                retires.append(entree['agent'])
+            continue
+        agents.append(entree)
+
+    return {
+        'horodatage': horodatage,
+        'agents': sorted(agents, key=lambda entree: entree['agent']),
+        'retires': sorted(retires),
+    }
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from ete_project.mixins import ChampsDynamiquesMixin, relations_utiles
 from .models import UserProfile, QRCodeClient, SessionAgent
 
 User = get_user_model()
@@ -23,7 +24,7 @@ class QRCodeClientSerializer(serializers.ModelSerializer):
         fields = ['code_qr', 'qr_image', 'is_active', 'created_at']
         read_only_fields = ['code_qr', 'qr_image', 'created_at']
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour les utilisateurs personnalisés"""
     
     profile = UserProfileSerializer(read_only=True)
@@ -44,6 +45,14 @@ class CustomUserSerializer(serializers.ModelSerializer):
             'date_joined': {'read_only': True},
             'updated_at': {'read_only': True},
         }
+        champs_expansibles = ['profile', 'qr_code']
+        colonnes_proprietes = {'full_name': ['first_name', 'last_name']}
+    
+    @classmethod
+    def optimiser_queryset(cls, queryset, champs=None):
+        """Profil et QR code joints seulement s'ils sont représentés"""
+        jointures = relations_utiles(champs, {'profile': ['profile'], 'qr_code': ['qr_code']})
+        return queryset.select_related(*jointures) if jointures else queryset
     
     def create(self, validated_data):
         """Créer un nouvel utilisateur avec mot de passe hashé"""
@@ -64,7 +73,13 @@ class CustomUserSerializer(serializers.ModelSerializer):
         
         return user
 
-class SessionAgentSerializer(serializers.ModelSerializer):
+class CustomUserListeSerializer(CustomUserSerializer):
+    """Représentation compacte des utilisateurs pour les listes"""
+    
+    class Meta(CustomUserSerializer.Meta):
+        fields = ['id', 'username', 'email', 'full_name', 'user_type', 'is_active']
+
+class SessionAgentSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour les sessions d'agents"""
     
     agent_name = serializers.CharField(source='agent.full_name', read_only=True)
@@ -75,10 +90,10 @@ class SessionAgentSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'agent', 'agent_name', 'agent_type',
             'latitude_connexion', 'longitude_connexion',
-            'heure_connexion', 'heure_deconnexion', 
-            'is_active', 'device_info'
+            'heure_connexion', 'heure_deconnexion', 'derniere_activite',
+            'duree_session', 'is_active', 'device_info'
         ]
-        read_only_fields = ['heure_connexion']
+        read_only_fields = ['heure_connexion', 'derniere_activite', 'duree_session']
     
     def validate(self, data):
         """Validation des données de session"""
@@ -89,6 +104,21 @@ class SessionAgentSerializer(serializers.ModelSerializer):
                 "Seuls les agents de terrain peuvent créer des sessions."
             )
         return data
+    
+    @classmethod
+    def optimiser_queryset(cls, queryset, champs=None):
+        """Agent joint pour son nom et son type"""
+        jointures = relations_utiles(champs, {'agent': ['agent_name', 'agent_type']})
+        return queryset.select_related(*jointures) if jointures else queryset
+
+class SessionAgentListeSerializer(SessionAgentSerializer):
+    """Représentation compacte des sessions pour les listes"""
+    
+    class Meta(SessionAgentSerializer.Meta):
+        fields = [
+            'id', 'agent', 'agent_name', 'heure_connexion',
+            'heure_deconnexion', 'is_active'
+        ]
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """Serializer pour l'inscription des nouveaux utilisateurs"""
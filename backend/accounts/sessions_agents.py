@@ -0,0 +1,103 @@
+"""
+Fermeture et archivage des sessions d'agents
+
+Une application qui ne donne plus signe de vie (téléphone éteint, perte de
+réseau) laisse sa session active. Les sessions sans activité depuis un délai
+sont fermées en une requête UPDATE, à l'heure de leur dernière activité et
+avec leur durée.
+
+Passé la durée de rétention, les sessions fermées sont déplacées par lots
+vers HistoriqueSession (sans infos appareil ni trace GPS, seulement la
+distance et le nombre de points) pour que la table des sessions reste petite.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, DurationField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import SessionAgent, HistoriqueSession
+from .presence import retirer_presence
+
+DELAI_INACTIVITE_MINUTES = 30
+RETENTION_JOURS = 90
+TAILLE_LOT = 1000
+
+
+def fermer_sessions(sessions, heure_deconnexion):
+    """
+    Ferme les sessions actives de `sessions` en une requête UPDATE, à
+    `heure_deconnexion` (valeur ou expression), et les retire de la carte.
+    Retourne le nombre de sessions fermées.
+    """
+    a_fermer = list(sessions.filter(is_active=True).values_list('id', flat=True))
+    if not a_fermer:
+        return 0
+
+    if not hasattr(heure_deconnexion, 'resolve_expression'):
+        heure_deconnexion = Value(heure_deconnexion)
+    # Conditions de `sessions` reprises dans l'UPDATE : une session redevenue
+    # active (signe de vie) depuis la lecture n'est pas fermée
+    nombre = sessions.filter(id__in=a_fermer, is_active=True).update(
+        is_active=False,
+        heure_deconnexion=heure_deconnexion,
+        duree_session=ExpressionWrapper(heure_deconnexion - F('heure_connexion'), output_field=DurationField())
+    )
+
+    # update() ne déclenche pas les signaux
+    fermees = SessionAgent.objects.filter(id__in=a_fermer, is_active=False).values_list('id', 'agent_id')
+    for session_id, agent_id in fermees:
+        retirer_presence(agent_id, session_id)
+    return nombre
+
+
+def fermer_sessions_inactives(minutes=DELAI_INACTIVITE_MINUTES):
+    """Ferme les sessions sans activité depuis `minutes`, à l'heure de leur dernière activité"""
+    derniere_activite = Coalesce('derniere_activite', 'heure_connexion')
+    limite = timezone.now() - timedelta(minutes=minutes)
+    sessions = SessionAgent.objects.annotate(activite=derniere_activite).filter(activite__lt=limite)
+    return fermer_sessions(sessions, derniere_activite)
+
+
+def archiver_sessions(jours=RETENTION_JOURS, taille_lot=TAILLE_LOT):
+    """Déplace les sessions fermées depuis plus de `jours` vers l'historique, par lots"""
+    limite = timezone.now() - timedelta(days=jours)
+    anciennes = SessionAgent.objects.filter(is_active=False, heure_connexion__lt=limite)
+
+    archivees = 0
+    dernier_id = 0
+    while True:
+        lot = list(
+            anciennes.filter(id__gt=dernier_id).order_by('id').annotate(
+                distance=Coalesce(
+                    Sum('segments__distance_km'), Value(Decimal('0')),
+                    output_field=DecimalField(max_digits=8, decimal_places=3)
+                ),
+                points=Coalesce(Sum('segments__nombre_points'), Value(0)),
+            ).values(
+                'id', 'agent_id', 'heure_connexion', 'heure_deconnexion', 'duree_session',
+                'latitude_connexion', 'longitude_connexion', 'distance', 'points'
+            )[:taille_lot]
+        )
+        if not lot:
+            return archivees
+        dernier_id = lot[-1]['id']
+
+        with transaction.atomic():
+            HistoriqueSession.objects.bulk_create([
+                HistoriqueSession(
+                    agent_id=session['agent_id'],
+                    heure_connexion=session['heure_connexion'],
+                    heure_deconnexion=session['heure_deconnexion'],
+                    duree_session=session['duree_session'],
+                    latitude_connexion=session['latitude_connexion'],
+                    longitude_connexion=session['longitude_connexion'],
+                    distance_km=session['distance'],
+                    nombre_points=session['points'],
+                )
+                for session in lot
+            ], batch_size=taille_lot)
+            SessionAgent.objects.filter(id__in=[session['id'] for session in lot]).delete()
+        archivees += len(lot)
@@ -1,6 +1,9 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import CustomUser, UserProfile, QRCodeClient
+from ete_project.geohash import geohash_de
+from .models import CustomUser, UserProfile, QRCodeClient, SessionAgent
+from .presence import invalider_index, publier_presence, retirer_presence
 
 @receiver(post_save, sender=CustomUser)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -20,4 +23,27 @@ def create_user_profile(sender, instance, created, **kwargs):
 def save_user_profile(sender, instance, **kwargs):
     """Sauvegarde le profil utilisateur quand l'utilisateur est mis à jour"""
     if hasattr(instance, 'profile'):
-        instance.profile.save()
\ No newline at end of file
+        instance.profile.save()
+
+@receiver(post_save, sender=SessionAgent)
+def mettre_a_jour_presence(sender, instance, created, **kwargs):
+    """Registre de présence à jour au démarrage et à la fin d'une session"""
+    if created:
+        # Après validation : la relecture de la liste des agents doit voir la session
+        transaction.on_commit(invalider_index)
+    if instance.is_active:
+        publier_presence(instance)
+    else:
+        retirer_presence(instance.agent_id, instance.id)
+
+@receiver(post_delete, sender=SessionAgent)
+def retirer_presence_session(sender, instance, **kwargs):
+    """Une session active supprimée disparaît de la carte"""
+    # Une session fermée a déjà été retirée à sa fermeture (archivage des anciennes sessions)
+    if instance.is_active:
+        retirer_presence(instance.agent_id, instance.id)
+
+@receiver(pre_save, sender=UserProfile)
+def calculer_geohash(sender, instance, **kwargs):
+    """Geohash à jour avec la position du profil"""
+    instance.geohash = geohash_de(instance.latitude, instance.longitude)
@@ -1,3 +1,180 @@
-from django.test import TestCase
+import tempfile
+import time
+from datetime import timedelta
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ete_project.geo import longueur_trace_km
+from .models import HistoriqueSession, SessionAgent, SegmentTrajet
+from .presence import agents_presents
+from .sessions_agents import archiver_sessions, fermer_sessions_inactives
+from .trajets import decoder_points, ingerer_positions
+
+User = get_user_model()
+
+DEBUT = 1748851200  # 2025-06-02 08:00 UTC
+
+
+def lot(debut, lats, lng=10.18):
+    """Positions espacées d'une minute le long d'un méridien"""
+    return [[debut + 60 * n, lat, lng] for n, lat in enumerate(lats)]
+
+
+class TrajetsTest(TestCase):
+    """Lots de positions : rejeu ignoré, lot en retard raccordé sans double comptage"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        reglages = override_settings(MEDIA_ROOT=media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.agent = User.objects.create_user(
+            username='agent', email='agent@ete.test', user_type='agent_ramassage'
+        )
+        self.session = SessionAgent.objects.create(
+            agent=self.agent, latitude_connexion=36.8, longitude_connexion=10.18
+        )
+
+    def _distance_totale(self):
+        return sum(float(segment.distance_km) for segment in SegmentTrajet.objects.filter(session=self.session))
+
+    def test_lot_rejoue(self):
+        positions = lot(DEBUT, [36.80, 36.81, 36.82])
+        self.assertIsNotNone(ingerer_positions(self.session, positions))
+        self.assertIsNone(ingerer_positions(self.session, positions))
+        self.assertEqual(SegmentTrajet.objects.filter(session=self.session).count(), 1)
+
+    def test_lot_en_retard_entre_deux_segments(self):
+        premier = lot(DEBUT, [36.80, 36.81])
+        retard = lot(DEBUT + 600, [36.82, 36.83])
+        dernier = lot(DEBUT + 1200, [36.84, 36.85])
+        ingerer_positions(self.session, premier)
+        ingerer_positions(self.session, dernier)
+        ingerer_positions(self.session, retard)
+
+        # Même distance que si les lots étaient arrivés dans l'ordre
+        lats = np.array([36.80, 36.81, 36.82, 36.83, 36.84, 36.85])
+        attendue = longueur_trace_km(lats, np.full(len(lats), 10.18))
+        self.assertAlmostEqual(self._distance_totale(), attendue, places=2)
+
+        horodatages = np.concatenate([
+            decoder_points(segment)[0] for segment in SegmentTrajet.objects.filter(session=self.session)
+        ])
+        self.assertEqual(list(horodatages), sorted(horodatages))
+
+    def test_lot_en_retard_avant_le_premier_segment(self):
+        ingerer_positions(self.session, lot(DEBUT + 600, [36.82, 36.83]))
+        ingerer_positions(self.session, lot(DEBUT, [36.80, 36.81]))
+        lats = np.array([36.80, 36.81, 36.82, 36.83])
+        attendue = longueur_trace_km(lats, np.full(len(lats), 10.18))
+        self.assertAlmostEqual(self._distance_totale(), attendue, places=2)
+
+    def test_trajet_reserve_a_l_agent_et_aux_superviseurs(self):
+        ingerer_positions(self.session, lot(DEBUT, [36.80, 36.81]))
+        url = f'/api/accounts/sessions/{self.session.id}/trajet/'
+        api = APIClient(HTTP_HOST='localhost')
+
+        api.force_authenticate(self.agent)
+        self.assertEqual(len(api.get(url).data['points']), 2)
+
+        api.force_authenticate(User.objects.create_user(
+            username='autre', email='autre@ete.test', user_type='agent_ramassage'
+        ))
+        self.assertEqual(api.get(url).status_code, 404)
+
+        api.force_authenticate(User.objects.create_user(
+            username='superviseur', email='superviseur@ete.test', user_type='agent_supervision'
+        ))
+        self.assertEqual(api.get(url).status_code, 200)
+
+
+class PresenceTest(TestCase):
+    """Registre de présence : agents ouverts après une lecture, positions, deltas"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def _ouvrir(self, nom):
+        agent = User.objects.create_user(username=nom, email=f'{nom}@ete.test', user_type='agent_ramassage')
+        with self.captureOnCommitCallbacks(execute=True):
+            return SessionAgent.objects.create(agent=agent, latitude_connexion=36.8, longitude_connexion=10.18)
+
+    def test_session_ouverte_apres_une_lecture(self):
+        premiere = self._ouvrir('agent-1')
+        self.assertEqual([entree['session'] for entree in agents_presents()['agents']], [premiere.id])
+        seconde = self._ouvrir('agent-2')
+        self.assertEqual(
+            [entree['session'] for entree in agents_presents()['agents']], [premiere.id, seconde.id]
+        )
+
+    def test_delta_et_bbox(self):
+        immobile = self._ouvrir('agent-1')
+        mobile = self._ouvrir('agent-2')
+        agents_presents()
+        time.sleep(0.01)
+        depuis = time.time()
+        ingerer_positions(mobile, lot(int(depuis), [36.89, 36.9]))
+
+        # Seul l'agent déplacé depuis `depuis` est renvoyé
+        resultat = agents_presents(depuis=depuis)
+        self.assertEqual([entree['agent'] for entree in resultat['agents']], [mobile.agent_id])
+        self.assertEqual(resultat['agents'][0]['latitude'], 36.9)
+
+        # Hors de la zone affichée : retiré de la carte
+        bbox = (10.0, 36.7, 10.3, 36.85)
+        resultat = agents_presents(bbox, depuis=0)
+        self.assertEqual([entree['agent'] for entree in resultat['agents']], [immobile.agent_id])
+        self.assertEqual(resultat['retires'], [mobile.agent_id])
+
+
+class SessionsInactivesTest(TestCase):
+    """Fermeture des sessions sans signe de vie et archivage des anciennes"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.agent = User.objects.create_user(
+            username='agent', email='agent@ete.test', user_type='agent_ramassage'
+        )
+
+    def _session(self, derniere_activite, heure_connexion=None):
+        session = SessionAgent.objects.create(agent=self.agent, latitude_connexion=36.8, longitude_connexion=10.18)
+        SessionAgent.objects.filter(id=session.id).update(
+            derniere_activite=derniere_activite,
+            heure_connexion=heure_connexion or derniere_activite - timedelta(hours=1)
+        )
+        return session
+
+    def test_fermeture_a_la_derniere_activite(self):
+        maintenant = timezone.now()
+        endormie = self._session(maintenant - timedelta(hours=2))
+        vivante = self._session(maintenant - timedelta(minutes=5))
+        self.assertEqual(fermer_sessions_inactives(), 1)
+
+        endormie.refresh_from_db()
+        self.assertFalse(endormie.is_active)
+        self.assertEqual(endormie.heure_deconnexion, maintenant - timedelta(hours=2))
+        self.assertEqual(endormie.duree_session, timedelta(hours=1))
+        self.assertTrue(SessionAgent.objects.get(id=vivante.id).is_active)
+
+    def test_archivage(self):
+        ancienne = self._session(timezone.now() - timedelta(days=120))
+        ingerer_positions(ancienne, lot(DEBUT, [36.80, 36.81]))
+        recente = self._session(timezone.now() - timedelta(days=2))
+        SessionAgent.objects.update(is_active=False)
+
+        self.assertEqual(archiver_sessions(taille_lot=1), 1)
+        self.assertEqual(list(SessionAgent.objects.values_list('id', flat=True)), [recente.id])
+        historique = HistoriqueSession.objects.get()
+        self.assertEqual(historique.nombre_points, 2)
+        self.assertGreater(historique.distance_km, 1)
@@ -0,0 +1,195 @@
+"""
+Suivi GPS continu des sessions d'agents
+
+Les applications envoient leurs positions par lots ([horodatage, latitude,
+longitude], horodatage en secondes Unix). Un lot devient une seule ligne
+SegmentTrajet : les points sont simplifiés par Douglas-Peucker puis rangés
+dans un tableau int32 (12 octets par point) plutôt qu'en une ligne par
+position.
+
+La distance est calculée sur les positions brutes avant simplification.
+Chaque segment porte aussi la liaison depuis le segment qui le précède ; un
+lot arrivé en retard entre deux segments reprend donc la liaison du segment
+suivant. La distance parcourue de la tournée est recalculée en une requête
+UPDATE à partir de ses segments.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.db import transaction
+from django.db.models import DecimalField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from collectes.journee import tournees_de_l_agent
+from collectes.models import Tournee
+from ete_project.geo import douglas_peucker, haversine_km, longueur_trace_km
+from .models import SessionAgent, SegmentTrajet
+from .presence import publier_presence
+
+TAILLE_LOT_MAX = 2000
+TOLERANCE_STOCKAGE_M = 5
+MICRODEGRES = 1_000_000
+FORMAT_POINTS = '<i4'
+
+
+def valider_positions(positions):
+    """
+    Tableau (n, 3) des positions triées par horodatage, sans doublons.
+    Lève ValueError si le lot est mal formé.
+    """
+    try:
+        tableau = np.asarray(positions, dtype=float)
+    except (TypeError, ValueError):
+        raise ValueError('positions doit être une liste de [horodatage, latitude, longitude]')
+    if tableau.ndim != 2 or tableau.shape[1] != 3 or not 1 <= len(tableau) <= TAILLE_LOT_MAX:
+        raise ValueError(
+            f'positions doit être une liste de 1 à {TAILLE_LOT_MAX} [horodatage, latitude, longitude]'
+        )
+    if not np.isfinite(tableau).all():
+        raise ValueError('Positions non numériques')
+    if (np.abs(tableau[:, 1]) > 90).any() or (np.abs(tableau[:, 2]) > 180).any():
+        raise ValueError('Coordonnées hors limites')
+
+    _, uniques = np.unique(tableau[:, 0], return_index=True)
+    return tableau[uniques]
+
+
+def encoder_points(secondes, lats, lngs):
+    colonnes = [
+        np.rint(secondes),
+        np.rint(np.asarray(lats) * MICRODEGRES),
+        np.rint(np.asarray(lngs) * MICRODEGRES),
+    ]
+    return np.column_stack(colonnes).astype(FORMAT_POINTS).tobytes()
+
+
+def decoder_points(segment):
+    """Horodatages (secondes Unix), latitudes et longitudes d'un segment"""
+    tableau = np.frombuffer(bytes(segment.points), dtype=FORMAT_POINTS).reshape(-1, 3)
+    return (
+        tableau[:, 0] + segment.debut.timestamp(),
+        tableau[:, 1] / MICRODEGRES,
+        tableau[:, 2] / MICRODEGRES,
+    )
+
+
+def tournee_de_la_session(session, jour, tournee_id=None):
+    """Tournée indiquée par l'application (parmi celles de l'agent), sinon sa tournée en cours du jour"""
+    if tournee_id is not None:
+        tournees = Tournee.objects.filter(id=tournee_id).filter(
+            Q(equipe_assignee__membres__user=session.agent_id)
+            | Q(equipe_assignee__chef_equipe__user=session.agent_id)
+        )
+    else:
+        tournees = tournees_de_l_agent(session.agent_id, jour).filter(status='en_cours')
+    return tournees.only('id').first()
+
+
+def mettre_a_jour_distance(tournee_id):
+    """Distance parcourue de la tournée : somme de ses segments (une requête UPDATE)"""
+    distances = SegmentTrajet.objects.filter(
+        tournee=OuterRef('pk')
+    ).order_by().values('tournee').annotate(total=Sum('distance_km')).values('total')
+    Tournee.objects.filter(id=tournee_id).update(
+        distance_parcourue=Coalesce(
+            Subquery(distances), 0, output_field=DecimalField(max_digits=8, decimal_places=2)
+        ),
+        updated_at=timezone.now()
+    )
+
+
+def _liaison_km(segment_avant, lat_apres, lng_apres):
+    """Distance entre le dernier point d'un segment et la position suivante"""
+    _, lats, lngs = decoder_points(segment_avant)
+    return float(haversine_km(lats[-1], lngs[-1], lat_apres, lng_apres))
+
+
+def ingerer_positions(session, positions, tournee_id=None):
+    """
+    Enregistre un lot de positions de la session en un seul segment.
+    Les positions déjà reçues (lot renvoyé après une réponse perdue) sont ignorées ;
+    une position arrivée en retard, antérieure au dernier segment, est conservée.
+    Retourne le segment créé, ou None si le lot n'apportait rien de nouveau.
+    """
+    tableau = valider_positions(positions)
+
+    # Déjà reçue : horodatage compris dans l'intervalle d'un lot stocké (les points
+    # écartés par la simplification ne sont plus en base, l'intervalle les couvre)
+    debut_lot = datetime.fromtimestamp(int(tableau[0, 0]), tz=dt_timezone.utc)
+    fin_lot = datetime.fromtimestamp(float(tableau[-1, 0]), tz=dt_timezone.utc)
+    deja_recues = np.zeros(len(tableau), dtype=bool)
+    intervalles = SegmentTrajet.objects.filter(
+        session=session, debut__lte=fin_lot, fin__gte=debut_lot
+    ).values_list('debut', 'fin')
+    for debut, fin in intervalles:
+        deja_recues |= (tableau[:, 0] >= debut.timestamp()) & (tableau[:, 0] <= fin.timestamp())
+    tableau = tableau[~deja_recues]
+    if not len(tableau):
+        return None
+
+    # Segments qui encadrent le lot, pour raccorder la distance
+    precedent = SegmentTrajet.objects.filter(
+        session=session,
+        fin__lt=datetime.fromtimestamp(float(tableau[0, 0]), tz=dt_timezone.utc)
+    ).order_by('-fin', '-id').first()
+    suivant = SegmentTrajet.objects.filter(
+        session=session,
+        debut__gt=datetime.fromtimestamp(float(tableau[-1, 0]), tz=dt_timezone.utc)
+    ).order_by('debut', 'id').first()
+
+    horodatages, lats, lngs = tableau[:, 0], tableau[:, 1], tableau[:, 2]
+    distance = longueur_trace_km(lats, lngs)
+    if precedent is not None:
+        distance += _liaison_km(precedent, lats[0], lngs[0])
+
+    garder = douglas_peucker(lats, lngs, TOLERANCE_STOCKAGE_M)
+    debut = datetime.fromtimestamp(int(horodatages[0]), tz=dt_timezone.utc)
+    tournee = tournee_de_la_session(session, timezone.localdate(debut), tournee_id)
+
+    with transaction.atomic():
+        segment = SegmentTrajet.objects.create(
+            session=session,
+            tournee=tournee,
+            debut=debut,
+            fin=datetime.fromtimestamp(float(horodatages[-1]), tz=dt_timezone.utc),
+            points=encoder_points(horodatages[garder] - int(horodatages[0]), lats[garder], lngs[garder]),
+            nombre_points_recus=len(tableau),
+            nombre_points=int(garder.sum()),
+            distance_km=round(distance, 3),
+        )
+        tournee_ids = {tournee.id} if tournee is not None else set()
+        if suivant is not None:
+            # Lot inséré avant un segment existant : la liaison du suivant part
+            # désormais du lot, et non plus du segment précédent
+            _, lats_suivants, lngs_suivants = decoder_points(suivant)
+            liaison = float(haversine_km(lats[-1], lngs[-1], lats_suivants[0], lngs_suivants[0]))
+            if precedent is not None:
+                liaison -= _liaison_km(precedent, lats_suivants[0], lngs_suivants[0])
+            suivant.distance_km = max(round(float(suivant.distance_km) + liaison, 3), 0)
+            suivant.save(update_fields=['distance_km'])
+            if suivant.tournee_id is not None:
+                tournee_ids.add(suivant.tournee_id)
+        for id_tournee in tournee_ids:
+            mettre_a_jour_distance(id_tournee)
+    SessionAgent.objects.filter(id=session.id).update(derniere_activite=timezone.now())
+    publier_presence(session, lats[-1], lngs[-1], int(horodatages[-1]))
+    return segment
+
+
+def points_du_trajet(segments, tolerance_m=None):
+    """
+    Trace continue des segments ([horodatage, latitude, longitude]), simplifiée
+    une nouvelle fois pour l'affichage si `tolerance_m` dépasse celle du stockage.
+    """
+    morceaux = [decoder_points(segment) for segment in segments]
+    if not morceaux:
+        return []
+    horodatages, lats, lngs = (np.concatenate(colonne) for colonne in zip(*morceaux))
+    if tolerance_m is not None and tolerance_m > TOLERANCE_STOCKAGE_M:
+        garder = douglas_peucker(lats, lngs, tolerance_m)
+        horodatages, lats, lngs = horodatages[garder], lats[garder], lngs[garder]
+    return [
+        [int(horodatage), round(float(lat), 6), round(float(lng), 6)]
+        for horodatage, lat, lng in zip(horodatages, lats, lngs)
+    ]
@@ -2,22 +2,30 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from ete_project.geo import parser_bbox
+from ete_project.mixins import ChargementOptimiseMixin
 from .models import UserProfile, QRCodeClient, SessionAgent
+from .presence import agents_presents, publier_presence
+from .sessions_agents import fermer_sessions
+from .trajets import ingerer_positions, points_du_trajet
 from .serializers import (
-    CustomUserSerializer, UserProfileSerializer, 
-    QRCodeClientSerializer, SessionAgentSerializer,
+    CustomUserSerializer, CustomUserListeSerializer, UserProfileSerializer,
+    QRCodeClientSerializer, SessionAgentSerializer, SessionAgentListeSerializer,
     UserRegistrationSerializer
 )
 
 User = get_user_model()
 
-class CustomUserViewSet(viewsets.ModelViewSet):
+class CustomUserViewSet(ChargementOptimiseMixin, viewsets.ModelViewSet):
     """ViewSet pour la gestion des utilisateurs"""
     
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
+    serializer_liste_class = CustomUserListeSerializer
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['user_type', 'is_active']
     search_fields = ['username', 'email', 'first_name', 'last_name', 'phone']
@@ -40,7 +48,7 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         """Serializer selon l'action"""
         if self.action == 'register':
             return UserRegistrationSerializer
-        return CustomUserSerializer
+        return super().get_serializer_class()
     
     @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
     def register(self, request):
@@ -111,11 +119,12 @@ class CustomUserViewSet(viewsets.ModelViewSet):
             status=status.HTTP_404_NOT_FOUND
         )
 
-class SessionAgentViewSet(viewsets.ModelViewSet):
+class SessionAgentViewSet(ChargementOptimiseMixin, viewsets.ModelViewSet):
     """ViewSet pour les sessions d'agents"""
     
     queryset = SessionAgent.objects.all()
     serializer_class = SessionAgentSerializer
+    serializer_liste_class = SessionAgentListeSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['agent__user_type', 'is_active']
@@ -134,10 +143,7 @@ class SessionAgentViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Créer une nouvelle session pour l'agent connecté"""
         # Fermer les sessions actives précédentes
-        SessionAgent.objects.filter(
-            agent=self.request.user, 
-            is_active=True
-        ).update(is_active=False, heure_deconnexion=timezone.now())
+        fermer_sessions(SessionAgent.objects.filter(agent=self.request.user), timezone.now())
         
         # Créer la nouvelle session
         serializer.save(agent=self.request.user)
@@ -145,8 +151,6 @@ class SessionAgentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def start_session(self, request):
         """Démarrer une nouvelle session agent"""
-        from django.utils import timezone
-        
         # Vérifier que l'utilisateur est un agent
         if request.user.user_type not in ['agent_ramassage', 'agent_collecte', 'agent_prospection', 'agent_supervision']:
             return Response(
@@ -155,10 +159,7 @@ class SessionAgentViewSet(viewsets.ModelViewSet):
             )
         
         # Fermer les sessions actives
-        SessionAgent.objects.filter(
-            agent=request.user, 
-            is_active=True
-        ).update(is_active=False, heure_deconnexion=timezone.now())
+        fermer_sessions(SessionAgent.objects.filter(agent=request.user), timezone.now())
         
         # Créer nouvelle session
         serializer = self.get_serializer(data=request.data)
@@ -174,8 +175,6 @@ class SessionAgentViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def end_session(self, request, pk=None):
         """Terminer une session agent"""
-        from django.utils import timezone
-        
         session = self.get_object()
         
         # Vérifier que c'est l'agent propriétaire de la session
@@ -187,16 +186,17 @@ class SessionAgentViewSet(viewsets.ModelViewSet):
         
         session.is_active = False
         session.heure_deconnexion = timezone.now()
+        session.duree_session = session.heure_deconnexion - session.heure_connexion
         session.save()
         
         return Response({
             'message': 'Session terminée avec succès',
-            'duree_session': session.heure_deconnexion - session.heure_connexion
+            'duree_session': session.duree_session
         })
     
     @action(detail=False, methods=['get'])
     def active_agents(self, request):
-        """Liste des agents actuellement en session active"""
+        """Agents en session active et leur dernière position (`?bbox=`, `?depuis=` pour un delta)"""
         # Uniquement pour les admins et superviseurs
         if not (request.user.is_staff or request.user.user_type == 'agent_supervision'):
             return Response(
@@ -204,9 +204,87 @@ class SessionAgentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        active_sessions = SessionAgent.objects.filter(
-            is_active=True
-        ).select_related('agent')
+        try:
+            bbox = parser_bbox(request.query_params['bbox']) if 'bbox' in request.query_params else None
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            depuis = float(request.query_params['depuis']) if 'depuis' in request.query_params else None
+        except ValueError:
+            return Response({'error': 'depuis invalide'}, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = SessionAgentSerializer(active_sessions, many=True)
-        return Response(serializer.data)
+        # Servi depuis le registre de présence, sans requête en base
+        return Response(agents_presents(bbox, depuis))
+    
+    @action(detail=True, methods=['post'])
+    def positions(self, request, pk=None):
+        """Enregistrer un lot de positions GPS de la session"""
+        session = self.get_object()
+        
+        if session.agent_id != request.user.id or not session.is_active:
+            return Response(
+                {'error': 'Permission refusée'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        try:
+            segment = ingerer_positions(
+                session, request.data.get('positions'), request.data.get('tournee')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if segment is None:
+            return Response({'points_enregistres': 0})
+        return Response({
+            'points_recus': segment.nombre_points_recus,
+            'points_enregistres': segment.nombre_points,
+            'distance_km': segment.distance_km,
+            'tournee': segment.tournee_id,
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['get'])
+    def trajet(self, request, pk=None):
+        """Trace GPS de la session (`?tolerance=` en mètres pour l'affichage, `?tournee=`)"""
+        # Les superviseurs suivent toutes les sessions, les autres seulement la leur
+        superviseur = request.user.is_staff or request.user.user_type == 'agent_supervision'
+        session = get_object_or_404(SessionAgent, pk=pk) if superviseur else self.get_object()
+        
+        if session.agent_id != request.user.id and not superviseur:
+            return Response(
+                {'error': 'Permission refusée'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        try:
+            tolerance = float(request.query_params['tolerance']) if 'tolerance' in request.query_params else None
+        except ValueError:
+            return Response({'error': 'tolerance invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            tournee_id = int(request.query_params['tournee']) if request.query_params.get('tournee') else None
+        except ValueError:
+            return Response({'error': 'tournee invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        segments = session.segments.order_by('debut', 'id')
+        if tournee_id is not None:
+            segments = segments.filter(tournee_id=tournee_id)
+        
+        return Response({
+            'session': session.id,
+            'points': points_du_trajet(segments, tolerance),
+        })
+    
+    @action(detail=True, methods=['post'])
+    def heartbeat(self, request, pk=None):
+        """Signe de vie de l'application (la session reste ouverte)"""
+        session = self.get_object()
+        
+        if session.agent_id != request.user.id or not session.is_active:
+            return Response(
+                {'error': 'Permission refusée'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        SessionAgent.objects.filter(id=session.id).update(derniere_activite=timezone.now())
+        publier_presence(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
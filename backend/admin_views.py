@@ -13,49 +13,43 @@ from clients.models import Client, ZoneCollecte
 from agents.models import Agent, Equipe
 from collectes.models import Collecte, Tournee, ReclamationCollecte
 from paiements.models import Paiement
+from paiements.relances import get_retards_par_zone
+from rapports.services import (
+    get_compteurs, tableau_performances_agents, indicateurs_periode,
+    croissance_revenus, evolution_revenus, collectes_par_jour, top_zones_periode
+)
+
+SIDEBAR_KEYS = ('clients_count', 'agents_count', 'collectes_pending', 'zones_count', 'paiements_pending')
 
 def get_sidebar_context():
-    """Contexte global pour la sidebar"""
-    return {
-        'clients_count': Client.objects.filter(status='actif').count(),
-        'agents_count': Agent.objects.filter(status='actif').count(),
-        'collectes_pending': Tournee.objects.filter(status__in=['planifiee', 'en_cours']).count(),
-        'zones_count': ZoneCollecte.objects.count(),
-        'paiements_pending': Paiement.objects.filter(status='en_attente').count(),
-    }
+    """Contexte global pour la sidebar (compteurs mis en cache)"""
+    compteurs = get_compteurs()
+    return {key: compteurs[key] for key in SIDEBAR_KEYS}
 
 @staff_member_required
 def admin_dashboard(request):
     """Dashboard principal de l'administration"""
     
+    compteurs = get_compteurs()
+    today = timezone.localdate()
+    debut_mois = today.replace(day=1)
+    indicateurs_jour = indicateurs_periode(today, today)
+    
     # Statistiques principales avec modèles disponibles
     stats = {
-        'total_clients': Client.objects.count(),
-        'new_clients_month': Client.objects.filter(
-            date_inscription__gte=timezone.now() - timedelta(days=30)
-        ).count(),
-        'collectes_today': 15,  # Données statiques pour le moment
-        'collectes_completed': 12,  # Données statiques
-        'agents_active': Agent.objects.filter(
-            user__is_active=True,
-            status='actif'
-        ).count(),
+        'total_clients': compteurs['total_clients'],
+        'new_clients_month': compteurs['new_clients_month'],
+        'collectes_today': indicateurs_jour['collectes_prevues'],
+        'collectes_completed': indicateurs_jour['collectes_realisees'],
+        'agents_active': compteurs['agents_active'],
         'agents_on_route': 8,  # Données statiques
-        'revenue_month': 125000,  # Données statiques en FCFA
-        'revenue_growth': 15.2  # Données statiques
+        'revenue_month': indicateurs_periode(debut_mois, today)['montant_encaisse'],
+        'revenue_growth': croissance_revenus(debut_mois, today)
     }
     
-    # Données pour les graphiques (7 derniers jours) - Données statiques
+    # Données pour les graphiques (7 derniers jours, table de faits quotidienne)
     chart_data = {
-        'collectes_week': [
-            {'day_short': 'Lun', 'count': 8, 'percentage': 53},
-            {'day_short': 'Mar', 'count': 12, 'percentage': 80},
-            {'day_short': 'Mer', 'count': 15, 'percentage': 100},
-            {'day_short': 'Jeu', 'count': 10, 'percentage': 67},
-            {'day_short': 'Ven', 'count': 14, 'percentage': 93},
-            {'day_short': 'Sam', 'count': 6, 'percentage': 40},
-            {'day_short': 'Dim', 'count': 4, 'percentage': 27},
-        ]
+        'collectes_week': collectes_par_jour(today - timedelta(days=6), today)
     }
     
     # Top zones par nombre de clients
@@ -76,10 +70,8 @@ def admin_dashboard(request):
     
     # Alertes système avec données disponibles
     alerts = {
-        'agents_inactifs': Agent.objects.filter(
-            user__last_login__lt=timezone.now() - timedelta(days=3)
-        ).count(),
-        'paiements_retard': 3,  # Données statiques
+        'agents_inactifs': compteurs['agents_inactifs'],
+        'paiements_retard': sum(ligne['nombre'] for ligne in get_retards_par_zone()),
         'nouvelles_demandes': 5  # Données statiques
     }
     
@@ -101,14 +93,14 @@ def admin_dashboard(request):
 def admin_dashboard_stats(request):
     """API pour mise à jour des statistiques en temps réel"""
     
+    compteurs = get_compteurs()
+    today = timezone.localdate()
+    
     stats = {
-        'total_clients': Client.objects.count(),
-        'collectes_today': 15,  # Données statiques
-        'agents_active': Agent.objects.filter(
-            user__is_active=True,
-            status='actif'
-        ).count(),
-        'revenue_month': 125000  # Données statiques en FCFA
+        'total_clients': compteurs['total_clients'],
+        'collectes_today': indicateurs_periode(today, today)['collectes_prevues'],
+        'agents_active': compteurs['agents_active'],
+        'revenue_month': indicateurs_periode(today.replace(day=1), today)['montant_encaisse']
     }
     
     return JsonResponse({'stats': stats})
@@ -206,7 +198,7 @@ def admin_agents(request):
     sessions_actives = []
     
     # Statistiques d'agents
-    agents_actifs = Agent.objects.filter(status='actif').count()
+    agents_actifs = get_compteurs()['agents_count']
     
     context = {
         'agents': agents_page,
@@ -446,6 +438,7 @@ def admin_paiements(request):
     context = {
         'paiements': paiements_page,
         'stats': stats,
+        'retards_par_zone': get_retards_par_zone(),
         'status_filter': status_filter,
         'method_filter': method_filter,
         'date_filter': date_filter,
@@ -516,26 +509,15 @@ def admin_rapports(request):
         status='valide'
     )
     
-    # Revenus totaux
-    revenus_totaux = paiements_periode.aggregate(
-        total=Sum('montant')
-    )['total'] or Decimal('0')
-    
-    # Collectes de la période
-    collectes_periode = Collecte.objects.filter(
-        tournee__date_tournee__range=[date_debut, date_fin]
-    )
-    
-    tournees_periode = Tournee.objects.filter(
-        date_tournee__range=[date_debut, date_fin]
-    )
+    # Indicateurs pré-agrégés (table de faits quotidienne, voir rapports.rollup)
+    indicateurs_periode_courante = indicateurs_periode(date_debut, date_fin)
     
     # Statistiques principales
     stats = {
-        'revenus_totaux': revenus_totaux,
-        'croissance_revenus': 15.2,  # À calculer vs période précédente
-        'collectes_realisees': collectes_periode.filter(status='terminee').count(),
-        'taux_realisation': 85.5,  # À calculer
+        'revenus_totaux': indicateurs_periode_courante['montant_encaisse'],
+        'croissance_revenus': croissance_revenus(date_debut, date_fin),
+        'collectes_realisees': indicateurs_periode_courante['collectes_realisees'],
+        'taux_realisation': indicateurs_periode_courante['taux_realisation'],
         'clients_actifs': Client.objects.filter(
             paiement__date_paiement__date__range=[date_debut, date_fin],
             paiement__status='valide'
@@ -547,10 +529,7 @@ def admin_rapports(request):
     }
     
     # Évolution des revenus (données pour graphique)
-    revenus_evolution = {
-        'labels': ['Sem 1', 'Sem 2', 'Sem 3', 'Sem 4'],
-        'data': [125000, 150000, 135000, 180000]
-    }
+    revenus_evolution = evolution_revenus(date_debut, date_fin)
     
     # Répartition des modes de paiement
     paiements_par_mode = paiements_periode.values('mode_paiement').annotate(
@@ -562,66 +541,14 @@ def admin_rapports(request):
         'data': [p['count'] for p in paiements_par_mode]
     }
     
-    # Performance des agents
-    agents_performance = []
-    agents = CustomUser.objects.filter(user_type__in=['agent_ramassage', 'agent_collecte'])
-    
-    for agent in agents:
-        # Essayons d'abord de récupérer l'agent profile
-        try:
-            agent_profile = agent.agent_profile
-            collectes_agent = collectes_periode.filter(
-                tournee__equipe_assignee__membres=agent_profile
-            )
-        except:
-            # Si pas de profil agent, on simule des données
-            collectes_agent = collectes_periode.none()
-        
-        paiements_agent = paiements_periode.filter(
-            agent_collecteur=agent
-        ).aggregate(total=Sum('montant'))['total'] or Decimal('0')
-        
-        performance = 85 if collectes_agent.exists() else 0  # Calcul simplifié
-        
-        agents_performance.append({
-            'nom': agent.get_full_name() or agent.username,
-            'type_agent': agent.user_type,
-            'zone': 'Zone Centre',  # À adapter selon le modèle
-            'collectes_realisees': collectes_agent.filter(status='terminee').count(),
-            'collectes_prevues': collectes_agent.count(),
-            'paiements_collectes': paiements_agent,
-            'performance': performance
-        })
+    # Performance des agents (requêtes GROUP BY, nombre constant)
+    agents_performance = tableau_performances_agents(date_debut, date_fin)
     
     # Top zones performantes
-    top_zones = [
-        {
-            'nom': 'Zone Centre',
-            'clients_count': 25,
-            'revenus': 450000,
-            'taux_collecte': 92.5
-        },
-        {
-            'nom': 'Zone Nord',
-            'clients_count': 18,
-            'revenus': 320000,
-            'taux_collecte': 87.2
-        },
-        {
-            'nom': 'Zone Sud',
-            'clients_count': 22,
-            'revenus': 380000,
-            'taux_collecte': 89.1
-        }
-    ]
+    top_zones = top_zones_periode(date_debut, date_fin)
     
     # Indicateurs de qualité
-    indicateurs = {
-        'ponctualite': 87.5,
-        'reclamations': 2.3,
-        'recouvrement': 94.2,
-        'satisfaction': 88.7
-    }
+    indicateurs = indicateurs_periode_courante['indicateurs']
     
     context = {
         'periode': periode,
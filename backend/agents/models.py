@@ -80,6 +80,18 @@ class Agent(models.Model):
             if equipe.vehicule_assigne:
                 return equipe.vehicule_assigne
         return None
+    
+    def zones_couvertes_ids(self):
+        """Zones de l'agent : affectées, principale et zones d'intervention de ses équipes"""
+        from clients.models import ZoneCollecte
+        zones = set(ZoneCollecte.objects.filter(
+            models.Q(agent__id=self.id)
+            | models.Q(equipe__membres__id=self.id)
+            | models.Q(equipe__chef_equipe_id=self.id)
+        ).values_list('id', flat=True))
+        if self.zone_principale_id:
+            zones.add(self.zone_principale_id)
+        return zones
 
 
 class Vehicule(models.Model):
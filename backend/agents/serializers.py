@@ -1,10 +1,17 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from clients.models import ZoneCollecte
+from clients.serializers import ZoneCollecteListeSerializer
+from ete_project.mixins import ChampsDynamiquesMixin, relations_utiles
 from .models import Agent, Vehicule, Equipe
 
 User = get_user_model()
 
-class AgentSerializer(serializers.ModelSerializer):
+# Colonnes des zones réservées à la carte, jamais lues pour les zones imbriquées
+CHAMPS_GEOMETRIE = ('coordonnees_zone', 'geometries_simplifiees', 'emprise')
+
+class AgentSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour les agents"""
     
     user_name = serializers.CharField(source='user.full_name', read_only=True)
@@ -29,11 +36,34 @@ class AgentSerializer(serializers.ModelSerializer):
             'is_available', 'created_at', 'updated_at'
         ]
         read_only_fields = ['matricule']
+        champs_expansibles = ['zones_affectees_details']
+        colonnes_proprietes = {'is_available': ['status']}
+    
+    RELATIONS_JOINTES = {
+        'user': ['user_name', 'user_email', 'user_phone'],
+        'zone_principale': ['zone_principale_nom'],
+    }
+    
+    @classmethod
+    def optimiser_queryset(cls, queryset, champs=None):
+        """Utilisateur et zone principale joints, zones affectées préchargées avec leurs comptes"""
+        jointures = relations_utiles(champs, cls.RELATIONS_JOINTES)
+        if jointures:
+            queryset = queryset.select_related(*jointures)
+        if champs is None or 'zones_affectees_details' in champs:
+            queryset = queryset.prefetch_related(Prefetch(
+                'zones_affectees',
+                queryset=ZoneCollecteListeSerializer.optimiser_queryset(ZoneCollecte.objects.defer(*CHAMPS_GEOMETRIE))
+            ))
+        elif 'zones_affectees' in champs:
+            queryset = queryset.prefetch_related(
+                Prefetch('zones_affectees', queryset=ZoneCollecte.objects.only('id'))
+            )
+        return queryset
     
     def get_zones_affectees_details(self, obj):
-        """Détails des zones affectées"""
-        from clients.serializers import ZoneCollecteSerializer
-        return ZoneCollecteSerializer(obj.zones_affectees.all(), many=True).data
+        """Zones affectées, sans leur polygone"""
+        return ZoneCollecteListeSerializer(obj.zones_affectees.all(), many=True).data
     
     def create(self, validated_data):
         """Créer un agent avec matricule automatique"""
@@ -42,6 +72,15 @@ class AgentSerializer(serializers.ModelSerializer):
         validated_data['matricule'] = f"AG-{uuid.uuid4().hex[:6].upper()}"
         return super().create(validated_data)
 
+class AgentListeSerializer(AgentSerializer):
+    """Représentation compacte des agents pour les listes"""
+    
+    class Meta(AgentSerializer.Meta):
+        fields = [
+            'id', 'user', 'user_name', 'matricule', 'poste', 'status',
+            'zone_principale', 'zone_principale_nom', 'is_available'
+        ]
+
 class VehiculeSerializer(serializers.ModelSerializer):
     """Serializer pour les véhicules"""
     
@@ -58,7 +97,7 @@ class VehiculeSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
 
-class EquipeSerializer(serializers.ModelSerializer):
+class EquipeSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour les équipes"""
     
     chef_equipe_name = serializers.CharField(source='chef_equipe.user.full_name', read_only=True)
@@ -78,15 +117,44 @@ class EquipeSerializer(serializers.ModelSerializer):
             'jours_travail', 'heure_debut', 'heure_fin', 'is_active',
             'nombre_membres', 'created_at', 'updated_at'
         ]
+        champs_expansibles = ['membres_details', 'zones_intervention_details']
+        colonnes_proprietes = {'nombre_membres': []}
+    
+    RELATIONS_JOINTES = {
+        'chef_equipe__user': ['chef_equipe_name'],
+        'vehicule_assigne': ['vehicule_info'],
+    }
+    
+    @classmethod
+    def optimiser_queryset(cls, queryset, champs=None):
+        """Membres (avec leurs propres relations) et zones préchargés une fois pour toute la liste"""
+        jointures = relations_utiles(champs, cls.RELATIONS_JOINTES)
+        if jointures:
+            queryset = queryset.select_related(*jointures)
+        if champs is None or 'membres_details' in champs:
+            queryset = queryset.prefetch_related(
+                Prefetch('membres', queryset=AgentSerializer.optimiser_queryset(Agent.objects.all()))
+            )
+        elif {'membres', 'nombre_membres'} & champs:
+            queryset = queryset.prefetch_related(Prefetch('membres', queryset=Agent.objects.only('id')))
+        if champs is None or 'zones_intervention_details' in champs:
+            queryset = queryset.prefetch_related(Prefetch(
+                'zones_intervention',
+                queryset=ZoneCollecteListeSerializer.optimiser_queryset(ZoneCollecte.objects.defer(*CHAMPS_GEOMETRIE))
+            ))
+        elif 'zones_intervention' in champs:
+            queryset = queryset.prefetch_related(
+                Prefetch('zones_intervention', queryset=ZoneCollecte.objects.only('id'))
+            )
+        return queryset
     
     def get_membres_details(self, obj):
         """Détails des membres de l'équipe"""
         return AgentSerializer(obj.membres.all(), many=True).data
     
     def get_zones_intervention_details(self, obj):
-        """Détails des zones d'intervention"""
-        from clients.serializers import ZoneCollecteSerializer
-        return ZoneCollecteSerializer(obj.zones_intervention.all(), many=True).data
+        """Zones d'intervention, sans leur polygone"""
+        return ZoneCollecteListeSerializer(obj.zones_intervention.all(), many=True).data
     
     def validate_chef_equipe(self, value):
         """Vérifier que le chef d'équipe a le bon poste"""
@@ -104,6 +172,16 @@ class EquipeSerializer(serializers.ModelSerializer):
             )
         return value
 
+class EquipeListeSerializer(EquipeSerializer):
+    """Représentation compacte des équipes pour les listes"""
+    
+    class Meta(EquipeSerializer.Meta):
+        fields = [
+            'id', 'nom_equipe', 'chef_equipe', 'chef_equipe_name',
+            'vehicule_assigne', 'vehicule_info', 'jours_travail',
+            'heure_debut', 'heure_fin', 'is_active', 'nombre_membres'
+        ]
+
 class AgentPerformanceSerializer(serializers.Serializer):
     """Serializer pour les performances d'agent"""
     
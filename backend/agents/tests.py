@@ -1,3 +1,189 @@
-from django.test import TestCase
+import tempfile
+from datetime import date, time
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from clients.models import Client, Contrat, BacPoubelle, ZoneCollecte
+from collectes.models import Tournee, Collecte, ReclamationCollecte
+from rapports.services import performances_agents
+from .models import Agent, Vehicule, Equipe
+
+User = get_user_model()
+
+
+class NombreRequetesConstantTest(TestCase):
+    """Le nombre de requêtes des listes ne doit pas dépendre du nombre de lignes"""
+
+    ENDPOINTS = [
+        '/api/agents/agents/',
+        '/api/agents/agents/disponibles/',
+        '/api/agents/equipes/',
+        '/api/agents/vehicules/',
+        '/api/agents/vehicules/operationnels/',
+        '/api/clients/zones/',
+        '/api/clients/clients/',
+        '/api/clients/clients/inactifs/',
+    ]
+
+    def setUp(self):
+        # Les QR codes générés à la création des utilisateurs restent hors de MEDIA_ROOT
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        reglages = override_settings(MEDIA_ROOT=media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+        self.admin = User.objects.create_user(
+            username='superviseur', email='superviseur@ete.test',
+            user_type='admin', is_staff=True
+        )
+        self.api = APIClient(HTTP_HOST='localhost')
+        self.api.force_authenticate(self.admin)
+        self.compteur = 0
+
+    def _creer_donnees(self, nombre):
+        """Crée `nombre` zones, clients, agents, véhicules et équipes reliés entre eux"""
+        for _ in range(nombre):
+            self.compteur += 1
+            n = self.compteur
+            zone = ZoneCollecte.objects.create(
+                nom_zone=f'Zone {n}', code_zone=f'Z{n}', coordonnees_zone=[], responsable=self.admin
+            )
+            client_user = User.objects.create_user(
+                username=f'client{n}', email=f'client{n}@ete.test'
+            )
+            client = Client.objects.create(
+                user=client_user, code_client=f'CLI-{n}', type_client='particulier',
+                service_address='Rue', service_city='Ville', service_postal_code='1000',
+                latitude=0, longitude=0, zone_collecte=zone
+            )
+            Contrat.objects.create(
+                client=client, numero_contrat=f'CTR-{n}', date_debut=date(2025, 1, 1),
+                date_fin=date(2025, 12, 31), frequence_collecte='hebdomadaire',
+                jours_collecte=['lundi'], heure_passage=time(8), tarif_mensuel=100
+            )
+            BacPoubelle.objects.create(
+                client=client, numero_bac=f'BAC-{n}', type_bac='plastique_120L',
+                capacite_litres=120, date_installation=date(2025, 1, 1)
+            )
+
+            agents = []
+            for i in range(2):
+                agent_user = User.objects.create_user(
+                    username=f'agent{n}-{i}', email=f'agent{n}-{i}@ete.test',
+                    user_type='agent_ramassage'
+                )
+                agent = Agent.objects.create(
+                    user=agent_user, matricule=f'AG-{n}-{i}', poste='ramasseur_ordures',
+                    date_embauche=date(2024, 1, 1), zone_principale=zone
+                )
+                agent.zones_affectees.add(zone)
+                agents.append(agent)
+
+            vehicule = Vehicule.objects.create(
+                numero_plaque=f'PL-{n}', marque='Marque', modele='Modèle', annee=2020,
+                type_vehicule='camion_benne', capacite_charge=1000, capacite_volume=10
+            )
+            equipe = Equipe.objects.create(
+                nom_equipe=f'Équipe {n}', chef_equipe=agents[0], vehicule_assigne=vehicule,
+                heure_debut=time(7), heure_fin=time(15)
+            )
+            equipe.membres.add(*agents)
+            equipe.zones_intervention.add(zone)
+
+    def _nombre_requetes(self, url):
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = self.api.get(url)
+        self.assertEqual(reponse.status_code, 200, url)
+        return len(requetes)
+
+    def test_nombre_requetes_independant_du_nombre_de_lignes(self):
+        self._creer_donnees(2)
+        avant = {url: self._nombre_requetes(url) for url in self.ENDPOINTS}
+
+        self._creer_donnees(5)
+        for url in self.ENDPOINTS:
+            with self.subTest(url=url):
+                self.assertEqual(self._nombre_requetes(url), avant[url])
+
+
+class PerformancesAgentsTest(TestCase):
+    """Performances de tous les agents en requêtes groupées, sans double comptage par membre"""
+
+    JOUR = date(2025, 6, 2)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        reglages = override_settings(MEDIA_ROOT=media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+        self.admin = User.objects.create_user(
+            username='superviseur', email='superviseur@ete.test', user_type='admin', is_staff=True
+        )
+        zone = ZoneCollecte.objects.create(
+            nom_zone='Zone', code_zone='Z1', coordonnees_zone=[], responsable=self.admin
+        )
+        self.agents = [
+            Agent.objects.create(
+                user=User.objects.create_user(
+                    username=f'agent{i}', email=f'agent{i}@ete.test', user_type='agent_ramassage'
+                ),
+                matricule=f'AG-{i}', poste='ramasseur_ordures', date_embauche=date(2024, 1, 1)
+            )
+            for i in range(3)
+        ]
+        vehicule = Vehicule.objects.create(
+            numero_plaque='PL-1', marque='Marque', modele='Modèle', annee=2020,
+            type_vehicule='camion_benne', capacite_charge=1000, capacite_volume=10
+        )
+        equipe = Equipe.objects.create(
+            nom_equipe='Équipe', chef_equipe=self.agents[0], vehicule_assigne=vehicule,
+            heure_debut=time(7), heure_fin=time(15)
+        )
+        equipe.membres.add(*self.agents[:2])
+        tournee = Tournee.objects.create(
+            nom_tournee='Tournée', date_tournee=self.JOUR, heure_debut_prevue=time(7),
+            heure_fin_prevue=time(15), equipe_assignee=equipe, vehicule_assigne=vehicule, zone_collecte=zone
+        )
+        for n, statut in enumerate(['completee', 'completee', 'planifiee']):
+            client = Client.objects.create(
+                user=User.objects.create_user(username=f'client{n}', email=f'client{n}@ete.test'),
+                code_client=f'CLI-{n}', type_client='particulier', service_address='Rue',
+                service_city='Ville', service_postal_code='1000', latitude=0, longitude=0, zone_collecte=zone
+            )
+            collecte = Collecte.objects.create(
+                tournee=tournee, client=client, heure_passage_prevue=time(8), ordre_passage=n + 1, status=statut
+            )
+        ReclamationCollecte.objects.create(
+            numero_reclamation='REC-1', collecte=collecte, client=client,
+            type_reclamation='collecte_manquee', description='Bac non vidé'
+        )
+
+    def test_performances_par_membre(self):
+        with self.assertNumQueries(3):
+            performances = performances_agents(self.JOUR, self.JOUR)
+        for agent in self.agents[:2]:
+            stats = performances[agent.user_id]
+            self.assertEqual(
+                (stats['collectes_prevues'], stats['collectes_realisees'], stats['nombre_tournees'], stats['incidents']),
+                (3, 2, 1, 1)
+            )
+            self.assertEqual(stats['taux_completion'], 66.67)
+        # Hors de l'équipe : aucune ligne
+        self.assertNotIn(self.agents[2].user_id, performances)
+        self.assertEqual(performances_agents(date(2025, 6, 3), date(2025, 6, 30)), {})
+
+    def test_date_impossible(self):
+        api = APIClient(HTTP_HOST='localhost')
+        api.force_authenticate(self.admin)
+        url = f'/api/agents/agents/{self.agents[0].id}/performances/'
+        self.assertEqual(api.get(url, {'date_debut': '2024-02-30', 'date_fin': '2024-03-01'}).status_code, 400)
+        reponse = api.get(url, {'date_debut': '2025-06-01', 'date_fin': '2025-06-30'})
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(float(reponse.data['taux_completion']), 66.67)
@@ -6,21 +6,26 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.db.models import Count, Avg, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 
+from ete_project.mixins import ChargementOptimiseMixin
+from rapports.services import performances_agents
 from .models import Agent, Vehicule, Equipe
 from .serializers import (
-    AgentSerializer, VehiculeSerializer, EquipeSerializer,
+    AgentSerializer, AgentListeSerializer, VehiculeSerializer,
+    EquipeSerializer, EquipeListeSerializer,
     AgentPerformanceSerializer, VehiculeMaintenanceSerializer,
     EquipeStatsSerializer
 )
 
 User = get_user_model()
 
-class AgentViewSet(viewsets.ModelViewSet):
+class AgentViewSet(ChargementOptimiseMixin, viewsets.ModelViewSet):
     """ViewSet pour la gestion des agents"""
     
-    queryset = Agent.objects.select_related('user', 'zone_principale').prefetch_related('zones_affectees')
+    queryset = Agent.objects.all()
     serializer_class = AgentSerializer
+    serializer_liste_class = AgentListeSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['poste', 'status', 'zone_principale']
@@ -47,8 +52,8 @@ class AgentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        agents_disponibles = Agent.objects.filter(status='actif')
-        serializer = AgentSerializer(agents_disponibles, many=True)
+        agents_disponibles = self.preparer_queryset(Agent.objects.filter(status='actif'))
+        serializer = self.get_serializer(agents_disponibles, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
@@ -101,15 +106,26 @@ class AgentViewSet(viewsets.ModelViewSet):
         """Performances d'un agent"""
         agent = self.get_object()
         
-        # Calculer les performances (à adapter selon vos modèles de collecte)
-        # Ici c'est un exemple, vous devrez l'adapter
+        # Période optionnelle (?date_debut=AAAA-MM-JJ&date_fin=AAAA-MM-JJ)
+        try:
+            date_debut = parse_date(request.query_params.get('date_debut', ''))
+            date_fin = parse_date(request.query_params.get('date_fin', ''))
+        except ValueError:
+            # Format valide mais date impossible (ex. 2024-02-30)
+            return Response(
+                {'error': 'Date invalide'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        stats = performances_agents(date_debut, date_fin, user_ids=[agent.user_id]).get(agent.user_id, {})
+        
         performances = {
             'agent_id': agent.id,
             'agent_name': agent.user.full_name,
-            'nombre_tournees': 0,  # À calculer
-            'taux_completion': 0,  # À calculer
+            'nombre_tournees': stats.get('nombre_tournees', 0),
+            'taux_completion': stats.get('taux_completion', 0),
             'note_moyenne': agent.note_evaluation or 0,
-            'incidents': 0  # À calculer
+            'incidents': stats.get('incidents', 0)
         }
         
         serializer = AgentPerformanceSerializer(performances)
@@ -183,11 +199,12 @@ class VehiculeViewSet(viewsets.ModelViewSet):
         
         return Response({'message': 'Maintenance enregistrée avec succès'})
 
-class EquipeViewSet(viewsets.ModelViewSet):
+class EquipeViewSet(ChargementOptimiseMixin, viewsets.ModelViewSet):
     """ViewSet pour la gestion des équipes"""
     
-    queryset = Equipe.objects.select_related('chef_equipe', 'vehicule_assigne').prefetch_related('membres', 'zones_intervention')
+    queryset = Equipe.objects.all()
     serializer_class = EquipeSerializer
+    serializer_liste_class = EquipeListeSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['is_active']
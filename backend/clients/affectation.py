@@ -0,0 +1,225 @@
+"""
+Affectation automatique des demandes de prospection
+
+Chaque agent de prospection disponible est représenté par ses points de
+référence : dernière position connue (registre de présence), position de
+son profil et centre de ses zones. Les demandes en attente sont lues par
+lots ; pour chacune, les K agents les plus proches sont trouvés d'un coup
+sur la matrice demandes × points (une demande située dans une zone de
+l'agent est à distance nulle de lui).
+
+Parmi ces voisins, la demande va à l'agent dont le coût distance + charge
+est le plus faible, la charge (demandes ouvertes) étant mise à jour à
+chaque affectation pour équilibrer le lot. Un lot est écrit en un seul
+bulk_update.
+"""
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from accounts.presence import agents_presents
+from agents.models import Agent
+from ete_project.geo import haversine_km
+from temps_reel.evenements import SUJET_PROSPECTION, donnees_demande, publier_apres_commit, sujet_utilisateur
+from .models import DemandeProspection, ZoneCollecte
+
+User = get_user_model()
+
+K_VOISINS = 5
+TAILLE_LOT = 1000
+CHARGE_MAX = 30
+# Une demande ouverte de plus pèse autant que ce détour
+PENALITE_CHARGE_KM = 0.5
+# Distance retenue quand ni la demande ni l'agent ne sont localisés
+DISTANCE_INCONNUE_KM = 1000.0
+STATUTS_OUVERTS = ('assignee', 'en_cours')
+
+
+class IndexAgents:
+    """Points de référence des agents et zones couvertes, pour la recherche des plus proches"""
+
+    def __init__(self, agents_ids, points, zones):
+        # points : {agent_id: [(lat, lng), ...]} ; zones : {agent_id: {zone_id, ...}}
+        self.agents_ids = np.array(agents_ids, dtype=np.int64)
+        rangs = {agent_id: rang for rang, agent_id in enumerate(agents_ids)}
+
+        proprietaires, coordonnees = [], []
+        for agent_id in agents_ids:
+            for point in points.get(agent_id, ()):
+                proprietaires.append(rangs[agent_id])
+                coordonnees.append(point)
+        self.proprietaires = np.array(proprietaires, dtype=np.int64)
+        self.coordonnees = np.array(coordonnees, dtype=float).reshape(-1, 2)
+
+        self.agents_par_zone = defaultdict(list)
+        for agent_id, zones_agent in zones.items():
+            for zone_id in zones_agent:
+                self.agents_par_zone[zone_id].append(rangs[agent_id])
+
+    def __len__(self):
+        return len(self.agents_ids)
+
+    def distances(self, lats, lngs, zones_ids):
+        """Matrice (demandes, agents) de la distance au point de référence le plus proche, en km"""
+        n, m = len(lats), len(self.agents_ids)
+        distances = np.full((n, m), np.inf)
+        if len(self.coordonnees):
+            vers_points = haversine_km(
+                lats[:, None], lngs[:, None], self.coordonnees[None, :, 0], self.coordonnees[None, :, 1]
+            )
+            # Minimum par agent sur ses points (np.minimum.at accepte les propriétaires répétés)
+            np.minimum.at(distances.T, self.proprietaires, vers_points.T)
+        for ligne, zone_id in enumerate(zones_ids):
+            if zone_id is not None:
+                distances[ligne, self.agents_par_zone.get(zone_id, [])] = 0.0
+
+        # Demande sans position (NaN) ou agent sans point : seule la charge départage
+        return np.where(np.isfinite(distances), distances, DISTANCE_INCONNUE_KM)
+
+    def voisins(self, distances, k=K_VOISINS):
+        """Rangs des k agents les plus proches de chaque demande, du plus proche au plus lointain"""
+        k = min(k, distances.shape[1])
+        proches = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        ordre = np.take_along_axis(distances, proches, axis=1).argsort(axis=1)
+        return np.take_along_axis(proches, ordre, axis=1)
+
+
+def agents_disponibles():
+    """Agents de prospection actifs (sans fiche agent, ou fiche au statut actif)"""
+    return list(
+        User.objects.filter(user_type='agent_prospection', is_active=True)
+        .exclude(agent_profile__status__in=[statut for statut, _ in Agent.STATUS_CHOICES if statut != 'actif'])
+        .order_by('id').values_list('id', flat=True)
+    )
+
+
+def construire_index_agents(agents_ids):
+    """Index des agents : position en session, position du profil et centre des zones couvertes"""
+    disponibles = set(agents_ids)
+    points = defaultdict(list)
+    for entree in agents_presents()['agents']:
+        if entree['agent'] in disponibles:
+            points[entree['agent']].append((entree['latitude'], entree['longitude']))
+
+    profils = User.objects.filter(
+        id__in=agents_ids, profile__latitude__isnull=False, profile__longitude__isnull=False
+    ).values_list('id', 'profile__latitude', 'profile__longitude')
+    for agent_id, lat, lng in profils:
+        points[agent_id].append((float(lat), float(lng)))
+
+    zones = defaultdict(set)
+    for agent_id, zone_id in Agent.objects.filter(
+        user_id__in=agents_ids, zone_principale__isnull=False
+    ).values_list('user_id', 'zone_principale_id'):
+        zones[agent_id].add(zone_id)
+    for agent_id, zone_id in Agent.zones_affectees.through.objects.filter(
+        agent__user_id__in=agents_ids
+    ).values_list('agent__user_id', 'zonecollecte_id'):
+        zones[agent_id].add(zone_id)
+
+    emprises = dict(
+        ZoneCollecte.objects.filter(id__in={zone_id for ids in zones.values() for zone_id in ids})
+        .values_list('id', 'emprise')
+    )
+    for agent_id, zones_agent in zones.items():
+        for zone_id in zones_agent:
+            emprise = emprises.get(zone_id)
+            if emprise:
+                min_lng, min_lat, max_lng, max_lat = emprise
+                points[agent_id].append(((min_lat + max_lat) / 2, (min_lng + max_lng) / 2))
+
+    return IndexAgents(agents_ids, points, zones)
+
+
+def repartir(distances, voisins, charges, charge_max=CHARGE_MAX):
+    """
+    Rang de l'agent choisi pour chaque demande (-1 si tous sont pleins) ; `charges`
+    (demandes ouvertes par rang d'agent) est mis à jour au fil des affectations.
+    """
+    choix = np.full(len(distances), -1, dtype=np.int64)
+    for ligne in range(len(distances)):
+        candidats = voisins[ligne][charges[voisins[ligne]] < charge_max]
+        if not len(candidats):
+            # Voisins tous pleins : n'importe quel agent qui a encore de la place
+            candidats = np.flatnonzero(charges < charge_max)
+            if not len(candidats):
+                continue
+        couts = distances[ligne, candidats] + PENALITE_CHARGE_KM * charges[candidats]
+        rang = candidats[int(couts.argmin())]
+        choix[ligne] = rang
+        charges[rang] += 1
+    return choix
+
+
+def affecter_demandes(appliquer=True, charge_max=CHARGE_MAX, taille_lot=TAILLE_LOT):
+    """
+    Affecte les demandes en attente sans agent, de la plus ancienne à la plus
+    récente, sans dépasser `charge_max` demandes ouvertes par agent. Retourne
+    les nombres de demandes affectées et restées en attente, et les
+    affectations par agent.
+    """
+    agents_ids = agents_disponibles()
+    resultat = {'affectees': 0, 'non_affectees': 0, 'par_agent': {}}
+    if not agents_ids:
+        resultat['non_affectees'] = DemandeProspection.objects.filter(
+            status='en_attente', agent_assigne__isnull=True
+        ).count()
+        return resultat
+
+    index = construire_index_agents(agents_ids)
+    ouvertes = Counter(dict(
+        DemandeProspection.objects.filter(agent_assigne_id__in=agents_ids, status__in=STATUTS_OUVERTS)
+        .values('agent_assigne_id').annotate(nombre=Count('id')).values_list('agent_assigne_id', 'nombre')
+    ))
+    charges = np.array([ouvertes[agent_id] for agent_id in agents_ids], dtype=np.int64)
+    par_agent = Counter()
+
+    dernier_id = 0
+    while True:
+        with transaction.atomic():
+            lot = list(
+                DemandeProspection.objects.select_for_update()
+                .filter(id__gt=dernier_id, status='en_attente', agent_assigne__isnull=True)
+                .order_by('id')[:taille_lot]
+            )
+            if not lot:
+                break
+            dernier_id = lot[-1].id
+
+            lats = np.array([np.nan if d.latitude is None else float(d.latitude) for d in lot])
+            lngs = np.array([np.nan if d.longitude is None else float(d.longitude) for d in lot])
+            distances = index.distances(lats, lngs, [d.zone_collecte_id for d in lot])
+            choix = repartir(distances, index.voisins(distances), charges, charge_max)
+
+            maintenant = timezone.now()
+            affectees = []
+            for demande, rang in zip(lot, choix):
+                if rang < 0:
+                    resultat['non_affectees'] += 1
+                    continue
+                demande.agent_assigne_id = int(index.agents_ids[rang])
+                demande.status = 'assignee'
+                demande.date_assignation = maintenant
+                demande.updated_at = maintenant
+                affectees.append(demande)
+                par_agent[demande.agent_assigne_id] += 1
+
+            if appliquer and affectees:
+                DemandeProspection.objects.bulk_update(
+                    affectees, ['agent_assigne', 'status', 'date_assignation', 'updated_at'], batch_size=500
+                )
+                # bulk_update ne déclenche pas les signaux : publication groupée
+                nouvelles = defaultdict(list)
+                for demande in affectees:
+                    publier_apres_commit([SUJET_PROSPECTION], 'demande', donnees_demande(demande))
+                    nouvelles[demande.agent_assigne_id].append(demande.id)
+                for agent_id, demandes_ids in nouvelles.items():
+                    publier_apres_commit([sujet_utilisateur(agent_id)], 'demandes_assignees', {'demandes': demandes_ids})
+            resultat['affectees'] += len(affectees)
+
+    resultat['par_agent'] = dict(par_agent)
+    return resultat
@@ -0,0 +1,145 @@
+"""
+Carte des clients et des bacs regroupés par cellules
+
+Pour chaque couche, les points sont comptés par cellule geohash à toutes les
+précisions de 1 à PRECISION_MAX (une seule requête GROUP BY à la précision
+la plus fine, les précisions plus grossières s'en déduisent par préfixe) et
+enregistrés dans CelluleCarte. Une tuile z/x/y lit alors les cellules de la
+précision adaptée à son zoom dont le centre de gravité tombe dans la tuile :
+au plus quelques dizaines de lignes, quel que soit le nombre de clients.
+
+Les tuiles sont mises en cache avec leur ETag sous la version de la couche,
+changée à chaque reconstruction (commande `construire_carte`, à lancer
+périodiquement).
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Min
+from django.db.models.functions import Substr
+from rest_framework.renderers import JSONRenderer
+
+from ete_project.geo import bbox_tuile
+from ete_project.geohash import dimensions_cellule, filtre_bbox
+from .models import BacPoubelle, CelluleCarte, Client
+
+PRECISION_MAX = 8
+CELLULES_PAR_TUILE = 8
+ZOOM_MAX = 22
+TUILE_CACHE_TIMEOUT = 60 * 60 * 24
+VERSION_CACHE_KEY = 'clients:carte:version'
+
+COUCHES = {
+    # couche : (requête, préfixe des champs de position)
+    'clients': (lambda: Client.objects.exclude(status='inactif'), ''),
+    'bacs': (lambda: BacPoubelle.objects.exclude(status__in=('perdu', 'remplace')), 'client__'),
+}
+
+
+def _cle_version(couche):
+    return f'{VERSION_CACHE_KEY}:{couche}'
+
+
+def _version(couche):
+    # Une version perdue (éviction) repart d'une valeur nouvelle, jamais d'une ancienne
+    cache.add(_cle_version(couche), time.time_ns(), None)
+    return cache.get(_cle_version(couche))
+
+
+def precision_pour_zoom(z):
+    """Précision la plus fine dont les cellules couvrent au moins 1/CELLULES_PAR_TUILE de la tuile"""
+    largeur_tuile = 360 / 2 ** z
+    for precision in range(PRECISION_MAX, 1, -1):
+        largeur_cellule, _ = dimensions_cellule(precision)
+        if largeur_cellule >= largeur_tuile / CELLULES_PAR_TUILE:
+            return precision
+    return 1
+
+
+def compter_cellules(couche):
+    """
+    Cellules de la couche à toutes les précisions : {(précision, geohash):
+    [nombre, somme des latitudes, somme des longitudes, id du premier objet]}
+    """
+    requete, prefixe = COUCHES[couche]
+    lignes = requete().exclude(**{f'{prefixe}geohash': ''}).annotate(
+        cellule=Substr(f'{prefixe}geohash', 1, PRECISION_MAX)
+    ).values('cellule').annotate(
+        nombre=Count('id'),
+        latitude=Avg(f'{prefixe}latitude'),
+        longitude=Avg(f'{prefixe}longitude'),
+        objet_id=Min('id'),
+    ).order_by()
+
+    cellules = {}
+    for ligne in lignes:
+        nombre = ligne['nombre']
+        for precision in range(1, PRECISION_MAX + 1):
+            cellule = cellules.setdefault((precision, ligne['cellule'][:precision]), [0, 0.0, 0.0, None])
+            cellule[0] += nombre
+            cellule[1] += float(ligne['latitude']) * nombre
+            cellule[2] += float(ligne['longitude']) * nombre
+            if cellule[3] is None or ligne['objet_id'] < cellule[3]:
+                cellule[3] = ligne['objet_id']
+    return cellules
+
+
+def construire_cellules(couche):
+    """Remplace les cellules de la couche et périme ses tuiles en cache"""
+    cellules = [
+        CelluleCarte(
+            couche=couche,
+            precision=precision,
+            geohash=geohash,
+            nombre=nombre,
+            latitude=somme_lat / nombre,
+            longitude=somme_lng / nombre,
+            objet_id=objet_id if nombre == 1 else None,
+        )
+        for (precision, geohash), (nombre, somme_lat, somme_lng, objet_id) in compter_cellules(couche).items()
+    ]
+    with transaction.atomic():
+        CelluleCarte.objects.filter(couche=couche).delete()
+        CelluleCarte.objects.bulk_create(cellules, batch_size=1000)
+
+    try:
+        cache.incr(_cle_version(couche))
+    except ValueError:
+        cache.set(_cle_version(couche), time.time_ns(), None)
+    return len(cellules)
+
+
+def construire_tuile(couche, z, x, y):
+    precision = precision_pour_zoom(z)
+    cellules = CelluleCarte.objects.filter(couche=couche, precision=precision).filter(
+        filtre_bbox(bbox_tuile(z, x, y), precision_max=precision)
+    ).order_by('geohash').values_list('geohash', 'latitude', 'longitude', 'nombre', 'objet_id')
+
+    regroupements = []
+    for geohash, latitude, longitude, nombre, objet_id in cellules:
+        regroupement = {
+            'geohash': geohash,
+            'latitude': round(latitude, 6),
+            'longitude': round(longitude, 6),
+            'nombre': nombre,
+        }
+        if objet_id is not None:
+            regroupement['id'] = objet_id
+        regroupements.append(regroupement)
+    return {'zoom': z, 'precision': precision, 'regroupements': regroupements}
+
+
+def get_tuile(couche, z, x, y):
+    """Tuile et son ETag, servis depuis le cache jusqu'à la prochaine reconstruction de la couche"""
+    cle = f'clients:carte:{couche}:{_version(couche)}:{z}:{x}:{y}'
+    tuile = cache.get(cle)
+    if tuile is None:
+        contenu = JSONRenderer().render(construire_tuile(couche, z, x, y))
+        tuile = {
+            'contenu': contenu,
+            'etag': '"{}"'.format(hashlib.sha1(contenu).hexdigest()),
+        }
+        cache.set(cle, tuile, TUILE_CACHE_TIMEOUT)
+    return tuile
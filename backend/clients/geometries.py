@@ -0,0 +1,123 @@
+"""
+Géométries des zones de collecte pour la carte
+
+À l'enregistrement d'une zone, son polygone est simplifié (Douglas-Peucker)
+pour quelques niveaux de zoom, avec une tolérance d'environ un pixel à ce
+zoom, et son emprise est calculée. La carte lit ces anneaux simplifiés en
+GeoJSON, mis en cache par niveau avec leur ETag ; le polygone brut n'est
+servi qu'au zoom le plus fin.
+"""
+import hashlib
+import time
+
+import numpy as np
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from ete_project.geo import douglas_peucker
+from .models import ZoneCollecte
+from .zonage import sommets_polygone
+
+NIVEAUX_ZOOM = (6, 9, 12, 15)
+METRES_PAR_PIXEL_ZOOM_0 = 156543.03
+GEOJSON_CACHE_TIMEOUT = 60 * 60 * 24
+VERSION_CACHE_KEY = 'clients:zones_geojson:version'
+
+
+def tolerance_pour_zoom(z):
+    """Un pixel de tuile (256 px) au zoom `z`, en mètres à l'équateur"""
+    return METRES_PAR_PIXEL_ZOOM_0 / 2 ** z
+
+
+def simplifier_anneau(sommets, tolerance_m):
+    """Anneau [[lat, lng], ...] simplifié, ou None s'il ne reste pas trois sommets"""
+    if np.array_equal(sommets[0], sommets[-1]):
+        sommets = sommets[:-1]
+    # L'anneau est fermé sur son premier sommet pour que Douglas-Peucker le traite d'un bout à l'autre
+    ferme = np.vstack([sommets, sommets[:1]])
+    garder = douglas_peucker(ferme[:, 0], ferme[:, 1], tolerance_m)[:-1]
+    if garder.sum() < 3:
+        return None
+    return np.round(sommets[garder], 6).tolist()
+
+
+def calculer_geometries(coordonnees):
+    """Anneaux simplifiés par niveau de zoom et emprise [min_lng, min_lat, max_lng, max_lat]"""
+    sommets = sommets_polygone(coordonnees)
+    if sommets is None:
+        return {}, []
+
+    geometries = {}
+    precedent = np.round(sommets, 6).tolist()
+    # Du plus fin au plus grossier : un niveau trop simplifié reprend le niveau plus fin
+    for zoom in sorted(NIVEAUX_ZOOM, reverse=True):
+        anneau = simplifier_anneau(sommets, tolerance_pour_zoom(zoom))
+        geometries[str(zoom)] = precedent = anneau or precedent
+
+    lats, lngs = sommets[:, 0], sommets[:, 1]
+    return geometries, [float(lngs.min()), float(lats.min()), float(lngs.max()), float(lats.max())]
+
+
+def anneau_pour_zoom(zone, z):
+    """Anneau de la zone au zoom `z` : le niveau simplifié juste au-dessus, ou le polygone brut"""
+    for zoom in sorted(NIVEAUX_ZOOM):
+        if z <= zoom and str(zoom) in zone.geometries_simplifiees:
+            return zone.geometries_simplifiees[str(zoom)]
+    sommets = sommets_polygone(zone.coordonnees_zone)
+    return None if sommets is None else sommets.tolist()
+
+
+def niveau_pour_zoom(z):
+    """Niveau de simplification servi au zoom `z` (None : polygone brut)"""
+    return next((zoom for zoom in sorted(NIVEAUX_ZOOM) if z <= zoom), None)
+
+
+def invalider_geojson_zones():
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, time.time_ns(), None)
+
+
+def construire_geojson(z):
+    """FeatureCollection des zones (coordonnées GeoJSON : [lng, lat], anneau fermé)"""
+    niveau = niveau_pour_zoom(z)
+    champs = ['id', 'nom_zone', 'code_zone', 'couleur', 'emprise', 'geometries_simplifiees']
+    if niveau is None:
+        champs.append('coordonnees_zone')
+
+    features = []
+    for zone in ZoneCollecte.objects.only(*champs).order_by('id'):
+        anneau = anneau_pour_zoom(zone, z)
+        if anneau is None:
+            continue
+        anneau = [[lng, lat] for lat, lng in anneau]
+        if anneau[0] != anneau[-1]:
+            anneau.append(anneau[0])
+        features.append({
+            'type': 'Feature',
+            'id': zone.id,
+            'bbox': zone.emprise,
+            'geometry': {'type': 'Polygon', 'coordinates': [anneau]},
+            'properties': {
+                'nom_zone': zone.nom_zone,
+                'code_zone': zone.code_zone,
+                'couleur': zone.couleur,
+            },
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def get_geojson_zones(z):
+    """GeoJSON des zones au zoom `z` et son ETag, en cache jusqu'à la prochaine modification d'une zone"""
+    cache.add(VERSION_CACHE_KEY, time.time_ns(), None)
+    cle = f'clients:zones_geojson:{cache.get(VERSION_CACHE_KEY)}:{niveau_pour_zoom(z)}'
+    geojson = cache.get(cle)
+    if geojson is None:
+        contenu = JSONRenderer().render(construire_geojson(z))
+        geojson = {
+            'contenu': contenu,
+            'etag': '"{}"'.format(hashlib.sha1(contenu).hexdigest()),
+        }
+        cache.set(cle, geojson, GEOJSON_CACHE_TIMEOUT)
+    return geojson
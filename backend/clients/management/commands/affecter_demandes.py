@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from clients.affectation import CHARGE_MAX, affecter_demandes
+
+
+class Command(BaseCommand):
+    help = "Affecte les demandes de prospection en attente aux agents les plus proches et les moins chargés"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--charge-max', type=int, default=CHARGE_MAX,
+            help=f"Demandes ouvertes au plus par agent (défaut : {CHARGE_MAX})"
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Calcule les affectations sans les enregistrer")
+
+    def handle(self, *args, **options):
+        resultat = affecter_demandes(appliquer=not options['dry_run'], charge_max=options['charge_max'])
+        prefixe = "[simulation] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefixe}{resultat['affectees']} demande(s) affectée(s) à {len(resultat['par_agent'])} agent(s), "
+            f"{resultat['non_affectees']} restée(s) en attente"
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from clients.carte import COUCHES, construire_cellules
+
+
+class Command(BaseCommand):
+    help = "Recalcule les cellules de la carte des clients et des bacs (à lancer périodiquement)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--couche', choices=list(COUCHES), help="Ne recalcule qu'une couche")
+
+    def handle(self, *args, **options):
+        couches = [options['couche']] if options['couche'] else list(COUCHES)
+        for couche in couches:
+            nombre = construire_cellules(couche)
+            self.stdout.write(self.style.SUCCESS(f"Carte « {couche} » : {nombre} cellule(s)"))
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from clients.visites import planifier_visites
+
+
+class Command(BaseCommand):
+    help = "Planifie les visites des agents de prospection pour une journée (demain par défaut)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Jour à planifier (AAAA-MM-JJ)")
+
+    def handle(self, *args, **options):
+        jour = timezone.localdate() + timedelta(days=1)
+        if options['date']:
+            try:
+                jour = parse_date(options['date'])
+            except ValueError:
+                jour = None
+            if jour is None:
+                raise CommandError("date invalide (AAAA-MM-JJ)")
+
+        plans = planifier_visites(jour)
+        visites = sum(len(plan['visites']) for plan in plans.values())
+        reportees = sum(len(plan['reportees']) for plan in plans.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"{jour:%d/%m/%Y} : {visites} visite(s) planifiée(s) pour {len(plans)} agent(s), "
+            f"{reportees} demande(s) reportée(s)"
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from clients.zonage import reaffecter_zones
+
+
+class Command(BaseCommand):
+    help = "Réaffecte clients et demandes de prospection à la zone dont le polygone contient leur position"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Compte les changements sans les enregistrer")
+
+    def handle(self, *args, **options):
+        resultats = reaffecter_zones(appliquer=not options['dry_run'])
+        prefixe = "[simulation] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefixe}{resultats['clients']} client(s) ont changé de zone, "
+            f"{resultats['demandes']} demande(s) de prospection réaffectée(s)"
+        ))
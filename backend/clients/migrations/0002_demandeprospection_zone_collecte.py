@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='demandeprospection',
+            name='zone_collecte',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='demandes_prospection', to='clients.zonecollecte'),
+        ),
+    ]
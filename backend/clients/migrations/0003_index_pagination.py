@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_demandeprospection_zone_collecte'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['date_inscription', 'id'], name='clients_cli_date_in_e52da2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='demandeprospection',
+            index=models.Index(fields=['date_demande', 'id'], name='clients_dem_date_de_b05dd5_idx'),
+        ),
+    ]
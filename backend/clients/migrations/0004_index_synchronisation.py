@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0003_index_pagination'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bacpoubelle',
+            index=models.Index(fields=['updated_at', 'id'], name='clients_bac_updated_b69e15_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['updated_at', 'id'], name='clients_cli_updated_bf75f6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contrat',
+            index=models.Index(fields=['updated_at', 'id'], name='clients_con_updated_6416df_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+from ete_project.geohash import remplir_geohash
+
+
+def remplir_geohashs(apps, schema_editor):
+    remplir_geohash(apps.get_model('clients', 'Client'), 'latitude', 'longitude')
+    remplir_geohash(apps.get_model('clients', 'DemandeProspection'), 'latitude', 'longitude')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0004_index_synchronisation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='demandeprospection',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['geohash', 'id'], name='clients_cli_geohash_6cfbc6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='demandeprospection',
+            index=models.Index(fields=['geohash', 'id'], name='clients_dem_geohash_8f4d17_idx'),
+        ),
+        migrations.RunPython(remplir_geohashs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0005_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CelluleCarte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('couche', models.CharField(choices=[('clients', 'Clients'), ('bacs', 'Bacs')], max_length=10)),
+                ('precision', models.PositiveSmallIntegerField()),
+                ('geohash', models.CharField(max_length=12)),
+                ('nombre', models.PositiveIntegerField()),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('objet_id', models.PositiveIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Cellule de carte',
+                'verbose_name_plural': 'Cellules de carte',
+                'unique_together': {('couche', 'precision', 'geohash')},
+            },
+        ),
+    ]
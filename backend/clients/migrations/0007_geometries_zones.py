@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:24
+
+from django.db import migrations, models
+
+from clients.geometries import calculer_geometries
+
+
+def calculer_geometries_zones(apps, schema_editor):
+    ZoneCollecte = apps.get_model('clients', 'ZoneCollecte')
+    zones = list(ZoneCollecte.objects.only('id', 'coordonnees_zone'))
+    for zone in zones:
+        zone.geometries_simplifiees, zone.emprise = calculer_geometries(zone.coordonnees_zone)
+    ZoneCollecte.objects.bulk_update(zones, ['geometries_simplifiees', 'emprise'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0006_cellule_carte'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='zonecollecte',
+            name='emprise',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='zonecollecte',
+            name='geometries_simplifiees',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(calculer_geometries_zones, migrations.RunPython.noop),
+    ]
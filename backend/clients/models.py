@@ -39,6 +39,8 @@ class Client(models.Model):
     # Coordonnées GPS pour la géolocalisation
     latitude = models.DecimalField(max_digits=10, decimal_places=8)
     longitude = models.DecimalField(max_digits=11, decimal_places=8)
+    # Geohash de la position (requêtes par boîte englobante)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
     
     # Zone de collecte assignée
     zone_collecte = models.ForeignKey(
@@ -81,6 +83,11 @@ class Client(models.Model):
         verbose_name = 'Client'
         verbose_name_plural = 'Clients'
         ordering = ['company_name', 'user__last_name']
+        indexes = [
+            models.Index(fields=['date_inscription', 'id']),
+            models.Index(fields=['updated_at', 'id']),
+            models.Index(fields=['geohash', 'id']),
+        ]
     
     def __str__(self):
         if self.company_name:
@@ -139,6 +146,9 @@ class Contrat(models.Model):
         verbose_name = 'Contrat'
         verbose_name_plural = 'Contrats'
         ordering = ['-date_debut']
+        indexes = [
+            models.Index(fields=['updated_at', 'id']),
+        ]
     
     def __str__(self):
         return f"Contrat {self.numero_contrat} - {self.client.display_name}"
@@ -164,6 +174,10 @@ class ZoneCollecte(models.Model):
     # Coordonnées du polygone de la zone
     coordonnees_zone = models.JSONField()  # Liste de coordonnées [lat, lng]
     
+    # Calculés à l'enregistrement (clients.geometries) : anneaux simplifiés par zoom, emprise
+    geometries_simplifiees = models.JSONField(default=dict, blank=True, editable=False)
+    emprise = models.JSONField(default=list, blank=True, editable=False)  # [min_lng, min_lat, max_lng, max_lat]
+    
     # Responsable de zone
     responsable = models.ForeignKey(
         User, 
@@ -186,7 +200,14 @@ class ZoneCollecte(models.Model):
     
     @property
     def nombre_clients(self):
+        """Nombre de clients (valeur annotée si disponible, sinon COUNT)"""
+        if hasattr(self, '_nombre_clients'):
+            return self._nombre_clients
         return self.clients.count()
+    
+    @nombre_clients.setter
+    def nombre_clients(self, valeur):
+        self._nombre_clients = valeur
 
 
 class BacPoubelle(models.Model):
@@ -228,6 +249,9 @@ class BacPoubelle(models.Model):
         verbose_name = 'Bac/Poubelle'
         verbose_name_plural = 'Bacs/Poubelles'
         ordering = ['client', 'numero_bac']
+        indexes = [
+            models.Index(fields=['updated_at', 'id']),
+        ]
     
     def __str__(self):
         return f"Bac {self.numero_bac} - {self.client.display_name}"
@@ -265,6 +289,17 @@ class DemandeProspection(models.Model):
     ville = models.CharField(max_length=100)
     latitude = models.DecimalField(max_digits=10, decimal_places=8, blank=True, null=True)
     longitude = models.DecimalField(max_digits=11, decimal_places=8, blank=True, null=True)
+    # Geohash de la position (requêtes par boîte englobante)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
+    
+    # Zone déduite de la position (index spatial des zones)
+    zone_collecte = models.ForeignKey(
+        ZoneCollecte,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='demandes_prospection'
+    )
     
     # Service souhaité
     type_service = models.CharField(max_length=30, choices=TYPE_SERVICE_CHOICES)
@@ -299,6 +334,39 @@ class DemandeProspection(models.Model):
         verbose_name = 'Demande de prospection'
         verbose_name_plural = 'Demandes de prospection'
         ordering = ['-date_demande']
+        indexes = [
+            models.Index(fields=['date_demande', 'id']),
+            models.Index(fields=['geohash', 'id']),
+        ]
     
     def __str__(self):
         return f"Demande {self.nom_complet} - {self.get_status_display()}"
+
+
+class CelluleCarte(models.Model):
+    """Nombre de clients ou de bacs par cellule geohash, précalculé pour chaque précision"""
+    
+    COUCHE_CHOICES = (
+        ('clients', 'Clients'),
+        ('bacs', 'Bacs'),
+    )
+    
+    couche = models.CharField(max_length=10, choices=COUCHE_CHOICES)
+    precision = models.PositiveSmallIntegerField()
+    geohash = models.CharField(max_length=12)
+    nombre = models.PositiveIntegerField()
+    
+    # Centre de gravité des points de la cellule
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    
+    # Objet représenté quand la cellule n'en contient qu'un
+    objet_id = models.PositiveIntegerField(blank=True, null=True)
+    
+    class Meta:
+        verbose_name = 'Cellule de carte'
+        verbose_name_plural = 'Cellules de carte'
+        unique_together = ['couche', 'precision', 'geohash']
+    
+    def __str__(self):
+        return f"{self.couche} {self.geohash} ({self.nombre})"
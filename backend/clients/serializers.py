@@ -1,10 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Count, Prefetch
+from ete_project.mixins import ChampsDynamiquesMixin, relations_utiles
 from .models import Client, Contrat, ZoneCollecte, BacPoubelle, DemandeProspection
 
 User = get_user_model()
 
-class ZoneCollecteSerializer(serializers.ModelSerializer):
+class ZoneCollecteSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour les zones de collecte"""
     
     nombre_clients = serializers.ReadOnlyField()
@@ -17,6 +19,26 @@ class ZoneCollecteSerializer(serializers.ModelSerializer):
             'coordonnees_zone', 'responsable', 'responsable_name',
             'nombre_clients', 'created_at', 'updated_at'
         ]
+        # Le polygone brut n'est lu qu'avec ?expand=coordonnees_zone (la carte lit /zones/geojson/)
+        champs_expansibles = ['coordonnees_zone']
+    
+    @classmethod
+    def optimiser_queryset(cls, queryset, champs=None):
+        """Responsable joint et nombre de clients annoté (pas de COUNT par zone)"""
+        if champs is None or 'responsable_name' in champs:
+            queryset = queryset.select_related('responsable')
+        if champs is None or 'nombre_clients' in champs:
+            queryset = queryset.annotate(nombre_clients=Count('clients'))
+        return queryset
+
+class ZoneCollecteListeSerializer(ZoneCollecteSerializer):
+    """Représentation compacte des zones pour les listes (sans polygone)"""
+    
+    class Meta(ZoneCollecteSerializer.Meta):
+        fields = [
+            'id', 'nom_zone', 'code_zone', 'couleur',
+            'responsable', 'responsable_name', 'nombre_clients'
+        ]
 
 class BacPoubelleSerializer(serializers.ModelSerializer):
     """Serializer pour les bacs/poubelles"""
@@ -48,7 +70,7 @@ class ContratSerializer(serializers.ModelSerializer):
             'is_active', 'created_at', 'updated_at'
         ]
 
-class ClientSerializer(serializers.ModelSerializer):
+class ClientSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     """Serializer pour les clients"""
     
     user_email = serializers.CharField(source='user.email', read_only=True)
@@ -76,6 +98,25 @@ class ClientSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['code_client', 'date_inscription']
+        champs_expansibles = ['contrats', 'bacs']
+    
+    RELATIONS_JOINTES = {
+        'user': ['user_email', 'user_phone', 'user_name'],
+        'zone_collecte': ['zone_nom'],
+        'agent_prospecteur': ['agent_prospecteur_name'],
+    }
+    
+    @classmethod
+    def optimiser_queryset(cls, queryset, champs=None):
+        """Relations simples jointes ; contrats et bacs préchargés en une requête chacun s'ils sont représentés"""
+        jointures = relations_utiles(champs, cls.RELATIONS_JOINTES)
+        if jointures:
+            queryset = queryset.select_related(*jointures)
+        if champs is None or 'contrats' in champs:
+            queryset = queryset.prefetch_related(Prefetch('contrats', queryset=Contrat.objects.all()))
+        if champs is None or 'bacs' in champs:
+            queryset = queryset.prefetch_related(Prefetch('bacs', queryset=BacPoubelle.objects.all()))
+        return queryset
     
     def create(self, validated_data):
         """Créer un nouveau client avec code automatique"""
@@ -84,6 +125,16 @@ class ClientSerializer(serializers.ModelSerializer):
         validated_data['code_client'] = f"CLI-{uuid.uuid4().hex[:8].upper()}"
         return super().create(validated_data)
 
+class ClientListeSerializer(ClientSerializer):
+    """Représentation compacte des clients pour les listes"""
+    
+    class Meta(ClientSerializer.Meta):
+        fields = [
+            'id', 'user', 'user_name', 'code_client', 'type_client', 'status',
+            'company_name', 'service_city', 'latitude', 'longitude',
+            'zone_collecte', 'zone_nom', 'date_inscription'
+        ]
+
 class DemandeProspectionSerializer(serializers.ModelSerializer):
     """Serializer pour les demandes de prospection"""
     
@@ -93,13 +144,13 @@ class DemandeProspectionSerializer(serializers.ModelSerializer):
         model = DemandeProspection
         fields = [
             'id', 'nom_complet', 'email', 'telephone', 'company_name',
-            'adresse', 'ville', 'latitude', 'longitude', 'type_service',
+            'adresse', 'ville', 'latitude', 'longitude', 'zone_collecte', 'type_service',
             'frequence_souhaitee', 'message', 'status', 'agent_assigne',
             'agent_assigne_name', 'date_demande', 'date_assignation',
             'date_visite_prevue', 'date_traitement', 'notes_agent',
             'raison_refus', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['date_demande', 'date_assignation', 'date_traitement']
+        read_only_fields = ['date_demande', 'date_assignation', 'date_traitement', 'zone_collecte']
     
     def validate_email(self, value):
         """Vérifier que l'email n'est pas déjà utilisé"""
@@ -0,0 +1,31 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Client, ZoneCollecte, DemandeProspection
+from ete_project.geohash import geohash_de
+from .zonage import zone_pour, invalider_index_zones
+from .geometries import calculer_geometries, invalider_geojson_zones
+
+@receiver(pre_save, sender=Client)
+@receiver(pre_save, sender=DemandeProspection)
+def affecter_zone_automatiquement(sender, instance, **kwargs):
+    """Affecte la zone contenant la position quand aucune zone n'est renseignée"""
+    if instance.zone_collecte_id is None and instance.latitude is not None and instance.longitude is not None:
+        instance.zone_collecte_id = zone_pour(instance.latitude, instance.longitude)
+
+@receiver(pre_save, sender=ZoneCollecte)
+def simplifier_geometries(sender, instance, **kwargs):
+    """Anneaux simplifiés par zoom et emprise à jour avec le polygone"""
+    instance.geometries_simplifiees, instance.emprise = calculer_geometries(instance.coordonnees_zone)
+
+@receiver(post_save, sender=ZoneCollecte)
+@receiver(post_delete, sender=ZoneCollecte)
+def invalider_zones(sender, **kwargs):
+    """Reconstruit l'index spatial et le GeoJSON des zones après modification d'une zone"""
+    invalider_index_zones()
+    invalider_geojson_zones()
+
+@receiver(pre_save, sender=Client)
+@receiver(pre_save, sender=DemandeProspection)
+def calculer_geohash(sender, instance, **kwargs):
+    """Geohash à jour avec la position"""
+    instance.geohash = geohash_de(instance.latitude, instance.longitude)
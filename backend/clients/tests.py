@@ -1,3 +1,122 @@
-from django.test import TestCase
+import numpy as np
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from .affectation import IndexAgents, repartir
+from .visites import horaires, inserer
+from .zonage import IndexZones, point_dans_polygone, points_dans_polygone, sommets_polygone
+
+CARRE = [[0, 0], [0, 1], [1, 1], [1, 0]]
+# Polygone concave en L : le coin (0,5 ; 1,5) est hors de la zone
+EN_L = [[0, 0], [0, 2], [1, 2], [1, 1], [2, 1], [2, 0]]
+
+
+class ZonageTest(SimpleTestCase):
+    """Point dans polygone, version vectorisée et recherche par la grille"""
+
+    def test_point_dans_polygone(self):
+        sommets = sommets_polygone(EN_L)
+        self.assertTrue(point_dans_polygone(0.5, 0.5, sommets))
+        self.assertTrue(point_dans_polygone(0.5, 1.5, sommets))
+        self.assertFalse(point_dans_polygone(1.5, 1.5, sommets))
+        self.assertFalse(point_dans_polygone(-0.1, 0.5, sommets))
+
+    def test_version_vectorisee_identique(self):
+        sommets = sommets_polygone(EN_L)
+        aleatoire = np.random.default_rng(0)
+        lats, lngs = aleatoire.uniform(-0.5, 2.5, 500), aleatoire.uniform(-0.5, 2.5, 500)
+        attendus = [point_dans_polygone(lat, lng, sommets) for lat, lng in zip(lats, lngs)]
+        self.assertEqual(points_dans_polygone(lats, lngs, sommets).tolist(), attendus)
+
+    def test_sommets_polygone(self):
+        self.assertEqual(
+            sommets_polygone([{'lat': 0, 'lng': 0}, {'lat': 0, 'lon': 1}, {'lat': 1, 'lng': 1}]).tolist(),
+            [[0, 0], [0, 1], [1, 1]]
+        )
+        # Moins de trois sommets exploitables : pas de polygone
+        self.assertIsNone(sommets_polygone([[0, 0], [1, 1], {'lat': 2}]))
+
+    def test_index_bords_de_grille(self):
+        droite = [[0, 1], [0, 2], [1, 2], [1, 1]]
+        index = IndexZones([(1, CARRE), (2, droite), (3, [[0, 0]])], taille_grille=4)
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.zone_pour(0.5, 0.5), 1)
+        self.assertEqual(index.zone_pour(0.5, 1.5), 2)
+        # Coin supérieur de l'emprise : dernière cellule, pas au-delà
+        self.assertEqual(index._cellule(1, 2), (3, 3))
+        self.assertEqual(index.zone_pour(0.999, 1.999), 2)
+        self.assertIsNone(index.zone_pour(1.5, 0.5))
+        self.assertIsNone(index.zone_pour(None, 0.5))
+        self.assertEqual(index.zones_pour([0.5, 0.5, 1.5], [0.5, 1.5, 0.5]).tolist(), [1, 2, 0])
+
+    def test_index_vide(self):
+        index = IndexZones([])
+        self.assertIsNone(index.zone_pour(0.5, 0.5))
+        self.assertEqual(index.zones_pour([0.5], [0.5]).tolist(), [0])
+
+
+class AffectationTest(SimpleTestCase):
+    """Agents les plus proches, équilibrage par la charge et plafond de demandes ouvertes"""
+
+    def setUp(self):
+        # Agent 10 à Tunis, agent 20 à Sousse, agent 30 sans point mais couvrant la zone 7
+        self.index = IndexAgents(
+            [10, 20, 30], {10: [(36.80, 10.18)], 20: [(35.83, 10.64), (35.82, 10.60)]}, {30: {7}}
+        )
+
+    def test_distances(self):
+        distances = self.index.distances(np.array([36.80, np.nan]), np.array([10.18, np.nan]), [None, 7])
+        self.assertAlmostEqual(distances[0, 0], 0)
+        self.assertGreater(distances[0, 1], 100)
+        # Demande de la zone 7 : à distance nulle de l'agent qui la couvre
+        self.assertEqual(distances[1, 2], 0)
+        self.assertEqual(distances[1, 0], 1000.0)
+        self.assertEqual(self.index.voisins(distances, k=2)[0].tolist(), [0, 1])
+
+    def test_plafond_de_charge(self):
+        distances = np.array([[0.0, 5.0, 50.0]] * 4)
+        voisins = self.index.voisins(distances, k=2)
+        charges = np.array([0, 0, 0])
+        choix = repartir(distances, voisins, charges, charge_max=1)
+        # Un seul par agent ; voisins pleins : un agent plus lointain ; tous pleins : -1
+        self.assertEqual(choix.tolist(), [0, 1, 2, -1])
+        self.assertEqual(charges.tolist(), [1, 1, 1])
+
+    def test_equilibrage_par_la_charge(self):
+        distances = np.array([[0.0, 0.4]] * 3)
+        charges = np.array([2, 0])
+        choix = repartir(distances, IndexAgents([1, 2], {}, {}).voisins(distances), charges)
+        # Le détour de 0,4 km l'emporte tant que l'agent proche a plus de demandes ouvertes
+        self.assertEqual(choix.tolist(), [1, 1, 0])
+        self.assertEqual(charges.tolist(), [3, 2])
+
+
+class VisitesTest(SimpleTestCase):
+    """Heures de visite dans les créneaux, insertion au moindre coût"""
+
+    def setUp(self):
+        # Point 0 : départ de l'agent ; trajets de 10 minutes entre deux points distincts
+        self.temps = np.full((4, 4), 10.0)
+        np.fill_diagonal(self.temps, 0)
+        self.durees = [0, 30, 30, 30]
+
+    def test_attente_jusqu_a_l_ouverture(self):
+        arrivees = horaires([1, 2], self.temps, [0, 600, 0, 0], [1050, 1050, 1050, 1050], self.durees, 510)
+        # Départ 8 h 30, arrivée 8 h 40, attente de l'ouverture à 10 h
+        self.assertEqual(arrivees, [600, 640])
+
+    def test_creneau_manque(self):
+        # Visite de 30 minutes qui dépasserait la fermeture de 9 h
+        self.assertIsNone(horaires([1], self.temps, [0, 0, 0, 0], [1050, 540, 1050, 1050], self.durees, 510))
+
+    def test_insertion_respecte_les_creneaux(self):
+        ouvertures = [0, 900, 0, 0]
+        fermetures = [1050, 1050, 560, 1050]
+        route, arrivees = inserer([1, 2, 3], self.temps, ouvertures, fermetures, self.durees, 510)
+        # La demande 2 ferme tôt : visitée en premier ; la 1 attend son ouverture à 15 h
+        self.assertEqual(route, [2, 3, 1])
+        self.assertEqual(arrivees, [520, 560, 900])
+
+    def test_demande_hors_journee_reportee(self):
+        fermetures = [1050, 1050, 1050, 1050]
+        route, _ = inserer([1, 2, 3], self.temps, [0, 1040, 0, 0], fermetures, self.durees, 510)
+        self.assertEqual(sorted(route), [2, 3])
@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     ClientViewSet, ContratViewSet, ZoneCollecteViewSet, 
-    BacPoubelleViewSet, DemandeProspectionViewSet
+    BacPoubelleViewSet, DemandeProspectionViewSet, CarteView
 )
 
 router = DefaultRouter()
@@ -14,4 +14,5 @@ router.register(r'demandes-prospection', DemandeProspectionViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('carte/<str:couche>/<int:z>/<int:x>/<int:y>/', CarteView.as_view(), name='carte'),
 ]
\ No newline at end of file
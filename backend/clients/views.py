@@ -4,24 +4,37 @@ from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.views import APIView
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.utils.dateparse import parse_date
 from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta
 
 from .models import Client, Contrat, ZoneCollecte, BacPoubelle, DemandeProspection
+from .affectation import affecter_demandes
+from .visites import planifier_visites
+from .carte import COUCHES, ZOOM_MAX, get_tuile
+from .geometries import get_geojson_zones
+from ete_project.filtres import FiltreBoiteEnglobante
+from ete_project.mixins import ChargementOptimiseMixin, optimiser_queryset
+from paiements.serializers import FactureSerializer
 from .serializers import (
-    ClientSerializer, ContratSerializer, ZoneCollecteSerializer,
+    ClientSerializer, ClientListeSerializer, ContratSerializer,
+    ZoneCollecteSerializer, ZoneCollecteListeSerializer,
     BacPoubelleSerializer, DemandeProspectionSerializer,
     ClientCreateFromProspectSerializer, ClientStatsSerializer
 )
 
 User = get_user_model()
 
-class ZoneCollecteViewSet(viewsets.ModelViewSet):
+class ZoneCollecteViewSet(ChargementOptimiseMixin, viewsets.ModelViewSet):
     """ViewSet pour la gestion des zones de collecte"""
     
     queryset = ZoneCollecte.objects.all()
     serializer_class = ZoneCollecteSerializer
+    serializer_liste_class = ZoneCollecteListeSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     search_fields = ['nom_zone', 'code_zone']
@@ -31,10 +44,36 @@ class ZoneCollecteViewSet(viewsets.ModelViewSet):
     def clients(self, request, pk=None):
         """Liste des clients dans cette zone"""
         zone = self.get_object()
-        clients = Client.objects.filter(zone_collecte=zone)
-        serializer = ClientSerializer(clients, many=True)
+        contexte = self.get_serializer_context()
+        clients = optimiser_queryset(
+            ClientSerializer(context=contexte), Client.objects.filter(zone_collecte=zone)
+        )
+        serializer = ClientSerializer(clients, many=True, context=contexte)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def geojson(self, request):
+        """Polygones des zones simplifiés pour le zoom (`?zoom=`), en GeoJSON avec ETag"""
+        try:
+            zoom = int(request.query_params.get('zoom', 0))
+        except ValueError:
+            zoom = -1
+        if not 0 <= zoom <= ZOOM_MAX:
+            return Response(
+                {'error': f'zoom invalide (0 à {ZOOM_MAX})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        geojson = get_geojson_zones(zoom)
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if geojson['etag'] in etags or '*' in etags:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(geojson['contenu'], content_type='application/geo+json')
+        response['ETag'] = geojson['etag']
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+    
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Statistiques des zones de collecte"""
@@ -45,14 +84,16 @@ class ZoneCollecteViewSet(viewsets.ModelViewSet):
         
         return Response(stats)
 
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(ChargementOptimiseMixin, viewsets.ModelViewSet):
     """ViewSet pour la gestion des clients"""
     
-    queryset = Client.objects.select_related('user', 'zone_collecte', 'agent_prospecteur').prefetch_related('contrats', 'bacs')
+    queryset = Client.objects.all()
     serializer_class = ClientSerializer
+    serializer_liste_class = ClientListeSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter, FiltreBoiteEnglobante]
     filterset_fields = ['type_client', 'status', 'zone_collecte']
+    champs_position = ('latitude', 'longitude')
     search_fields = ['code_client', 'company_name', 'user__first_name', 'user__last_name', 'user__email']
     ordering = ['-date_inscription']
     
@@ -100,11 +141,11 @@ class ClientViewSet(viewsets.ModelViewSet):
         
         # Clients sans paiement depuis 3 mois
         limite_inactivite = timezone.now() - timedelta(days=90)
-        clients_inactifs = Client.objects.filter(
+        clients_inactifs = self.preparer_queryset(Client.objects.filter(
             Q(dernier_paiement__lt=limite_inactivite) | Q(dernier_paiement__isnull=True)
-        ).filter(status='actif')
+        ).filter(status='actif'))
         
-        serializer = ClientSerializer(clients_inactifs, many=True)
+        serializer = self.get_serializer(clients_inactifs, many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
@@ -139,6 +180,9 @@ class ClientViewSet(viewsets.ModelViewSet):
             'client': ClientSerializer(client).data,
             'contrats': ContratSerializer(client.contrats.all(), many=True).data,
             'bacs': BacPoubelleSerializer(client.bacs.all(), many=True).data,
+            'factures': FactureSerializer(
+                client.factures.select_related('client', 'client__user', 'contrat').avec_soldes(), many=True
+            ).data,
         }
         
         return Response(data)
@@ -190,8 +234,9 @@ class DemandeProspectionViewSet(viewsets.ModelViewSet):
     
     queryset = DemandeProspection.objects.select_related('agent_assigne')
     serializer_class = DemandeProspectionSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter, FiltreBoiteEnglobante]
     filterset_fields = ['status', 'type_service']
+    champs_position = ('latitude', 'longitude')
     search_fields = ['nom_complet', 'email', 'company_name']
     ordering = ['-date_demande']
     
@@ -240,6 +285,57 @@ class DemandeProspectionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
+    @action(detail=False, methods=['post'])
+    def affecter_automatiquement(self, request):
+        """Affecter les demandes en attente aux agents de prospection les plus proches et les moins chargés"""
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Permission refusée'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        simulation = str(request.data.get('simulation', '')).lower() in ('1', 'true')
+        return Response(affecter_demandes(appliquer=not simulation))
+    
+    @action(detail=False, methods=['get', 'post'])
+    def mes_visites(self, request):
+        """Visites du jour de l'agent de prospection (POST : replanifier la journée)"""
+        if request.user.user_type != 'agent_prospection':
+            return Response(
+                {'error': 'Permission refusée'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        jour = timezone.localdate()
+        parametres = request.data if request.method == 'POST' else request.query_params
+        if parametres.get('date'):
+            try:
+                jour = parse_date(str(parametres['date']))
+            except ValueError:
+                jour = None  # date impossible (ex. 2024-02-30)
+            if jour is None:
+                return Response(
+                    {'error': 'date invalide (AAAA-MM-JJ)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        reportees = []
+        if request.method == 'POST':
+            # Le jour même, la journée repart de maintenant et de la dernière position de l'agent
+            plans = planifier_visites(
+                jour, agents_ids=[request.user.id], depuis_maintenant=jour == timezone.localdate()
+            )
+            reportees = plans.get(request.user.id, {}).get('reportees', [])
+        
+        visites = self.get_queryset().filter(
+            agent_assigne=request.user, date_visite_prevue__date=jour
+        ).order_by('date_visite_prevue')
+        return Response({
+            'date': jour,
+            'visites': self.get_serializer(visites, many=True).data,
+            'reportees': reportees,
+        })
+    
     @action(detail=True, methods=['post'])
     def creer_client(self, request, pk=None):
         """Créer un client à partir d'une demande de prospection"""
@@ -318,3 +414,36 @@ class DemandeProspectionViewSet(viewsets.ModelViewSet):
             'client_id': client.id,
             'code_client': client.code_client
         }, status=status.HTTP_201_CREATED)
+
+class CarteView(APIView):
+    """Tuile z/x/y de la carte des clients ou des bacs, regroupés par cellules (ETag, 304)"""
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, couche, z, x, y):
+        if request.user.user_type == 'client':
+            return Response(
+                {'error': 'Permission refusée'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        if couche not in COUCHES:
+            return Response(
+                {'error': f"Couche inconnue (choix : {', '.join(COUCHES)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if z > ZOOM_MAX or x >= 2 ** z or y >= 2 ** z:
+            return Response(
+                {'error': 'Tuile invalide'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        tuile = get_tuile(couche, z, x, y)
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if tuile['etag'] in etags or '*' in etags:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(tuile['contenu'], content_type='application/json')
+        response['ETag'] = tuile['etag']
+        response['Cache-Control'] = 'private, no-cache'
+        return response
@@ -0,0 +1,217 @@
+"""
+Planification des visites des agents de prospection
+
+Pour chaque agent, les demandes qui lui sont assignées et ne sont pas encore
+planifiées un autre jour sont placées dans sa journée par insertion au
+moindre coût : de la plus anciennement assignée à la plus récente, chaque
+demande est insérée à la position qui allonge le moins le trajet tout en
+respectant les créneaux de visite (heures ouvrables pour les entreprises et
+institutions) et la fin de journée. Les demandes qui ne tiennent pas dans la
+journée restent sans date et passent au jour suivant.
+
+Les temps de trajet viennent de la matrice des distances (vol d'oiseau ×
+facteur de détour, vitesse moyenne), mise en cache par ensemble de points.
+Les heures de visite sont écrites en un seul bulk_update.
+"""
+import hashlib
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.presence import agents_presents
+from collectes.optimisation import FACTEUR_DETOUR, VITESSE_MOYENNE_KMH, get_depot
+from ete_project.geo import matrice_distances
+from .models import DemandeProspection
+
+User = get_user_model()
+
+HEURE_DEBUT = time(8, 30)
+HEURE_FIN = time(17, 30)
+# Créneau de visite par type de demande (par défaut : toute la journée de l'agent)
+CRENEAUX = {
+    'entreprise_petite': (time(9, 0), time(17, 0)),
+    'entreprise_moyenne': (time(9, 0), time(17, 0)),
+    'entreprise_grande': (time(9, 0), time(16, 30)),
+    'institution': (time(9, 0), time(16, 0)),
+}
+DUREES_VISITE_MINUTES = {
+    'particulier_standard': 20,
+    'particulier_premium': 25,
+    'entreprise_petite': 30,
+    'entreprise_moyenne': 45,
+    'entreprise_grande': 60,
+    'institution': 45,
+}
+DUREE_VISITE_DEFAUT_MINUTES = 30
+MAX_DEMANDES_PAR_AGENT = 60
+MATRICE_CACHE_TIMEOUT = 60 * 60 * 24
+STATUTS_A_VISITER = ('assignee', 'en_cours')
+
+
+def _minutes(heure):
+    return heure.hour * 60 + heure.minute
+
+
+def matrice_temps(lats, lngs):
+    """Temps de trajet (minutes) entre tous les points, en cache par ensemble de points"""
+    coordonnees = np.round(np.column_stack([lats, lngs]).astype(float), 5)
+    cle = 'clients:visites:temps:{}'.format(hashlib.sha1(coordonnees.tobytes()).hexdigest())
+    temps = cache.get(cle)
+    if temps is None:
+        distances = matrice_distances(coordonnees[:, 0], coordonnees[:, 1])
+        temps = (distances * FACTEUR_DETOUR / VITESSE_MOYENNE_KMH * 60).astype(np.float32)
+        cache.set(cle, temps, MATRICE_CACHE_TIMEOUT)
+    return temps
+
+
+def horaires(route, temps, ouvertures, fermetures, durees, debut):
+    """Heures d'arrivée (minutes) de la route partant du point 0 à `debut`, ou None si un créneau est manqué"""
+    arrivees = []
+    courant, precedent = debut, 0
+    for point in route:
+        courant = max(courant + temps[precedent, point], ouvertures[point])
+        if courant + durees[point] > fermetures[point]:
+            return None
+        arrivees.append(courant)
+        courant += durees[point]
+        precedent = point
+    return arrivees
+
+
+def inserer(candidats, temps, ouvertures, fermetures, durees, debut):
+    """
+    Route construite par insertion au moindre coût : chaque candidat, dans
+    l'ordre de priorité, va à la position réalisable qui allonge le moins le
+    trajet. Retourne (route, heures d'arrivée).
+    """
+    route, arrivees = [], []
+    for candidat in candidats:
+        meilleure = None
+        for position in range(len(route) + 1):
+            avant = route[position - 1] if position else 0
+            allongement = temps[avant, candidat]
+            if position < len(route):
+                apres = route[position]
+                allongement += temps[candidat, apres] - temps[avant, apres]
+            if meilleure is not None and allongement >= meilleure[0]:
+                continue
+            essai = route[:position] + [candidat] + route[position:]
+            heures = horaires(essai, temps, ouvertures, fermetures, durees, debut)
+            if heures is not None:
+                meilleure = (allongement, essai, heures)
+        if meilleure is not None:
+            _, route, arrivees = meilleure
+    return route, arrivees
+
+
+def planifier_agent(depart, demandes, jour, debut=None):
+    """
+    Plan d'une journée : [(demande, heure de visite)] dans l'ordre de passage,
+    et les demandes qui n'y tiennent pas.
+    """
+    if not demandes:
+        return [], []
+    lats = [depart[0]] + [float(demande.latitude) for demande in demandes]
+    lngs = [depart[1]] + [float(demande.longitude) for demande in demandes]
+    temps = matrice_temps(lats, lngs)
+
+    fin = _minutes(HEURE_FIN)
+    ouvertures, fermetures, durees = [0], [fin], [0]
+    for demande in demandes:
+        ouverture, fermeture = CRENEAUX.get(demande.type_service, (HEURE_DEBUT, HEURE_FIN))
+        ouvertures.append(_minutes(ouverture))
+        fermetures.append(min(_minutes(fermeture), fin))
+        durees.append(DUREES_VISITE_MINUTES.get(demande.type_service, DUREE_VISITE_DEFAUT_MINUTES))
+
+    debut = max(_minutes(debut or HEURE_DEBUT), _minutes(HEURE_DEBUT))
+    route, arrivees = inserer(range(1, len(demandes) + 1), temps, ouvertures, fermetures, durees, debut)
+
+    minuit = _minuit(jour)
+    plan = [
+        (demandes[point - 1], (minuit + timedelta(minutes=round(float(arrivee)))))
+        for point, arrivee in zip(route, arrivees)
+    ]
+    planifiees = set(route)
+    reportees = [demande for point, demande in enumerate(demandes, 1) if point not in planifiees]
+    return plan, reportees
+
+
+def _minuit(jour):
+    return timezone.make_aware(datetime.combine(jour, time(0, 0)))
+
+
+def demandes_a_planifier(jour):
+    """Demandes assignées et pas encore traitées : sans visite, visite prévue ce jour-là ou déjà passée"""
+    return DemandeProspection.objects.filter(
+        status__in=STATUTS_A_VISITER, agent_assigne__isnull=False, date_traitement__isnull=True,
+        latitude__isnull=False, longitude__isnull=False,
+    ).filter(
+        Q(date_visite_prevue__isnull=True)
+        | Q(date_visite_prevue__gte=_minuit(jour), date_visite_prevue__lt=_minuit(jour + timedelta(days=1)))
+        | Q(date_visite_prevue__lt=_minuit(timezone.localdate()))
+    ).only(
+        'id', 'agent_assigne_id', 'latitude', 'longitude', 'type_service',
+        'date_assignation', 'date_visite_prevue', 'status'
+    ).order_by('date_assignation', 'id')
+
+
+def planifier_visites(jour, agents_ids=None, depuis_maintenant=False):
+    """
+    Planifie la journée `jour` des agents (tous ceux qui ont des demandes à
+    visiter par défaut). Avec `depuis_maintenant`, la journée repart de
+    l'heure actuelle et de la dernière position connue de l'agent.
+    Retourne le plan de chaque agent.
+    """
+    demandes = demandes_a_planifier(jour)
+    if agents_ids is not None:
+        demandes = demandes.filter(agent_assigne_id__in=agents_ids)
+    par_agent = defaultdict(list)
+    for demande in demandes:
+        if len(par_agent[demande.agent_assigne_id]) < MAX_DEMANDES_PAR_AGENT:
+            par_agent[demande.agent_assigne_id].append(demande)
+
+    # Départ : position du profil de l'agent, à défaut le dépôt
+    departs = {
+        agent_id: (float(lat), float(lng))
+        for agent_id, lat, lng in User.objects.filter(
+            id__in=par_agent, profile__latitude__isnull=False, profile__longitude__isnull=False
+        ).values_list('id', 'profile__latitude', 'profile__longitude')
+    }
+    debut = None
+    if depuis_maintenant:
+        debut = timezone.localtime().time()
+        for entree in agents_presents()['agents']:
+            if entree['agent'] in par_agent:
+                departs[entree['agent']] = (entree['latitude'], entree['longitude'])
+
+    depot = get_depot()
+    maintenant = timezone.now()
+    modifiees, plans = [], {}
+    for agent_id, demandes_agent in par_agent.items():
+        plan, reportees = planifier_agent(departs.get(agent_id, depot), demandes_agent, jour, debut)
+        for demande, heure in plan:
+            demande.date_visite_prevue = heure
+            demande.updated_at = maintenant
+            modifiees.append(demande)
+        for demande in reportees:
+            if demande.date_visite_prevue is not None:
+                demande.date_visite_prevue = None
+                demande.updated_at = maintenant
+                modifiees.append(demande)
+        plans[agent_id] = {
+            'visites': [{'demande': demande.id, 'heure': heure} for demande, heure in plan],
+            'reportees': [demande.id for demande in reportees],
+        }
+
+    if modifiees:
+        with transaction.atomic():
+            DemandeProspection.objects.bulk_update(
+                modifiees, ['date_visite_prevue', 'updated_at'], batch_size=500
+            )
+    return plans
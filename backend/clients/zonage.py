@@ -0,0 +1,226 @@
+"""
+Index spatial des zones de collecte (affectation point -> zone)
+
+Les polygones de `ZoneCollecte.coordonnees_zone` ([[lat, lng], ...]) sont
+indexés par boîtes englobantes et par une grille uniforme : une recherche
+ne teste que les quelques polygones dont la boîte couvre la cellule du point.
+Les réaffectations en masse utilisent un test point-dans-polygone vectorisé
+avec NumPy.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+TAILLE_GRILLE = 64
+TAILLE_LOT_UPDATE = 5000
+INDEX_VERSION_CACHE_KEY = 'clients:index_zones_version'
+
+
+def sommets_polygone(coordonnees):
+    """Normalise les coordonnées d'une zone en tableau (n, 2) de [lat, lng]"""
+    sommets = []
+    for point in coordonnees or []:
+        if isinstance(point, dict):
+            lat, lng = point.get('lat'), point.get('lng', point.get('lon'))
+        else:
+            lat, lng = point[0], point[1]
+        if lat is None or lng is None:
+            continue
+        sommets.append((float(lat), float(lng)))
+    if len(sommets) < 3:
+        return None
+    return np.array(sommets, dtype=float)
+
+
+def point_dans_polygone(lat, lng, sommets):
+    """Test pair-impair (ray casting) pour un point isolé"""
+    dedans = False
+    n = len(sommets)
+    j = n - 1
+    for i in range(n):
+        yi, xi = sommets[i]
+        yj, xj = sommets[j]
+        if (yi > lat) != (yj > lat) and lng < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            dedans = not dedans
+        j = i
+    return dedans
+
+
+def points_dans_polygone(lats, lngs, sommets):
+    """Test pair-impair vectorisé : une boucle par arête, vectorisée sur tous les points"""
+    dedans = np.zeros(lats.shape, dtype=bool)
+    suivants = np.roll(sommets, 1, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for (yi, xi), (yj, xj) in zip(sommets, suivants):
+            traverse = (yi > lats) != (yj > lats)
+            intersection = (xj - xi) * (lats - yi) / (yj - yi) + xi
+            dedans ^= traverse & (lngs < intersection)
+    return dedans
+
+
+class IndexZones:
+    """Index en mémoire des polygones de zones (boîtes englobantes + grille uniforme)"""
+
+    def __init__(self, zones, taille_grille=TAILLE_GRILLE):
+        # zones: itérable de (zone_id, coordonnees_zone)
+        self.zone_ids = []
+        self.polygones = []
+        for zone_id, coordonnees in zones:
+            sommets = sommets_polygone(coordonnees)
+            if sommets is not None:
+                self.zone_ids.append(zone_id)
+                self.polygones.append(sommets)
+
+        self.taille_grille = taille_grille
+        self.cellules = {}
+        if not self.polygones:
+            self.boites = np.empty((0, 4))
+            return
+
+        # Boîtes englobantes : lat_min, lng_min, lat_max, lng_max
+        self.boites = np.array([
+            (p[:, 0].min(), p[:, 1].min(), p[:, 0].max(), p[:, 1].max())
+            for p in self.polygones
+        ])
+        self.lat_min, self.lng_min = float(self.boites[:, 0].min()), float(self.boites[:, 1].min())
+        self.lat_max, self.lng_max = float(self.boites[:, 2].max()), float(self.boites[:, 3].max())
+        # Copies en tuples Python : l'accès élément par élément y est bien plus rapide
+        self._boites = [tuple(boite) for boite in self.boites.tolist()]
+        self._sommets = [[tuple(sommet) for sommet in p.tolist()] for p in self.polygones]
+        self.pas_lat = max(self.lat_max - self.lat_min, 1e-9) / taille_grille
+        self.pas_lng = max(self.lng_max - self.lng_min, 1e-9) / taille_grille
+
+        for position, (b_lat_min, b_lng_min, b_lat_max, b_lng_max) in enumerate(self.boites):
+            i0, j0 = self._cellule(b_lat_min, b_lng_min)
+            i1, j1 = self._cellule(b_lat_max, b_lng_max)
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    self.cellules.setdefault((i, j), []).append(position)
+
+    def __len__(self):
+        return len(self.zone_ids)
+
+    def _cellule(self, lat, lng):
+        i = min(int((lat - self.lat_min) / self.pas_lat), self.taille_grille - 1)
+        j = min(int((lng - self.lng_min) / self.pas_lng), self.taille_grille - 1)
+        return i, j
+
+    def zone_pour(self, lat, lng):
+        """Zone contenant le point, ou None"""
+        if lat is None or lng is None or not self.polygones:
+            return None
+        lat, lng = float(lat), float(lng)
+        if not (self.lat_min <= lat <= self.lat_max and self.lng_min <= lng <= self.lng_max):
+            return None
+        for position in self.cellules.get(self._cellule(lat, lng), ()):
+            b_lat_min, b_lng_min, b_lat_max, b_lng_max = self._boites[position]
+            if b_lat_min <= lat <= b_lat_max and b_lng_min <= lng <= b_lng_max:
+                if point_dans_polygone(lat, lng, self._sommets[position]):
+                    return self.zone_ids[position]
+        return None
+
+    def zones_pour(self, lats, lngs):
+        """
+        Zones de plusieurs points en une passe vectorisée.
+        Retourne un tableau d'identifiants de zone (0 si hors de toute zone).
+        """
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        resultat = np.zeros(lats.shape, dtype=np.int64)
+        for position, sommets in enumerate(self.polygones):
+            b_lat_min, b_lng_min, b_lat_max, b_lng_max = self.boites[position]
+            candidats = np.flatnonzero(
+                (resultat == 0)
+                & (lats >= b_lat_min) & (lats <= b_lat_max)
+                & (lngs >= b_lng_min) & (lngs <= b_lng_max)
+            )
+            if candidats.size:
+                dedans = points_dans_polygone(lats[candidats], lngs[candidats], sommets)
+                resultat[candidats[dedans]] = self.zone_ids[position]
+        return resultat
+
+
+_index = None
+_index_version = None
+
+
+def get_index_zones():
+    """Index des zones du processus, reconstruit quand une zone a changé"""
+    global _index, _index_version
+    from .models import ZoneCollecte
+
+    version = cache.get(INDEX_VERSION_CACHE_KEY, 0)
+    if _index is None or _index_version != version:
+        _index = IndexZones(ZoneCollecte.objects.order_by('id').values_list('id', 'coordonnees_zone'))
+        _index_version = version
+    return _index
+
+
+def invalider_index_zones():
+    """
+    Signale que les polygones ont changé. Les processus qui partagent le cache
+    reconstruisent leur index ; avec le cache local par défaut (LocMemCache),
+    seul le processus courant est prévenu : un déploiement multi-processus
+    doit configurer un cache partagé (Redis, Memcached).
+    """
+    try:
+        cache.incr(INDEX_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(INDEX_VERSION_CACHE_KEY, 1, None)
+
+
+def zone_pour(lat, lng):
+    """Identifiant de la zone contenant (lat, lng), ou None"""
+    return get_index_zones().zone_pour(lat, lng)
+
+
+def _reaffecter(queryset, appliquer=True):
+    """Recalcule la zone des lignes (id, latitude, longitude, zone_collecte_id) du queryset"""
+    lignes = list(
+        queryset.exclude(latitude__isnull=True).exclude(longitude__isnull=True)
+        .values_list('id', 'latitude', 'longitude', 'zone_collecte_id')
+    )
+    if not lignes:
+        return 0
+
+    ids = np.array([ligne[0] for ligne in lignes], dtype=np.int64)
+    lats = np.array([ligne[1] for ligne in lignes], dtype=float)
+    lngs = np.array([ligne[2] for ligne in lignes], dtype=float)
+    actuelles = np.array([ligne[3] or 0 for ligne in lignes], dtype=np.int64)
+
+    nouvelles = get_index_zones().zones_pour(lats, lngs)
+
+    # Les points hors de tout polygone gardent leur affectation actuelle
+    changements = (nouvelles != 0) & (nouvelles != actuelles)
+    if appliquer and changements.any():
+        from synchronisation.services import noter_changements_zone
+
+        with transaction.atomic():
+            # Une requête UPDATE par zone de destination (et par lot d'identifiants)
+            for zone_id in np.unique(nouvelles[changements]):
+                cibles = ids[changements & (nouvelles == zone_id)].tolist()
+                for i in range(0, len(cibles), TAILLE_LOT_UPDATE):
+                    queryset.model.objects.filter(id__in=cibles[i:i + TAILLE_LOT_UPDATE]).update(
+                        zone_collecte_id=int(zone_id), updated_at=timezone.now()
+                    )
+            # update() ne déclenche pas les signaux : les applications de l'ancienne zone retirent la ligne
+            noter_changements_zone(queryset.model, dict(zip(
+                ids[changements].tolist(), actuelles[changements].tolist()
+            )))
+    return int(changements.sum())
+
+
+def reaffecter_zones(appliquer=True):
+    """
+    Réaffecte en masse clients et demandes de prospection à la zone qui les contient.
+    Les bacs suivent la position (et donc la zone) de leur client. Lancé par
+    la commande `reaffecter_zones` après une modification des polygones, pas
+    pendant la requête qui enregistre la zone.
+    """
+    from .models import Client, DemandeProspection
+
+    return {
+        'clients': _reaffecter(Client.objects.all(), appliquer),
+        'demandes': _reaffecter(DemandeProspection.objects.all(), appliquer),
+    }
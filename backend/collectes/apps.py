@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CollectesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'collectes'
+    
+    def ready(self):
+        import collectes.signals
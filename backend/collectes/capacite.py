@@ -0,0 +1,343 @@
+"""
+Répartition des tournées selon la capacité des véhicules
+
+La charge de chaque arrêt est estimée en poids (moyenne des quantités
+relevées lors des dernières collectes, à défaut volume des bacs × densité)
+et en volume (bacs actifs × taux de remplissage). Quand les tournées d'une
+zone dépassent la capacité de leurs véhicules, des véhicules libres du jour
+(hors véhicules attitrés des équipes, comme pour la planification) sont
+ajoutés (les plus grands d'abord) avec une équipe de la zone, puis les
+arrêts sont répartis par balayage angulaire autour du dépôt : chaque
+véhicule reçoit un secteur contigu dont la charge est proportionnelle à sa
+capacité. L'ordre de passage de chaque tournée est ensuite optimisé ; les
+arrêts sans position restent sur leur tournée, en fin de parcours.
+
+Pour chaque tournée, la courbe de remplissage prévue donne la charge
+cumulée après chaque arrêt, en pourcentage de la capacité du véhicule.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Avg, Sum
+from django.utils import timezone
+
+from clients.models import BacPoubelle
+from rapports.services import invalider_compteurs
+from temps_reel.evenements import publier_collectes, publier_tournees
+from .journee import invalider_journee
+from .models import Tournee, Collecte
+from .optimisation import get_depot, heures_de_passage, optimiser_ordre
+from .planification import AffectationRessources
+
+HISTORIQUE_JOURS = 90
+TAUX_REMPLISSAGE_BACS = 0.8
+DENSITE_KG_PAR_LITRE = 0.15
+LITRES_PAR_DEFAUT = 240
+# Volume utile : les bennes compactent les déchets
+FACTEURS_COMPACTION = {'camion_compacteur': 3.0}
+# Part de la capacité réellement planifiée (marge pour les écarts d'estimation)
+TAUX_CAPACITE_UTILE = 0.9
+TEMPS_OPTIMISATION = 0.3
+
+
+def charges_clients(collectes):
+    """Charge estimée {client_id: (kg, m³)} des clients des collectes (queryset)"""
+    clients = collectes.values('client_id')
+    litres = dict(
+        BacPoubelle.objects.filter(client_id__in=clients, status='actif')
+        .values('client_id').annotate(litres=Sum('capacite_litres')).values_list('client_id', 'litres')
+    )
+    historiques = dict(
+        Collecte.objects.filter(
+            client_id__in=clients, status='completee', quantite_estimee__isnull=False,
+            tournee__date_tournee__gte=timezone.localdate() - timedelta(days=HISTORIQUE_JOURS)
+        ).values('client_id').annotate(kg=Avg('quantite_estimee')).values_list('client_id', 'kg')
+    )
+
+    charges = {}
+    for client_id in collectes.values_list('client_id', flat=True):
+        volume_litres = (litres.get(client_id) or LITRES_PAR_DEFAUT) * TAUX_REMPLISSAGE_BACS
+        kg = historiques.get(client_id)
+        kg = float(kg) if kg is not None else volume_litres * DENSITE_KG_PAR_LITRE
+        charges[client_id] = (kg, volume_litres / 1000)
+    return charges
+
+
+def charge_totale(collectes, charges):
+    """Charge (kg, m³) cumulée des collectes"""
+    return np.array([charges[collecte.client_id] for collecte in collectes], dtype=float).reshape(-1, 2).sum(axis=0)
+
+
+def capacite_vehicule(vehicule):
+    """Capacité planifiable (kg, m³) d'un véhicule"""
+    compaction = FACTEURS_COMPACTION.get(vehicule.type_vehicule, 1.0)
+    return (
+        float(vehicule.capacite_charge) * TAUX_CAPACITE_UTILE,
+        float(vehicule.capacite_volume) * compaction * TAUX_CAPACITE_UTILE,
+    )
+
+
+def courbe_remplissage(charges, capacite):
+    """Charge cumulée après chaque arrêt (kg, m³, % de la capacité la plus contraignante)"""
+    cumul = np.cumsum(np.asarray(charges, dtype=float).reshape(-1, 2), axis=0)
+    taux = (cumul / np.asarray(capacite, dtype=float)).max(axis=1) * 100 if len(cumul) else np.zeros(0)
+    return [
+        {'ordre': rang + 1, 'charge_kg': round(kg, 1), 'volume_m3': round(m3, 2), 'taux': round(float(t), 1)}
+        for rang, ((kg, m3), t) in enumerate(zip(cumul.tolist(), taux))
+    ]
+
+
+def resume_remplissage(courbe):
+    """Taux final et premier arrêt où le véhicule serait plein"""
+    return {
+        'taux_final': courbe[-1]['taux'] if courbe else 0.0,
+        'arret_plein': next((point['ordre'] for point in courbe if point['taux'] > 100), None),
+    }
+
+
+def balayage(lats, lngs, depot):
+    """Arrêts triés par angle autour du dépôt, en commençant après le plus grand secteur vide"""
+    lat0, lng0 = depot
+    angles = np.arctan2(np.asarray(lats) - lat0, (np.asarray(lngs) - lng0) * np.cos(np.radians(lat0)))
+    ordre = np.argsort(angles)
+    if len(ordre) < 2:
+        return ordre
+    tries = angles[ordre]
+    ecarts = np.diff(np.concatenate([tries, tries[:1] + 2 * np.pi]))
+    return np.roll(ordre, -(int(ecarts.argmax()) + 1))
+
+
+def repartir_arrets(lats, lngs, charges, capacites, depot):
+    """
+    Groupes d'arrêts (indices) par véhicule : secteurs angulaires contigus dont
+    la charge est proportionnelle à la capacité du véhicule. Les arrêts qui ne
+    tiennent plus nulle part vont au véhicule le moins rempli (surcharge).
+    """
+    charges = np.asarray(charges, dtype=float).reshape(-1, 2)
+    capacites = np.asarray(capacites, dtype=float).reshape(-1, 2)
+    # Dimension la plus contraignante (poids ou volume) pour le partage
+    contrainte = int((charges.sum(axis=0) / capacites.sum(axis=0)).argmax())
+    cibles = charges[:, contrainte].sum() * capacites[:, contrainte] / capacites[:, contrainte].sum()
+
+    groupes = [[] for _ in capacites]
+    remplis = np.zeros_like(capacites)
+    vehicule = 0
+    for arret in balayage(lats, lngs, depot):
+        # Secteur suivant quand la cible est atteinte ou que l'arrêt ne tient plus
+        while vehicule < len(capacites) - 1 and (
+            remplis[vehicule, contrainte] + charges[arret, contrainte] / 2 > cibles[vehicule]
+            or (remplis[vehicule] + charges[arret] > capacites[vehicule]).any()
+        ):
+            vehicule += 1
+        cible = vehicule
+        if (remplis[cible] + charges[arret] > capacites[cible]).any():
+            cible = int((remplis / capacites).max(axis=1).argmin())
+        groupes[cible].append(int(arret))
+        remplis[cible] += charges[arret]
+    return groupes
+
+
+def _tournee_supplementaire(tournee, equipe, vehicule, rang):
+    return Tournee(
+        nom_tournee=f"{tournee.nom_tournee} - véhicule {rang}",
+        date_tournee=tournee.date_tournee,
+        heure_debut_prevue=tournee.heure_debut_prevue,
+        heure_fin_prevue=equipe.heure_fin,
+        equipe_assignee=equipe,
+        vehicule_assigne=vehicule,
+        zone_collecte_id=tournee.zone_collecte_id,
+    )
+
+
+def repartir_zone(tournees, collectes, charges, ressources, vehicules_libres, depot, appliquer=True):
+    """
+    Répartit les collectes planifiées d'une zone entre ses tournées du jour,
+    en ajoutant des tournées si la capacité manque (véhicule attitré de
+    l'équipe s'il est libre, sinon un véhicule libre).
+    Une tournée n'est ajoutée que pour une équipe de la zone encore sans
+    tournée ce jour-là ; faute d'équipe ou de véhicule, la zone reste en
+    surcharge (signalée par `arret_plein`).
+    Retourne (tournées, groupes de collectes par tournée, tournées créées).
+    """
+    jour = tournees[0].date_tournee
+    charge = charge_totale(collectes, charges)
+    capacites = [capacite_vehicule(tournee.vehicule_assigne) for tournee in tournees]
+
+    creees = []
+    while (charge > np.sum(capacites, axis=0)).any():
+        equipe = ressources.choisir_equipe(jour, tournees[0].zone_collecte_id)
+        if equipe is None or ressources.charge[(jour, equipe.id)] > 0:
+            # L'équipe la moins chargée conduit déjà un véhicule ce jour-là
+            break
+        vehicule = equipe.vehicule_assigne
+        if vehicule is None or not vehicule.is_operational or vehicule.id in ressources.vehicules_utilises[jour]:
+            if not vehicules_libres:
+                break
+            vehicule = vehicules_libres.pop(0)
+        ressources.reserver(jour, equipe.id, vehicule.id)
+        nouvelle = _tournee_supplementaire(tournees[0], equipe, vehicule, len(tournees) + len(creees) + 1)
+        creees.append(nouvelle)
+        capacites.append(capacite_vehicule(vehicule))
+
+    if creees and appliquer:
+        for tournee in creees:
+            tournee.save()
+
+    lats = [float(collecte.client.latitude) for collecte in collectes]
+    lngs = [float(collecte.client.longitude) for collecte in collectes]
+    groupes = repartir_arrets(lats, lngs, [charges[c.client_id] for c in collectes], capacites, depot)
+    return tournees + creees, [[collectes[i] for i in groupe] for groupe in groupes], creees
+
+
+def ordonner(tournee, collectes, charges, depot):
+    """Ordre et heures de passage des collectes de la tournée ; retourne distance et courbe"""
+    if not collectes:
+        return 0.0, []
+    ordre, cumul_km = optimiser_ordre(
+        [collecte.client.latitude for collecte in collectes],
+        [collecte.client.longitude for collecte in collectes],
+        depot, temps_max=TEMPS_OPTIMISATION
+    )
+    heures = heures_de_passage(tournee.date_tournee, tournee.heure_debut_prevue, cumul_km)
+    ordonnees = []
+    for rang, (position, heure) in enumerate(zip(ordre, heures)):
+        collecte = collectes[position]
+        collecte.tournee = tournee
+        collecte.ordre_passage = rang + 1
+        collecte.heure_passage_prevue = heure
+        ordonnees.append(collecte)
+    collectes[:] = ordonnees
+    courbe = courbe_remplissage(
+        [charges[collecte.client_id] for collecte in collectes], capacite_vehicule(tournee.vehicule_assigne)
+    )
+    return float(cumul_km[-1]), courbe
+
+
+def rapport_tournee(tournee, collectes, distance_km, courbe):
+    return {
+        'tournee': tournee.id,
+        'nom_tournee': tournee.nom_tournee,
+        'vehicule': tournee.vehicule_assigne.numero_plaque,
+        'nombre_arrets': len(collectes),
+        'distance_km': round(distance_km, 2),
+        **resume_remplissage(courbe),
+        'courbe': courbe,
+    }
+
+
+def repartir_tournees(jour, zone_id=None, appliquer=True):
+    """
+    Vérifie la capacité des tournées planifiées du jour et répartit les zones
+    en dépassement entre véhicules. Retourne, par tournée, le nombre d'arrêts
+    et la courbe de remplissage prévue.
+    """
+    tournees = Tournee.objects.filter(date_tournee=jour, status='planifiee').select_related('vehicule_assigne')
+    if zone_id is not None:
+        tournees = tournees.filter(zone_collecte_id=zone_id)
+    tournees = list(tournees.order_by('zone_collecte_id', 'id'))
+    resultat = {'tournees': [], 'tournees_creees': 0, 'zones_reparties': 0, 'collectes_sans_position': 0}
+    if not tournees:
+        return resultat
+
+    requete = Collecte.objects.filter(tournee__in=tournees, status='planifiee')
+    charges = charges_clients(requete)
+    collectes_par_tournee = defaultdict(list)
+    for collecte in requete.select_related('client').only(
+        'id', 'tournee_id', 'client_id', 'ordre_passage', 'heure_passage_prevue', 'status', 'heure_arrivee', 'heure_depart',
+        'client__latitude', 'client__longitude'
+    ).order_by('ordre_passage'):
+        collectes_par_tournee[collecte.tournee_id].append(collecte)
+
+    # Réservations partagées avec la planification : les véhicules attitrés
+    # des équipes ne sont jamais proposés à une autre équipe
+    ressources = AffectationRessources()
+    for tournee_id, equipe_id, vehicule_id in Tournee.objects.filter(date_tournee=jour).exclude(
+        status='annulee'
+    ).values_list('id', 'equipe_assignee_id', 'vehicule_assigne_id'):
+        ressources.reserver(jour, equipe_id, vehicule_id)
+    vehicules_libres = sorted(
+        (v for v in ressources.vehicules_libres if v.id not in ressources.vehicules_utilises[jour]),
+        key=lambda vehicule: capacite_vehicule(vehicule), reverse=True
+    )
+
+    par_zone = defaultdict(list)
+    for tournee in tournees:
+        par_zone[tournee.zone_collecte_id].append(tournee)
+
+    depot = get_depot()
+    maintenant = timezone.now()
+    modifiees, tournees_modifiees = [], []
+    with transaction.atomic():
+        for zone_tournees in par_zone.values():
+            collectes, sans_position = [], defaultdict(list)
+            for tournee in zone_tournees:
+                for collecte in collectes_par_tournee[tournee.id]:
+                    if collecte.client.latitude is None or collecte.client.longitude is None:
+                        sans_position[tournee.id].append(collecte)
+                    else:
+                        collectes.append(collecte)
+            depasse = any(
+                (charge_totale(collectes_par_tournee[tournee.id], charges) > capacite_vehicule(tournee.vehicule_assigne)).any()
+                for tournee in zone_tournees
+            )
+            if not depasse or not collectes:
+                # Capacité suffisante : la répartition actuelle est conservée
+                for tournee in zone_tournees:
+                    arrets = collectes_par_tournee[tournee.id]
+                    courbe = courbe_remplissage(
+                        [charges[c.client_id] for c in arrets], capacite_vehicule(tournee.vehicule_assigne)
+                    )
+                    resultat['tournees'].append(rapport_tournee(tournee, arrets, 0.0, courbe))
+                continue
+
+            zone_tournees, groupes, creees = repartir_zone(
+                zone_tournees, collectes, charges, ressources, vehicules_libres, depot, appliquer
+            )
+            resultat['zones_reparties'] += 1
+            resultat['tournees_creees'] += len(creees)
+            for tournee, groupe in zip(zone_tournees, groupes):
+                distance_km, courbe = ordonner(tournee, groupe, charges, depot)
+                # Arrêts sans position : gardés sur leur tournée, après les arrêts placés
+                restes = sans_position.get(tournee.id, [])
+                for rang, collecte in enumerate(restes, start=len(groupe) + 1):
+                    collecte.ordre_passage = rang
+                resultat['collectes_sans_position'] += len(restes)
+                for collecte in groupe + restes:
+                    collecte.updated_at = maintenant
+                modifiees.extend(groupe + restes)
+                tournee.nombre_clients_prevus = len(groupe) + len(restes)
+                tournee.updated_at = maintenant
+                tournees_modifiees.append(tournee)
+                resultat['tournees'].append(rapport_tournee(tournee, groupe, distance_km, courbe))
+
+        if appliquer and modifiees:
+            Collecte.objects.bulk_update(
+                modifiees, ['tournee', 'ordre_passage', 'heure_passage_prevue', 'updated_at'], batch_size=500
+            )
+            Tournee.objects.bulk_update(tournees_modifiees, ['nombre_clients_prevus', 'updated_at'])
+            # bulk_update ne déclenche pas les signaux
+            invalider_journee(jour)
+            invalider_compteurs()
+            publier_tournees(tournees_modifiees)
+            publier_collectes(modifiees, {})
+    return resultat
+
+
+def remplissage_tournee(tournee):
+    """Courbe de remplissage prévue de la tournée dans son ordre de passage actuel"""
+    collectes = tournee.collectes.exclude(status__in=['ratee', 'reportee']).order_by('ordre_passage')
+    charges = charges_clients(collectes)
+    capacite = capacite_vehicule(tournee.vehicule_assigne)
+    courbe = courbe_remplissage(
+        [charges[client_id] for client_id in collectes.values_list('client_id', flat=True)], capacite
+    )
+    return {
+        'tournee': tournee.id,
+        'vehicule': tournee.vehicule_assigne.numero_plaque,
+        'capacite_kg': round(float(capacite[0]), 1),
+        'capacite_m3': round(float(capacite[1]), 2),
+        **resume_remplissage(courbe),
+        'courbe': courbe,
+    }
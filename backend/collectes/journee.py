@@ -0,0 +1,142 @@
+"""
+Journée d'un agent de terrain en une seule réponse
+
+Tournées du jour, collectes dans l'ordre de passage, adresses et coordonnées
+des clients, bacs et consignes des contrats en cours sont lus en un nombre
+fixe de requêtes, puis mis en cache par (agent, jour) avec leur ETag.
+
+Le cache est versionné plutôt que supprimé clé par clé : une modification
+de collecte change la version de son jour ; une modification de client, de
+bac ou de contrat celle des zones des tournées où passe le client (chaque
+journée en cache garde les versions des zones de ses tournées) ; une
+modification de tournée, d'équipe, de véhicule ou de zone celle de toutes
+les journées. Les écritures en masse (bulk_create, bulk_update, update) ne
+passent pas par les signaux et appellent `invalider_journee` elles-mêmes.
+
+Une journée inchangée est servie depuis le cache sans autre requête que le
+chargement de l'utilisateur par l'authentification JWT.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db.models import Prefetch, Q
+from rest_framework.renderers import JSONRenderer
+
+from agents.models import Agent
+from clients.models import BacPoubelle, Contrat
+from .models import Tournee, Collecte
+from .serializers import TourneeJourneeSerializer
+
+JOURNEE_CACHE_TIMEOUT = 60 * 60 * 24
+VERSION_GLOBALE_CACHE_KEY = 'collectes:journee:version'
+AGENT_CACHE_KEY = 'collectes:journee:agent'
+
+
+def _cle_version_jour(jour):
+    return f'{VERSION_GLOBALE_CACHE_KEY}:{jour:%Y-%m-%d}'
+
+
+def _cle_version_zone(zone_id):
+    return f'{VERSION_GLOBALE_CACHE_KEY}:zone:{zone_id}'
+
+
+def _version(cle):
+    # Une version perdue (éviction) repart d'une valeur nouvelle, jamais d'une ancienne
+    cache.add(cle, time.time_ns(), None)
+    return cache.get(cle)
+
+
+def invalider_journee(jour=None):
+    """Périme les journées en cache d'un jour donné, ou de tous les jours si `jour` est None"""
+    cle = VERSION_GLOBALE_CACHE_KEY if jour is None else _cle_version_jour(jour)
+    try:
+        cache.incr(cle)
+    except ValueError:
+        cache.set(cle, time.time_ns(), None)
+
+
+def invalider_journees_zones(zone_ids):
+    """Périme les journées dont une tournée passe dans l'une des zones"""
+    for zone_id in set(zone_ids) - {None}:
+        cle = _cle_version_zone(zone_id)
+        try:
+            cache.incr(cle)
+        except ValueError:
+            cache.set(cle, time.time_ns(), None)
+
+
+def _versions_zones(zone_ids):
+    for zone_id in zone_ids:
+        cache.add(_cle_version_zone(zone_id), time.time_ns(), None)
+    versions = cache.get_many([_cle_version_zone(zone_id) for zone_id in zone_ids])
+    return {str(zone_id): versions.get(_cle_version_zone(zone_id)) for zone_id in zone_ids}
+
+
+def est_agent(user):
+    """L'utilisateur a-t-il une fiche agent ? (en cache : la journée est interrogée en boucle)"""
+    cle = f'{AGENT_CACHE_KEY}:{user.pk}'
+    agent = cache.get(cle)
+    if agent is None:
+        agent = Agent.objects.filter(user_id=user.pk).exists()
+        cache.set(cle, agent, JOURNEE_CACHE_TIMEOUT)
+    return agent
+
+
+def invalider_agent(user_id):
+    cache.delete(f'{AGENT_CACHE_KEY}:{user_id}')
+
+
+def tournees_de_l_agent(user, jour):
+    """Tournées du jour des équipes dont l'utilisateur est membre ou chef"""
+    return Tournee.objects.filter(date_tournee=jour).filter(
+        Q(equipe_assignee__membres__user=user) | Q(equipe_assignee__chef_equipe__user=user)
+    ).exclude(status='annulee').distinct()
+
+
+def construire_journee(user, jour):
+    """Contenu de la journée : quatre requêtes, quel que soit le nombre de collectes"""
+    collectes = Collecte.objects.select_related('client', 'client__user').prefetch_related(
+        Prefetch('client__bacs', queryset=BacPoubelle.objects.filter(status='actif').order_by('id')),
+        Prefetch(
+            'client__contrats',
+            queryset=Contrat.objects.filter(
+                status='actif', date_debut__lte=jour, date_fin__gte=jour
+            ).order_by('id')
+        ),
+    ).order_by('ordre_passage', 'id')
+
+    tournees = tournees_de_l_agent(user, jour).select_related(
+        'equipe_assignee', 'vehicule_assigne', 'zone_collecte'
+    ).prefetch_related(
+        Prefetch('collectes', queryset=collectes)
+    ).order_by('heure_debut_prevue', 'id')
+
+    return {
+        'date': jour,
+        'tournees': TourneeJourneeSerializer(tournees, many=True).data,
+    }
+
+
+def get_journee(user, jour):
+    """
+    Journée de l'agent et son ETag, servies depuis le cache tant qu'aucune
+    donnée sous-jacente n'a changé.
+    """
+    cle = 'collectes:journee:{}:{:%Y-%m-%d}:{}:{}'.format(
+        user.pk, jour, _version(VERSION_GLOBALE_CACHE_KEY), _version(_cle_version_jour(jour))
+    )
+    journee = cache.get(cle)
+    if journee is not None and _versions_zones(list(journee['zones'])) == journee['zones']:
+        return journee
+
+    # Versions lues avant la construction : une modification pendant celle-ci périme le résultat
+    zones = _versions_zones(sorted(set(tournees_de_l_agent(user, jour).values_list('zone_collecte_id', flat=True))))
+    contenu = JSONRenderer().render(construire_journee(user, jour))
+    journee = {
+        'contenu': contenu,
+        'etag': '"{}"'.format(hashlib.sha1(contenu).hexdigest()),
+        'zones': zones,
+    }
+    cache.set(cle, journee, JOURNEE_CACHE_TIMEOUT)
+    return journee
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from collectes.planification import planifier_tournees
+
+
+class Command(BaseCommand):
+    help = "Génère les tournées et collectes des contrats actifs sur un horizon de plusieurs jours"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-debut', help="Premier jour planifié (AAAA-MM-JJ, défaut : demain)")
+        parser.add_argument('--jours', type=int, default=7, help="Nombre de jours à planifier (défaut : 7)")
+
+    def handle(self, *args, **options):
+        if options['date_debut']:
+            try:
+                date_debut = parse_date(options['date_debut'])
+            except ValueError:
+                date_debut = None
+            if date_debut is None:
+                raise CommandError("Date invalide, format attendu : AAAA-MM-JJ")
+        else:
+            date_debut = timezone.localdate() + timedelta(days=1)
+        if options['jours'] < 1:
+            raise CommandError("--jours doit être supérieur ou égal à 1")
+
+        resultat = planifier_tournees(date_debut, options['jours'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultat['tournees_creees']} tournée(s) et {resultat['collectes_creees']} collecte(s) créées"
+        ))
+        if resultat['non_planifiees']:
+            self.stdout.write(self.style.WARNING(
+                f"{resultat['non_planifiees']} tournée(s) non planifiée(s) faute d'équipe ou de véhicule disponible"
+            ))
+        if resultat['contrats_sans_zone']:
+            self.stdout.write(self.style.WARNING(
+                f"{resultat['contrats_sans_zone']} contrat(s) ignoré(s) : client sans zone de collecte"
+            ))
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from collectes.capacite import repartir_tournees
+
+
+class Command(BaseCommand):
+    help = "Répartit entre véhicules les tournées planifiées d'un jour qui dépassent la capacité de leur véhicule"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Jour à répartir (AAAA-MM-JJ, défaut : demain)")
+        parser.add_argument('--zone', type=int, help="Limiter à une zone de collecte (id)")
+        parser.add_argument('--dry-run', action='store_true', help="Calculer la répartition sans l'enregistrer")
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                jour = parse_date(options['date'])
+            except ValueError:
+                jour = None
+            if jour is None:
+                raise CommandError("Date invalide, format attendu : AAAA-MM-JJ")
+        else:
+            jour = timezone.localdate() + timedelta(days=1)
+
+        resultat = repartir_tournees(jour, options['zone'], appliquer=not options['dry_run'])
+        for rapport in resultat['tournees']:
+            ligne = (
+                f"{rapport['nom_tournee']} ({rapport['vehicule']}) : {rapport['nombre_arrets']} arrêt(s), "
+                f"remplissage {rapport['taux_final']} %"
+            )
+            if rapport['arret_plein']:
+                self.stdout.write(self.style.WARNING(f"{ligne}, plein à l'arrêt {rapport['arret_plein']}"))
+            else:
+                self.stdout.write(ligne)
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultat['zones_reparties']} zone(s) répartie(s), {resultat['tournees_creees']} tournée(s) créée(s)"
+            + (" (simulation)" if options['dry_run'] else "")
+        ))
+        if resultat['collectes_sans_position']:
+            self.stdout.write(self.style.WARNING(
+                f"{resultat['collectes_sans_position']} collecte(s) sans position laissée(s) en fin de tournée"
+            ))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0002_alter_agent_poste'),
+        ('clients', '0002_demandeprospection_zone_collecte'),
+        ('collectes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='collecte',
+            unique_together={('tournee', 'client')},
+        ),
+        migrations.AddIndex(
+            model_name='tournee',
+            index=models.Index(fields=['date_tournee', 'zone_collecte'], name='collectes_t_date_to_edc2cb_idx'),
+        ),
+    ]
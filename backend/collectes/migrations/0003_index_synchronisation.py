@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0002_alter_agent_poste'),
+        ('clients', '0004_index_synchronisation'),
+        ('collectes', '0002_planification_tournees'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='collecte',
+            index=models.Index(fields=['updated_at', 'id'], name='collectes_c_updated_d697ba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tournee',
+            index=models.Index(fields=['updated_at', 'id'], name='collectes_t_updated_dc34f6_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectes', '0003_index_synchronisation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collecte',
+            name='resultat_uuid',
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:15
+
+from django.db import migrations, models
+
+from ete_project.geohash import remplir_geohash
+
+
+def remplir_geohashs(apps, schema_editor):
+    remplir_geohash(apps.get_model('collectes', 'Collecte'), 'latitude_collecte', 'longitude_collecte')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0005_geohash'),
+        ('collectes', '0004_collecte_resultat_uuid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collecte',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='collecte',
+            index=models.Index(fields=['geohash', 'id'], name='collectes_c_geohash_c91ba5_idx'),
+        ),
+        migrations.RunPython(remplir_geohashs, migrations.RunPython.noop),
+    ]
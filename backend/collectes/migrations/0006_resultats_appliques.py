@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def reprendre_resultats_appliques(apps, schema_editor):
+    Collecte = apps.get_model('collectes', 'Collecte')
+    ResultatApplique = apps.get_model('collectes', 'ResultatApplique')
+    ResultatApplique.objects.bulk_create([
+        ResultatApplique(uuid=resultat_uuid, collecte_id=collecte_id)
+        for collecte_id, resultat_uuid in Collecte.objects.filter(
+            resultat_uuid__isnull=False
+        ).values_list('id', 'resultat_uuid').iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectes', '0005_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultatApplique',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(unique=True)),
+                ('date_application', models.DateTimeField(auto_now_add=True)),
+                ('collecte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resultats_appliques', to='collectes.collecte')),
+            ],
+            options={
+                'verbose_name': 'Résultat appliqué',
+                'verbose_name_plural': 'Résultats appliqués',
+            },
+        ),
+        migrations.RunPython(reprendre_resultats_appliques, migrations.RunPython.noop),
+    ]
@@ -46,6 +46,10 @@ class Tournee(models.Model):
         verbose_name = 'Tournée'
         verbose_name_plural = 'Tournées'
         ordering = ['-date_tournee', 'heure_debut_prevue']
+        indexes = [
+            models.Index(fields=['date_tournee', 'zone_collecte']),
+            models.Index(fields=['updated_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.nom_tournee} - {self.date_tournee}"
@@ -112,6 +116,8 @@ class Collecte(models.Model):
     # Géolocalisation
     latitude_collecte = models.DecimalField(max_digits=10, decimal_places=8, blank=True, null=True)
     longitude_collecte = models.DecimalField(max_digits=11, decimal_places=8, blank=True, null=True)
+    # Geohash de la position (requêtes par boîte englobante)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
     
     # Photos et preuves
     photo_avant = models.ImageField(upload_to='collectes/photos/', blank=True, null=True)
@@ -121,6 +127,9 @@ class Collecte(models.Model):
     notes_agent = models.TextField(blank=True)
     commentaire_client = models.TextField(blank=True)
     
+    # Dernier résultat transmis par l'application mobile (rejeu sans effet)
+    resultat_uuid = models.UUIDField(blank=True, null=True, unique=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -128,6 +137,11 @@ class Collecte(models.Model):
         verbose_name = 'Collecte'
         verbose_name_plural = 'Collectes'
         ordering = ['tournee', 'ordre_passage']
+        unique_together = ['tournee', 'client']
+        indexes = [
+            models.Index(fields=['updated_at', 'id']),
+            models.Index(fields=['geohash', 'id']),
+        ]
     
     def __str__(self):
         return f"Collecte {self.client.display_name} - {self.tournee.date_tournee}"
@@ -142,6 +156,21 @@ class Collecte(models.Model):
         return None
 
 
+class ResultatApplique(models.Model):
+    """Résultat transmis par l'application mobile et déjà appliqué (rejeu sans effet, même ancien)"""
+    
+    uuid = models.UUIDField(unique=True)
+    collecte = models.ForeignKey(Collecte, on_delete=models.CASCADE, related_name='resultats_appliques')
+    date_application = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Résultat appliqué'
+        verbose_name_plural = 'Résultats appliqués'
+    
+    def __str__(self):
+        return f"{self.uuid} - collecte {self.collecte_id}"
+
+
 class ReclamationCollecte(models.Model):
     """Réclamations liées aux collectes"""
     
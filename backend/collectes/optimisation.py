@@ -0,0 +1,188 @@
+"""
+Optimisation de l'ordre de passage des tournées
+
+Plus proche voisin depuis le dépôt, puis amélioration locale 2-opt et
+Or-opt (déplacement de segments de 1 à 3 arrêts). Les deltas sont évalués
+de façon vectorisée sur la matrice de distances, ce qui permet de traiter
+plusieurs centaines d'arrêts en moins d'une seconde.
+"""
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ete_project.geo import matrice_distances
+from .journee import invalider_journee
+
+EPSILON = 1e-9
+# Paramètres d'estimation des heures de passage
+VITESSE_MOYENNE_KMH = 25
+FACTEUR_DETOUR = 1.3  # distance routière / distance à vol d'oiseau
+DUREE_ARRET_MINUTES = 4
+
+
+def get_depot():
+    """Coordonnées (lat, lng) du dépôt de départ des véhicules"""
+    config = settings.ETE_CONFIG
+    depot = config.get('DEPOT', config['DEFAULT_MAP_CENTER'])
+    return float(depot['lat']), float(depot['lng'])
+
+
+def longueur_tournee(ordre, distances):
+    """Longueur du circuit fermé (retour au dépôt inclus)"""
+    ordre = np.asarray(ordre)
+    return float(distances[ordre, np.roll(ordre, -1)].sum())
+
+
+def plus_proche_voisin(distances, depart=0):
+    """Circuit initial : toujours aller au point non visité le plus proche"""
+    n = len(distances)
+    visite = np.zeros(n, dtype=bool)
+    ordre = [depart]
+    visite[depart] = True
+    courant = depart
+    for _ in range(n - 1):
+        candidats = np.where(visite, np.inf, distances[courant])
+        courant = int(candidats.argmin())
+        visite[courant] = True
+        ordre.append(courant)
+    return np.array(ordre)
+
+
+def deux_opt(ordre, distances, echeance=None):
+    """Inverse des segments tant que cela raccourcit le circuit (le dépôt reste en tête)"""
+    ordre = np.array(ordre)
+    n = len(ordre)
+    if n < 4:
+        return ordre
+
+    ameliore = True
+    while ameliore:
+        ameliore = False
+        for i in range(1, n - 1):
+            if echeance and time.monotonic() > echeance:
+                return ordre
+            j = np.arange(i + 1, n)
+            a, b = ordre[i - 1], ordre[i]
+            c, d = ordre[j], ordre[(j + 1) % n]
+            deltas = distances[a, c] + distances[b, d] - distances[a, b] - distances[c, d]
+            k = int(deltas.argmin())
+            if deltas[k] < -EPSILON:
+                ordre[i:j[k] + 1] = ordre[i:j[k] + 1][::-1]
+                ameliore = True
+    return ordre
+
+
+def or_opt(ordre, distances, longueur_max=3, echeance=None):
+    """Déplace des segments de 1 à `longueur_max` arrêts vers leur meilleure position"""
+    ordre = np.array(ordre)
+    n = len(ordre)
+
+    ameliore = True
+    while ameliore:
+        ameliore = False
+        for longueur in range(1, longueur_max + 1):
+            i = 1
+            while i + longueur <= n:
+                if echeance and time.monotonic() > echeance:
+                    return ordre
+                segment = ordre[i:i + longueur]
+                precedent, suivant = ordre[i - 1], ordre[(i + longueur) % n]
+                premier, dernier = segment[0], segment[-1]
+                gain = (
+                    distances[precedent, premier] + distances[dernier, suivant]
+                    - distances[precedent, suivant]
+                )
+
+                reste = np.concatenate([ordre[:i], ordre[i + longueur:]])
+                u, v = reste, np.roll(reste, -1)
+                couts = distances[u, premier] + distances[dernier, v] - distances[u, v]
+                couts_inverses = distances[u, dernier] + distances[premier, v] - distances[u, v]
+                couts[i - 1] = couts_inverses[i - 1] = np.inf  # position d'origine
+
+                k = int(couts.argmin())
+                k_inv = int(couts_inverses.argmin())
+                if couts_inverses[k_inv] < couts[k]:
+                    k, segment, cout = k_inv, segment[::-1], couts_inverses[k_inv]
+                else:
+                    cout = couts[k]
+
+                if cout - gain < -EPSILON:
+                    ordre = np.concatenate([reste[:k + 1], segment, reste[k + 1:]])
+                    ameliore = True
+                else:
+                    i += 1
+    return ordre
+
+
+def optimiser_ordre(lats, lngs, depot=None, temps_max=0.8):
+    """
+    Ordre de visite optimisé des points (indices dans lats/lngs).
+    Retourne (ordre, distances_cumulees_km) ; le dépôt n'apparaît pas dans l'ordre.
+    """
+    depot = depot or get_depot()
+    lats = np.concatenate([[depot[0]], np.asarray(lats, dtype=float)])
+    lngs = np.concatenate([[depot[1]], np.asarray(lngs, dtype=float)])
+    distances = matrice_distances(lats, lngs)
+
+    echeance = time.monotonic() + temps_max
+    ordre = plus_proche_voisin(distances)
+    meilleure = longueur_tournee(ordre, distances)
+    while time.monotonic() < echeance:
+        ordre = or_opt(deux_opt(ordre, distances, echeance), distances, echeance=echeance)
+        longueur = longueur_tournee(ordre, distances)
+        if longueur >= meilleure - EPSILON:
+            break
+        meilleure = longueur
+
+    troncons = distances[ordre[:-1], ordre[1:]]
+    cumul = np.concatenate([[0.0], np.cumsum(troncons)])
+    return ordre[1:] - 1, cumul[1:]
+
+
+def heures_de_passage(jour, heure_debut, cumul_km):
+    """Heures de passage estimées pour les distances cumulées depuis le dépôt"""
+    debut = datetime.combine(jour, heure_debut)
+    minutes_par_km = 60 * FACTEUR_DETOUR / VITESSE_MOYENNE_KMH
+    return [
+        (debut + timedelta(minutes=km * minutes_par_km + rang * DUREE_ARRET_MINUTES)).time().replace(microsecond=0)
+        for rang, km in enumerate(cumul_km)
+    ]
+
+
+def optimiser_tournee(tournee, depot=None):
+    """
+    Calcule l'ordre de passage d'une tournée et met à jour `ordre_passage`
+    et `heure_passage_prevue` de toutes ses collectes en un seul bulk_update.
+    """
+    collectes = list(tournee.collectes.select_related('client').only(
+        'id', 'ordre_passage', 'heure_passage_prevue', 'client__latitude', 'client__longitude'
+    ))
+    if not collectes:
+        return {'nombre_arrets': 0, 'distance_km': 0}
+
+    lats = [collecte.client.latitude for collecte in collectes]
+    lngs = [collecte.client.longitude for collecte in collectes]
+    ordre, cumul_km = optimiser_ordre(lats, lngs, depot)
+
+    heures = heures_de_passage(tournee.date_tournee, tournee.heure_debut_prevue, cumul_km)
+    maintenant = timezone.now()
+    for rang, (position, heure) in enumerate(zip(ordre, heures)):
+        collecte = collectes[position]
+        collecte.ordre_passage = rang + 1
+        collecte.heure_passage_prevue = heure
+        collecte.updated_at = maintenant
+
+    with transaction.atomic():
+        type(collectes[0]).objects.bulk_update(
+            collectes, ['ordre_passage', 'heure_passage_prevue', 'updated_at'], batch_size=500
+        )
+    invalider_journee(tournee.date_tournee)
+
+    return {
+        'nombre_arrets': len(collectes),
+        'distance_km': round(float(cumul_km[-1]) * FACTEUR_DETOUR, 2),
+    }
@@ -0,0 +1,265 @@
+"""
+Planification en masse des tournées à partir des contrats actifs
+
+Chaque contrat actif est déplié sur l'horizon demandé selon sa fréquence et
+ses jours de collecte, puis les passages sont regroupés en une tournée par
+(jour, zone). Les insertions se font par bulk_create dans des transactions
+par jour ; relancer la planification sur le même horizon ne crée que les
+tournées et collectes manquantes.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from functools import lru_cache
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from agents.models import Equipe, Vehicule
+from clients.models import Contrat
+from rapports.services import invalider_compteurs
+from .journee import invalider_journee
+from .models import Tournee, Collecte
+
+TAILLE_LOT = 2000
+
+JOURS_SEMAINE = {
+    'lundi': 0, 'mardi': 1, 'mercredi': 2, 'jeudi': 3,
+    'vendredi': 4, 'samedi': 5, 'dimanche': 6,
+}
+
+
+def numeros_jours(jours):
+    """Convertit ['lundi', 'mercredi', ...] en numéros de jour (0 = lundi) triés"""
+    numeros = {JOURS_SEMAINE[j.strip().lower()] for j in jours or [] if j and j.strip().lower() in JOURS_SEMAINE}
+    return tuple(sorted(numeros))
+
+
+@lru_cache(maxsize=1024)
+def dates_planifiees(frequence, jours, date_debut, date_fin):
+    """
+    Dates de passage d'un motif (fréquence, jours) sur l'horizon.
+    Mis en cache : des milliers de contrats partagent les mêmes motifs.
+    """
+    jours = jours or tuple(range(7))
+    if frequence == 'quotidien':
+        retenus = set(jours)
+    elif frequence == 'bi_hebdomadaire':
+        retenus = set(jours[:2])
+    else:
+        retenus = {jours[0]}
+
+    dates = []
+    jour = date_debut
+    while jour <= date_fin:
+        if jour.weekday() in retenus:
+            if frequence == 'bi_mensuel' and jour.isocalendar()[1] % 2:
+                pass  # une semaine sur deux (semaines ISO paires)
+            elif frequence == 'mensuel' and jour.day > 7:
+                pass  # première occurrence du jour dans le mois
+            else:
+                dates.append(jour)
+        jour += timedelta(days=1)
+    return tuple(dates)
+
+
+def passages_a_planifier(date_debut, date_fin):
+    """
+    Passages {(jour, zone_id): {client_id: heure_passage}} des contrats actifs.
+    Un client ayant plusieurs contrats n'a qu'un passage par jour (le plus tôt).
+    """
+    passages = defaultdict(dict)
+    sans_zone = 0
+    contrats = Contrat.objects.filter(
+        status='actif', date_debut__lte=date_fin, date_fin__gte=date_debut,
+        client__status='actif'
+    ).values_list(
+        'client_id', 'client__zone_collecte_id', 'frequence_collecte',
+        'jours_collecte', 'heure_passage', 'date_debut', 'date_fin'
+    )
+
+    for client_id, zone_id, frequence, jours, heure, debut_contrat, fin_contrat in contrats.iterator(chunk_size=TAILLE_LOT):
+        if zone_id is None:
+            sans_zone += 1
+            continue
+        for jour in dates_planifiees(frequence, numeros_jours(jours), date_debut, date_fin):
+            if debut_contrat <= jour <= fin_contrat:
+                clients = passages[(jour, zone_id)]
+                if client_id not in clients or heure < clients[client_id]:
+                    clients[client_id] = heure
+    return passages, sans_zone
+
+
+class AffectationRessources:
+    """
+    Choix d'une équipe et d'un véhicule par (jour, zone), en répartissant la charge.
+    Un véhicule n'est réservé qu'une fois par jour ; les véhicules attitrés des
+    équipes actives restent hors du parc libre.
+    """
+
+    def __init__(self):
+        self.equipes_par_zone = defaultdict(list)
+        equipes = Equipe.objects.filter(is_active=True).select_related('vehicule_assigne').prefetch_related('zones_intervention')
+        for equipe in equipes:
+            equipe.jours_numeros = numeros_jours(equipe.jours_travail) or tuple(range(7))
+            for zone in equipe.zones_intervention.all():
+                self.equipes_par_zone[zone.id].append(equipe)
+        attitres = Equipe.objects.filter(is_active=True, vehicule_assigne__isnull=False).values('vehicule_assigne')
+        self.vehicules_libres = list(
+            Vehicule.objects.filter(status='operationnel').exclude(id__in=attitres).order_by('id')
+        )
+        self.charge = defaultdict(int)  # (jour, equipe_id) -> nombre de tournées
+        self.vehicules_utilises = defaultdict(set)  # jour -> ids de véhicules
+
+    def reserver(self, jour, equipe_id, vehicule_id):
+        """Prend en compte une tournée déjà existante"""
+        self.charge[(jour, equipe_id)] += 1
+        self.vehicules_utilises[jour].add(vehicule_id)
+
+    def choisir_equipe(self, jour, zone_id):
+        """Équipe de la zone travaillant ce jour-là qui a le moins de tournées"""
+        candidates = [e for e in self.equipes_par_zone.get(zone_id, []) if jour.weekday() in e.jours_numeros]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda e: (self.charge[(jour, e.id)], e.id))
+
+    def vehicule_libre(self, jour):
+        """Premier véhicule du parc libre non réservé ce jour-là"""
+        return next((v for v in self.vehicules_libres if v.id not in self.vehicules_utilises[jour]), None)
+
+    def vehicule_de(self, equipe, jour):
+        """Véhicule attitré de l'équipe s'il est disponible ce jour-là, sinon un véhicule libre"""
+        vehicule = equipe.vehicule_assigne
+        if vehicule is not None and vehicule.is_operational and vehicule.id not in self.vehicules_utilises[jour]:
+            return vehicule
+        return self.vehicule_libre(jour)
+
+    def choisir(self, jour, zone_id):
+        equipe = self.choisir_equipe(jour, zone_id)
+        if equipe is None:
+            return None
+
+        vehicule = self.vehicule_de(equipe, jour)
+        if vehicule is None:
+            return None
+
+        self.reserver(jour, equipe.id, vehicule.id)
+        return equipe, vehicule
+
+
+def _nom_tournee(zone_id, jour):
+    return f"Tournée planifiée zone {zone_id} - {jour:%d/%m/%Y}"
+
+
+def planifier_tournees(date_debut, nombre_jours=7):
+    """
+    Génère tournées et collectes des contrats actifs sur [date_debut, date_debut + nombre_jours[.
+    Idempotent : les tournées (jour, zone) et collectes (tournée, client) existantes sont réutilisées.
+    """
+    date_fin = date_debut + timedelta(days=nombre_jours - 1)
+    passages, sans_zone = passages_a_planifier(date_debut, date_fin)
+    ressources = AffectationRessources()
+
+    # Tournées déjà présentes sur l'horizon (la première de chaque jour et zone reçoit les nouveaux passages)
+    existantes = {}
+    for tournee in Tournee.objects.filter(
+        date_tournee__range=[date_debut, date_fin], status__in=['planifiee', 'en_cours']
+    ).order_by('id').only('id', 'date_tournee', 'zone_collecte_id', 'equipe_assignee_id', 'vehicule_assigne_id'):
+        existantes.setdefault((tournee.date_tournee, tournee.zone_collecte_id), tournee.id)
+        ressources.reserver(tournee.date_tournee, tournee.equipe_assignee_id, tournee.vehicule_assigne_id)
+
+    resultat = {'tournees_creees': 0, 'collectes_creees': 0, 'non_planifiees': 0, 'contrats_sans_zone': sans_zone}
+    par_jour = defaultdict(list)
+    for jour, zone_id in passages:
+        par_jour[jour].append(zone_id)
+
+    for jour in sorted(par_jour):
+        with transaction.atomic():
+            a_creer = []
+            for zone_id in sorted(par_jour[jour]):
+                if (jour, zone_id) in existantes:
+                    continue
+                affectation = ressources.choisir(jour, zone_id)
+                if affectation is None:
+                    resultat['non_planifiees'] += 1
+                    continue
+                equipe, vehicule = affectation
+                heures = passages[(jour, zone_id)].values()
+                a_creer.append(Tournee(
+                    nom_tournee=_nom_tournee(zone_id, jour),
+                    date_tournee=jour,
+                    heure_debut_prevue=min(min(heures), equipe.heure_debut),
+                    heure_fin_prevue=equipe.heure_fin,
+                    equipe_assignee=equipe,
+                    vehicule_assigne=vehicule,
+                    zone_collecte_id=zone_id,
+                    nombre_clients_prevus=len(passages[(jour, zone_id)]),
+                ))
+            Tournee.objects.bulk_create(a_creer, batch_size=TAILLE_LOT)
+            resultat['tournees_creees'] += len(a_creer)
+
+            # bulk_create renvoie les identifiants sur SQLite et PostgreSQL ; ailleurs,
+            # relecture limitée aux tournées planifiées (une tournée annulée ou
+            # terminée du même nom ne doit pas recevoir les collectes)
+            if any(tournee.pk is None for tournee in a_creer):
+                for tournee_id, zone_id in Tournee.objects.filter(
+                    date_tournee=jour, status='planifiee',
+                    zone_collecte_id__in=[t.zone_collecte_id for t in a_creer],
+                    nom_tournee__in=[t.nom_tournee for t in a_creer],
+                ).order_by('-id').values_list('id', 'zone_collecte_id'):
+                    existantes.setdefault((jour, zone_id), tournee_id)
+            else:
+                for tournee in a_creer:
+                    existantes[(jour, tournee.zone_collecte_id)] = tournee.pk
+
+            zones_du_jour = [zone_id for zone_id in par_jour[jour] if (jour, zone_id) in existantes]
+            # Une zone répartie sur plusieurs véhicules (collectes.capacite) a plusieurs tournées
+            deja_planifies = set(Collecte.objects.filter(
+                tournee__date_tournee=jour, tournee__zone_collecte_id__in=zones_du_jour,
+                tournee__status__in=['planifiee', 'en_cours']
+            ).values_list('tournee__zone_collecte_id', 'client_id'))
+
+            collectes = []
+            for zone_id in zones_du_jour:
+                tournee_id = existantes[(jour, zone_id)]
+                rang = 0
+                for client_id, heure in sorted(passages[(jour, zone_id)].items(), key=lambda item: (item[1], item[0])):
+                    rang += 1
+                    if (zone_id, client_id) in deja_planifies:
+                        continue
+                    collectes.append(Collecte(
+                        tournee_id=tournee_id,
+                        client_id=client_id,
+                        heure_passage_prevue=heure,
+                        ordre_passage=rang,
+                    ))
+            # ignore_conflicts : seules les lignes réellement insérées sont comptées
+            touchees = {collecte.tournee_id for collecte in collectes}
+            avant = Collecte.objects.filter(tournee_id__in=touchees).count() if touchees else 0
+            Collecte.objects.bulk_create(collectes, batch_size=TAILLE_LOT, ignore_conflicts=True)
+            inserees = Collecte.objects.filter(tournee_id__in=touchees).count() - avant if touchees else 0
+            resultat['collectes_creees'] += inserees
+
+            if inserees:
+                # Tournées existantes complétées : nombre de clients prévus recompté
+                nombres = Collecte.objects.filter(
+                    tournee=OuterRef('pk')
+                ).order_by().values('tournee').annotate(nombre=Count('id')).values('nombre')
+                Tournee.objects.filter(id__in=touchees).update(
+                    nombre_clients_prevus=Coalesce(Subquery(nombres), 0),
+                    updated_at=timezone.now()
+                )
+
+        # bulk_create ne déclenche pas les signaux : journées en cache à périmer
+        if a_creer or collectes:
+            invalider_journee(jour)
+
+    if resultat['tournees_creees']:
+        invalider_compteurs()
+    return resultat
+
+
+def planifier_semaine_prochaine():
+    """Planification de la semaine à venir (à partir de demain)"""
+    return planifier_tournees(timezone.localdate() + timedelta(days=1), 7)
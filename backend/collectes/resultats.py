@@ -0,0 +1,218 @@
+"""
+Intégration par lots des résultats de collecte saisis hors ligne
+
+L'application mobile rejoue d'un coup tous les passages faits sans réseau.
+Le lot est validé sans accès à la base, les collectes visées sont lues en
+une requête, puis tout est appliqué dans une seule transaction : un
+bulk_update des collectes et des UPDATE ensemblistes pour les compteurs de
+tournée et les dates de dernière collecte des clients et de leurs bacs.
+
+Chaque résultat porte un UUID généré par l'application ; tous les UUID
+appliqués sont conservés (ResultatApplique, UUID unique) : rejouer un lot
+déjà reçu (réponse perdue, double envoi) ne modifie rien, même si un
+résultat plus récent a été appliqué depuis à la même collecte. Quand un lot
+contient plusieurs résultats pour une collecte, seul le dernier est appliqué ;
+les précédents sont enregistrés comme remplacés et renvoyés dans `remplaces`.
+"""
+from collections import defaultdict
+from datetime import datetime, time
+
+from django.db import transaction
+from django.db.models import Case, Count, DateTimeField, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from clients.models import Client, BacPoubelle
+from ete_project.geohash import geohash_de
+from rapports.services import invalider_compteurs
+from temps_reel.evenements import publier_collectes, publier_tournees
+from .journee import invalider_journee
+from .models import Tournee, Collecte, ResultatApplique
+from .serializers import ResultatCollecteSerializer
+
+TAILLE_LOT_MAX = 500
+
+CHAMPS_RESULTAT = [
+    'status', 'heure_arrivee', 'heure_depart', 'types_dechets_collectes',
+    'quantite_estimee', 'nombre_contenants', 'raison_echec', 'details_echec',
+    'latitude_collecte', 'longitude_collecte', 'signature_client',
+    'nom_signataire', 'notes_agent',
+]
+
+
+def valider_resultats(resultats):
+    """Résultats valides [(index, données)] et erreurs [{'index', 'erreurs'}] du lot"""
+    valides, erreurs = [], []
+    for index, donnees in enumerate(resultats):
+        serializer = ResultatCollecteSerializer(data=donnees)
+        if serializer.is_valid():
+            valides.append((index, serializer.validated_data))
+        else:
+            erreurs.append({'index': index, 'erreurs': serializer.errors})
+    return valides, erreurs
+
+
+def collectes_autorisees(user):
+    """Collectes des tournées des équipes de l'utilisateur (toutes pour le staff)"""
+    collectes = Collecte.objects.all()
+    if not user.is_staff:
+        collectes = collectes.filter(tournee_id__in=Tournee.objects.filter(
+            Q(equipe_assignee__membres__user=user) | Q(equipe_assignee__chef_equipe__user=user)
+        ).values('id'))
+    return collectes
+
+
+def moment_collecte(collecte):
+    """Date et heure du passage (départ, sinon arrivée, sinon heure prévue)"""
+    heure = collecte.heure_depart or collecte.heure_arrivee or collecte.heure_passage_prevue or time(0)
+    return timezone.make_aware(datetime.combine(collecte.tournee.date_tournee, heure))
+
+
+def mettre_a_jour_tournees(tournee_ids, maintenant):
+    """Recompte les clients réalisés des tournées (une requête UPDATE)"""
+    realises = Collecte.objects.filter(
+        tournee=OuterRef('pk'), status='completee'
+    ).order_by().values('tournee').annotate(nombre=Count('id')).values('nombre')
+    Tournee.objects.filter(id__in=tournee_ids).update(
+        nombre_clients_realises=Coalesce(Subquery(realises), 0),
+        updated_at=maintenant
+    )
+
+
+def _plus_recent(champ, cle, moments):
+    """CASE qui ne remplace `champ` que par une date plus récente"""
+    return Case(
+        *[
+            When(
+                Q(**{cle: objet_id}) & (Q(**{f'{champ}__isnull': True}) | Q(**{f'{champ}__lt': moment})),
+                then=Value(moment)
+            )
+            for objet_id, moment in moments.items()
+        ],
+        default=F(champ),
+        output_field=DateTimeField()
+    )
+
+
+def mettre_a_jour_dernieres_collectes(moments, maintenant):
+    """Dernière collecte des clients et de leurs bacs (une requête UPDATE chacun)"""
+    if not moments:
+        return
+    Client.objects.filter(id__in=moments).update(
+        derniere_collecte=_plus_recent('derniere_collecte', 'id', moments),
+        updated_at=maintenant
+    )
+    BacPoubelle.objects.filter(client_id__in=moments).update(
+        date_derniere_collecte=_plus_recent('date_derniere_collecte', 'client_id', moments),
+        updated_at=maintenant
+    )
+
+
+def appliquer_resultats(user, resultats):
+    """
+    Valide et applique un lot de résultats.
+    Un résultat invalide, inconnu ou hors des tournées de l'agent est signalé
+    sans empêcher l'application des autres.
+    """
+    valides, erreurs = valider_resultats(resultats)
+
+    # Résultats du lot par collecte, dans l'ordre d'envoi ; un UUID ne sert qu'une fois
+    par_collecte = defaultdict(list)
+    uuids_vus = set()
+    for index, donnees in valides:
+        if donnees['uuid'] in uuids_vus:
+            erreurs.append({'index': index, 'erreurs': {'uuid': ['UUID en double dans le lot.']}})
+            continue
+        uuids_vus.add(donnees['uuid'])
+        par_collecte[donnees['collecte']].append((index, donnees))
+
+    deja_appliques, remplaces = [], []
+    maintenant = timezone.now()
+    with transaction.atomic():
+        collectes = {
+            collecte.id: collecte
+            for collecte in collectes_autorisees(user).filter(
+                id__in=par_collecte
+            ).select_related('tournee').select_for_update(of=('self',))
+        }
+        uuids_existants = dict(ResultatApplique.objects.filter(
+            uuid__in=uuids_vus
+        ).values_list('uuid', 'collecte_id'))
+
+        a_mettre_a_jour, recus = [], []
+        for collecte_id, envois in par_collecte.items():
+            collecte = collectes.get(collecte_id)
+            if collecte is None:
+                erreurs.extend(
+                    {'index': index, 'erreurs': {'collecte': ['Collecte introuvable ou hors de vos tournées.']}}
+                    for index, _ in envois
+                )
+                continue
+
+            nouveaux = []
+            for index, donnees in envois:
+                proprietaire = uuids_existants.get(donnees['uuid'])
+                if proprietaire == collecte_id:
+                    deja_appliques.append(str(donnees['uuid']))
+                elif proprietaire is not None:
+                    erreurs.append({
+                        'index': index,
+                        'erreurs': {'uuid': ['UUID déjà utilisé pour une autre collecte.']}
+                    })
+                else:
+                    nouveaux.append(donnees)
+
+            # Le dernier résultat du lot l'emporte : les précédents sont remplacés, et
+            # rien n'est appliqué si ce dernier l'a déjà été (lot renvoyé)
+            _, dernier = envois[-1]
+            for donnees in nouveaux:
+                if donnees is not dernier:
+                    remplaces.append(str(donnees['uuid']))
+                    recus.append(ResultatApplique(uuid=donnees['uuid'], collecte=collecte))
+            if not nouveaux or nouveaux[-1] is not dernier:
+                continue
+
+            donnees = dernier
+            for champ in CHAMPS_RESULTAT:
+                if champ in donnees:
+                    setattr(collecte, champ, donnees[champ])
+            collecte.resultat_uuid = donnees['uuid']
+            collecte.geohash = geohash_de(collecte.latitude_collecte, collecte.longitude_collecte)
+            collecte.updated_at = maintenant
+            a_mettre_a_jour.append(collecte)
+
+        Collecte.objects.bulk_update(
+            a_mettre_a_jour, CHAMPS_RESULTAT + ['resultat_uuid', 'geohash', 'updated_at'], batch_size=TAILLE_LOT_MAX
+        )
+        ResultatApplique.objects.bulk_create(recus + [
+            ResultatApplique(uuid=collecte.resultat_uuid, collecte=collecte) for collecte in a_mettre_a_jour
+        ])
+
+        moments = {}
+        for collecte in a_mettre_a_jour:
+            if collecte.status == 'completee':
+                moment = moment_collecte(collecte)
+                moments[collecte.client_id] = max(moment, moments.get(collecte.client_id, moment))
+        tournee_ids = {collecte.tournee_id for collecte in a_mettre_a_jour}
+        mettre_a_jour_tournees(tournee_ids, maintenant)
+        mettre_a_jour_dernieres_collectes(moments, maintenant)
+
+        # Poussés aux tableaux de bord et aux clients après validation de la transaction
+        if a_mettre_a_jour:
+            publier_collectes(a_mettre_a_jour, dict(Client.objects.filter(
+                id__in={collecte.client_id for collecte in a_mettre_a_jour}
+            ).values_list('id', 'user_id')))
+            publier_tournees(Tournee.objects.filter(id__in=tournee_ids))
+
+    # bulk_update ne déclenche pas les signaux : journées en cache à périmer
+    for jour in {collecte.tournee.date_tournee for collecte in a_mettre_a_jour}:
+        invalider_journee(jour)
+    if a_mettre_a_jour:
+        invalider_compteurs()
+
+    return {
+        'appliques': len(a_mettre_a_jour),
+        'deja_appliques': deja_appliques,
+        'remplaces': remplaces,
+        'erreurs': sorted(erreurs, key=lambda erreur: erreur['index']),
+    }
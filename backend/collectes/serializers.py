@@ -0,0 +1,138 @@
+from rest_framework import serializers
+from clients.models import Client, Contrat, BacPoubelle
+from .models import Tournee, Collecte
+
+class TourneeSerializer(serializers.ModelSerializer):
+    """Serializer pour les tournées de collecte"""
+    
+    equipe_nom = serializers.CharField(source='equipe_assignee.nom_equipe', read_only=True)
+    vehicule_plaque = serializers.CharField(source='vehicule_assigne.numero_plaque', read_only=True)
+    zone_nom = serializers.CharField(source='zone_collecte.nom_zone', read_only=True)
+    taux_completion = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = Tournee
+        fields = [
+            'id', 'nom_tournee', 'date_tournee', 'heure_debut_prevue',
+            'heure_fin_prevue', 'equipe_assignee', 'equipe_nom',
+            'vehicule_assigne', 'vehicule_plaque', 'zone_collecte', 'zone_nom',
+            'heure_debut_reelle', 'heure_fin_reelle', 'status',
+            'nombre_clients_prevus', 'nombre_clients_realises',
+            'distance_parcourue', 'carburant_consomme', 'taux_completion',
+            'notes', 'problemes_rencontres', 'created_at', 'updated_at'
+        ]
+
+class CollecteSerializer(serializers.ModelSerializer):
+    """Serializer pour les collectes d'une tournée"""
+    
+    client_name = serializers.CharField(source='client.display_name', read_only=True)
+    client_latitude = serializers.DecimalField(source='client.latitude', max_digits=10, decimal_places=8, read_only=True)
+    client_longitude = serializers.DecimalField(source='client.longitude', max_digits=11, decimal_places=8, read_only=True)
+    
+    class Meta:
+        model = Collecte
+        fields = [
+            'id', 'tournee', 'client', 'client_name', 'client_latitude',
+            'client_longitude', 'heure_passage_prevue', 'ordre_passage',
+            'heure_arrivee', 'heure_depart', 'status', 'raison_echec',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+class BacJourneeSerializer(serializers.ModelSerializer):
+    """Bac à collecter chez le client"""
+    
+    class Meta:
+        model = BacPoubelle
+        fields = ['id', 'numero_bac', 'type_bac', 'capacite_litres', 'emplacement_description']
+
+class ContratJourneeSerializer(serializers.ModelSerializer):
+    """Consignes du contrat utiles sur le terrain"""
+    
+    class Meta:
+        model = Contrat
+        fields = [
+            'id', 'numero_contrat', 'frequence_collecte', 'types_dechets',
+            'heure_passage', 'conditions_particulieres'
+        ]
+
+class ClientJourneeSerializer(serializers.ModelSerializer):
+    """Client d'une collecte : adresse, coordonnées, bacs et contrats en cours"""
+    
+    nom = serializers.CharField(source='display_name', read_only=True)
+    telephone = serializers.CharField(source='user.phone', read_only=True)
+    bacs = BacJourneeSerializer(many=True, read_only=True)
+    contrats = ContratJourneeSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = Client
+        fields = [
+            'id', 'code_client', 'nom', 'contact_person', 'telephone',
+            'secondary_phone', 'service_address', 'service_city',
+            'latitude', 'longitude', 'notes', 'bacs', 'contrats'
+        ]
+
+class CollecteJourneeSerializer(serializers.ModelSerializer):
+    """Collecte de la journée, avec tout ce qu'il faut savoir du client"""
+    
+    client = ClientJourneeSerializer(read_only=True)
+    
+    class Meta:
+        model = Collecte
+        fields = [
+            'id', 'ordre_passage', 'heure_passage_prevue', 'status',
+            'heure_arrivee', 'heure_depart', 'raison_echec', 'client'
+        ]
+
+class TourneeJourneeSerializer(serializers.ModelSerializer):
+    """Tournée du jour d'un agent et ses collectes dans l'ordre de passage"""
+    
+    equipe_nom = serializers.CharField(source='equipe_assignee.nom_equipe', read_only=True)
+    vehicule_plaque = serializers.CharField(source='vehicule_assigne.numero_plaque', read_only=True)
+    zone_nom = serializers.CharField(source='zone_collecte.nom_zone', read_only=True)
+    collectes = CollecteJourneeSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = Tournee
+        fields = [
+            'id', 'nom_tournee', 'date_tournee', 'heure_debut_prevue',
+            'heure_fin_prevue', 'status', 'equipe_assignee', 'equipe_nom',
+            'vehicule_assigne', 'vehicule_plaque', 'zone_collecte', 'zone_nom',
+            'nombre_clients_prevus', 'notes', 'collectes'
+        ]
+
+class ResultatCollecteSerializer(serializers.Serializer):
+    """Résultat d'une collecte saisi sur le terrain, identifié par un UUID généré par l'application"""
+    
+    STATUTS_RESULTAT = ['en_cours', 'completee', 'ratee', 'reportee']
+    
+    uuid = serializers.UUIDField()
+    collecte = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=STATUTS_RESULTAT)
+    heure_arrivee = serializers.TimeField(required=False, allow_null=True)
+    heure_depart = serializers.TimeField(required=False, allow_null=True)
+    types_dechets_collectes = serializers.ListField(child=serializers.CharField(), required=False)
+    quantite_estimee = serializers.DecimalField(
+        max_digits=8, decimal_places=2, min_value=0, required=False, allow_null=True
+    )
+    nombre_contenants = serializers.IntegerField(min_value=0, required=False)
+    raison_echec = serializers.ChoiceField(choices=Collecte.RAISON_ECHEC_CHOICES, required=False, allow_blank=True)
+    details_echec = serializers.CharField(required=False, allow_blank=True)
+    latitude_collecte = serializers.DecimalField(max_digits=10, decimal_places=8, required=False, allow_null=True)
+    longitude_collecte = serializers.DecimalField(max_digits=11, decimal_places=8, required=False, allow_null=True)
+    signature_client = serializers.CharField(required=False, allow_blank=True)
+    nom_signataire = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    notes_agent = serializers.CharField(required=False, allow_blank=True)
+    
+    def validate(self, data):
+        """Cohérence du résultat (sans accès à la base : le lot est validé d'un bloc)"""
+        if data['status'] == 'ratee' and not data.get('raison_echec'):
+            raise serializers.ValidationError(
+                {'raison_echec': "La raison de l'échec est requise pour une collecte ratée."}
+            )
+        arrivee, depart = data.get('heure_arrivee'), data.get('heure_depart')
+        if arrivee and depart and depart < arrivee:
+            raise serializers.ValidationError(
+                {'heure_depart': "L'heure de départ précède l'heure d'arrivée."}
+            )
+        return data
@@ -0,0 +1,56 @@
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from agents.models import Agent, Equipe, Vehicule
+from clients.models import Client, Contrat, BacPoubelle, ZoneCollecte
+from ete_project.geohash import geohash_de
+from .journee import invalider_agent, invalider_journee, invalider_journees_zones
+from .models import Tournee, Collecte
+
+JOURNEE_SENDERS = (Tournee, Equipe, Vehicule, ZoneCollecte)
+
+
+def invalider_journees(sender, **kwargs):
+    """Une donnée partagée par plusieurs journées a changé (le jour d'une tournée a pu changer)"""
+    invalider_journee()
+
+
+for model in JOURNEE_SENDERS:
+    post_save.connect(invalider_journees, sender=model, dispatch_uid=f'journee_save_{model.__name__}')
+    post_delete.connect(invalider_journees, sender=model, dispatch_uid=f'journee_delete_{model.__name__}')
+m2m_changed.connect(invalider_journees, sender=Equipe.membres.through, dispatch_uid='journee_membres')
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+@receiver(post_save, sender=Contrat)
+@receiver(post_delete, sender=Contrat)
+@receiver(post_save, sender=BacPoubelle)
+@receiver(post_delete, sender=BacPoubelle)
+def invalider_journees_client(sender, instance, **kwargs):
+    """Seules les journées des zones des tournées où passe le client sont concernées"""
+    client_id = instance.id if sender is Client else instance.client_id
+    invalider_journees_zones(
+        Collecte.objects.filter(client_id=client_id).values_list('tournee__zone_collecte_id', flat=True).order_by().distinct()
+    )
+
+
+@receiver(post_save, sender=Agent)
+@receiver(post_delete, sender=Agent)
+def invalider_agent_journee(sender, instance, **kwargs):
+    """Accès à la journée en cache par utilisateur"""
+    invalider_agent(instance.user_id)
+
+
+@receiver(post_save, sender=Collecte)
+@receiver(post_delete, sender=Collecte)
+def invalider_journee_collecte(sender, instance, **kwargs):
+    """Seules les journées du jour de la tournée sont concernées"""
+    date_tournee = Tournee.objects.filter(id=instance.tournee_id).values_list('date_tournee', flat=True).first()
+    invalider_journee(date_tournee)
+
+
+@receiver(pre_save, sender=Collecte)
+def calculer_geohash(sender, instance, **kwargs):
+    """Geohash à jour avec la position de la collecte"""
+    instance.geohash = geohash_de(instance.latitude_collecte, instance.longitude_collecte)
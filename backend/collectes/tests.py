@@ -1,3 +1,490 @@
-from django.test import TestCase
+import tempfile
+import uuid
+from datetime import date, time
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from agents.models import Agent, Equipe, Vehicule
+from clients.models import Client, Contrat, ZoneCollecte
+from .capacite import repartir_arrets, repartir_tournees
+from .models import Tournee, Collecte
+from .optimisation import deux_opt, heures_de_passage, longueur_tournee, optimiser_ordre, or_opt, plus_proche_voisin
+from .planification import planifier_tournees
+
+User = get_user_model()
+
+
+class OptimisationTest(SimpleTestCase):
+    """2-opt et Or-opt : permutation valide, dépôt en tête, circuit jamais allongé"""
+
+    def setUp(self):
+        aleatoire = np.random.default_rng(1)
+        points = aleatoire.uniform(0, 10, (40, 2))
+        self.distances = np.linalg.norm(points[:, None] - points[None, :], axis=2)
+
+    def _verifier(self, ordre, avant):
+        self.assertEqual(ordre[0], 0)
+        self.assertEqual(sorted(ordre.tolist()), list(range(len(self.distances))))
+        self.assertLessEqual(longueur_tournee(ordre, self.distances), avant + 1e-9)
+
+    def test_deux_opt(self):
+        ordre = plus_proche_voisin(self.distances)
+        self._verifier(deux_opt(ordre, self.distances), longueur_tournee(ordre, self.distances))
+
+    def test_or_opt(self):
+        ordre = np.arange(len(self.distances))
+        self._verifier(or_opt(ordre, self.distances), longueur_tournee(ordre, self.distances))
+
+    def test_petites_tournees(self):
+        for n in (1, 2, 3):
+            self.assertEqual(deux_opt(np.arange(n), self.distances[:n, :n]).tolist(), list(range(n)))
+            self.assertEqual(sorted(or_opt(np.arange(n), self.distances[:n, :n]).tolist()), list(range(n)))
+
+    def test_points_sur_un_cercle(self):
+        # Circuit optimal : les points dans l'ordre du cercle, dans un sens ou dans l'autre
+        angles = np.random.default_rng(2).permutation(12) * 2 * np.pi / 12
+        lats, lngs = 36.8 + 0.01 * np.sin(angles), 10.18 + 0.01 * np.cos(angles)
+        ordre, cumul = optimiser_ordre(lats, lngs, depot=(36.8, 10.19))
+        rangs = np.rint(angles[ordre] / (2 * np.pi / 12)).astype(int)
+        pas = set(np.diff(rangs) % 12)
+        self.assertTrue(pas in ({1}, {11}), rangs)
+        self.assertTrue((np.diff(cumul) > 0).all())
+
+    def test_heures_de_passage(self):
+        # 25 km/h × 1,3 de détour : 3,12 min par km, plus 4 min par arrêt précédent
+        self.assertEqual(heures_de_passage(date(2025, 6, 2), time(7), [0, 10]), [time(7), time(7, 35, 12)])
+
+
+class ResultatsHorsLigneTest(TestCase):
+    """Un résultat déjà appliqué, rejoué plus tard, ne modifie plus la collecte"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        reglages = override_settings(MEDIA_ROOT=media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+        admin = User.objects.create_user(
+            username='superviseur', email='superviseur@ete.test', user_type='admin', is_staff=True
+        )
+        zone = ZoneCollecte.objects.create(
+            nom_zone='Zone', code_zone='Z1', coordonnees_zone=[], responsable=admin
+        )
+        client = Client.objects.create(
+            user=User.objects.create_user(username='client', email='client@ete.test'),
+            code_client='CLI-1', type_client='particulier', service_address='Rue',
+            service_city='Ville', service_postal_code='1000', latitude=0, longitude=0, zone_collecte=zone
+        )
+        chef = Agent.objects.create(
+            user=User.objects.create_user(username='agent', email='agent@ete.test', user_type='agent_ramassage'),
+            matricule='AG-1', poste='ramasseur_ordures', date_embauche=date(2024, 1, 1), zone_principale=zone
+        )
+        vehicule = Vehicule.objects.create(
+            numero_plaque='PL-1', marque='Marque', modele='Modèle', annee=2020,
+            type_vehicule='camion_benne', capacite_charge=1000, capacite_volume=10
+        )
+        equipe = Equipe.objects.create(
+            nom_equipe='Équipe', chef_equipe=chef, vehicule_assigne=vehicule,
+            heure_debut=time(7), heure_fin=time(15)
+        )
+        tournee = Tournee.objects.create(
+            nom_tournee='Tournée', date_tournee=date(2025, 6, 2), heure_debut_prevue=time(7),
+            heure_fin_prevue=time(15), equipe_assignee=equipe, vehicule_assigne=vehicule, zone_collecte=zone
+        )
+        self.collecte = Collecte.objects.create(
+            tournee=tournee, client=client, heure_passage_prevue=time(8), ordre_passage=1
+        )
+        self.api = APIClient(HTTP_HOST='localhost')
+        self.api.force_authenticate(admin)
+
+    def _envoyer(self, *resultats):
+        reponse = self.api.post('/api/collectes/resultats/', {'resultats': list(resultats)}, format='json')
+        self.assertEqual(reponse.status_code, 200, reponse.content)
+        return reponse.data
+
+    def test_ancien_resultat_rejoue_apres_un_plus_recent(self):
+        en_cours = {
+            'uuid': str(uuid.uuid4()), 'collecte': self.collecte.id,
+            'status': 'en_cours', 'heure_arrivee': '08:05',
+        }
+        completee = {
+            'uuid': str(uuid.uuid4()), 'collecte': self.collecte.id,
+            'status': 'completee', 'heure_arrivee': '08:05', 'heure_depart': '08:12',
+        }
+        self.assertEqual(self._envoyer(en_cours)['appliques'], 1)
+        self.assertEqual(self._envoyer(completee)['appliques'], 1)
+
+        # Réponse perdue : l'application renvoie le premier lot
+        resultat = self._envoyer(en_cours)
+        self.assertEqual(resultat['appliques'], 0)
+        self.assertEqual(resultat['deja_appliques'], [en_cours['uuid']])
+
+        self.collecte.refresh_from_db()
+        self.assertEqual(self.collecte.status, 'completee')
+        self.assertEqual(self.collecte.heure_depart, time(8, 12))
+
+    def test_uuid_d_une_autre_collecte(self):
+        resultat = {'uuid': str(uuid.uuid4()), 'collecte': self.collecte.id, 'status': 'en_cours'}
+        self._envoyer(resultat)
+        autre = Collecte.objects.create(
+            tournee=self.collecte.tournee,
+            client=Client.objects.create(
+                user=User.objects.create_user(username='client2', email='client2@ete.test'),
+                code_client='CLI-2', type_client='particulier', service_address='Rue',
+                service_city='Ville', service_postal_code='1000', latitude=0, longitude=0,
+                zone_collecte=self.collecte.client.zone_collecte
+            ),
+            heure_passage_prevue=time(9), ordre_passage=2
+        )
+        reponse = self._envoyer({**resultat, 'collecte': autre.id})
+        self.assertEqual(reponse['appliques'], 0)
+        self.assertIn('uuid', reponse['erreurs'][0]['erreurs'])
+
+    def test_resultat_remplace_dans_le_lot(self):
+        en_cours = {
+            'uuid': str(uuid.uuid4()), 'collecte': self.collecte.id,
+            'status': 'en_cours', 'heure_arrivee': '08:05',
+        }
+        completee = {
+            'uuid': str(uuid.uuid4()), 'collecte': self.collecte.id,
+            'status': 'completee', 'heure_arrivee': '08:05', 'heure_depart': '08:12',
+        }
+        resultat = self._envoyer(en_cours, completee)
+        self.assertEqual(resultat['appliques'], 1)
+        self.assertEqual(resultat['remplaces'], [en_cours['uuid']])
+
+        # Le résultat remplacé, renvoyé seul, ne revient pas sur le plus récent
+        resultat = self._envoyer(en_cours)
+        self.assertEqual(resultat['appliques'], 0)
+        self.assertEqual(resultat['deja_appliques'], [en_cours['uuid']])
+        self.collecte.refresh_from_db()
+        self.assertEqual(self.collecte.status, 'completee')
+
+        # Lot complet renvoyé : rien n'est réappliqué
+        resultat = self._envoyer(en_cours, completee)
+        self.assertEqual((resultat['appliques'], resultat['remplaces']), (0, []))
+        self.assertEqual(sorted(resultat['deja_appliques']), sorted([en_cours['uuid'], completee['uuid']]))
+
+
+class PlanificationTest(TestCase):
+    """Tournées générées depuis les contrats : un véhicule par jour, relance idempotente"""
+
+    LUNDI = date(2025, 6, 2)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        reglages = override_settings(MEDIA_ROOT=media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+        self.admin = User.objects.create_user(
+            username='superviseur', email='superviseur@ete.test', user_type='admin', is_staff=True
+        )
+        self.zones = [
+            ZoneCollecte.objects.create(
+                nom_zone=f'Zone {n}', code_zone=f'Z{n}', coordonnees_zone=[], responsable=self.admin
+            )
+            for n in range(2)
+        ]
+        self.camion, self.autre_camion, self.libre = [
+            Vehicule.objects.create(
+                numero_plaque=f'PL-{n}', marque='Marque', modele='Modèle', annee=2020,
+                type_vehicule='camion_benne', capacite_charge=1000, capacite_volume=10
+            )
+            for n in range(3)
+        ]
+        # Une seule équipe pour les deux zones ; une autre équipe active garde son camion
+        self.equipe = self._equipe('a', self.camion, self.zones)
+        self._equipe('b', self.autre_camion, [])
+        self.clients = 0
+        for zone in self.zones:
+            self._contrat(zone)
+
+    def _equipe(self, suffixe, vehicule, zones):
+        chef = Agent.objects.create(
+            user=User.objects.create_user(
+                username=f'agent-{suffixe}', email=f'agent-{suffixe}@ete.test', user_type='agent_ramassage'
+            ),
+            matricule=f'AG-{suffixe}', poste='ramasseur_ordures', date_embauche=date(2024, 1, 1)
+        )
+        equipe = Equipe.objects.create(
+            nom_equipe=f'Équipe {suffixe}', chef_equipe=chef, vehicule_assigne=vehicule,
+            heure_debut=time(7), heure_fin=time(15), jours_travail=['lundi']
+        )
+        equipe.zones_intervention.set(zones)
+        return equipe
+
+    def _contrat(self, zone):
+        self.clients += 1
+        client = Client.objects.create(
+            user=User.objects.create_user(username=f'client-{self.clients}', email=f'client-{self.clients}@ete.test'),
+            code_client=f'CLI-{self.clients}', type_client='particulier', service_address='Rue',
+            service_city='Ville', service_postal_code='1000', latitude=0, longitude=0, zone_collecte=zone
+        )
+        Contrat.objects.create(
+            client=client, numero_contrat=f'CTR-{self.clients}', date_debut=date(2025, 1, 1),
+            date_fin=date(2030, 12, 31), frequence_collecte='hebdomadaire',
+            jours_collecte=['lundi'], heure_passage=time(8), tarif_mensuel=100
+        )
+        return client
+
+    def test_un_vehicule_par_tournee_du_jour(self):
+        resultat = planifier_tournees(self.LUNDI, 1)
+        self.assertEqual(resultat['tournees_creees'], 2)
+        vehicules = list(Tournee.objects.filter(date_tournee=self.LUNDI).values_list('vehicule_assigne', flat=True))
+        # Le camion attitré puis le véhicule libre, jamais celui de l'autre équipe
+        self.assertEqual(sorted(vehicules), sorted([self.camion.id, self.libre.id]))
+
+    def test_relance_complete_la_tournee_existante(self):
+        planifier_tournees(self.LUNDI, 1)
+        self._contrat(self.zones[0])
+        resultat = planifier_tournees(self.LUNDI, 1)
+        self.assertEqual(resultat['tournees_creees'], 0)
+        self.assertEqual(resultat['collectes_creees'], 1)
+        tournee = Tournee.objects.get(date_tournee=self.LUNDI, zone_collecte=self.zones[0])
+        self.assertEqual(tournee.nombre_clients_prevus, 2)
+        self.assertEqual(planifier_tournees(self.LUNDI, 1)['collectes_creees'], 0)
+
+
+class MaJourneeTest(TestCase):
+    """Journée de l'agent servie depuis le cache, périmée par les modifications"""
+
+    JOUR = date(2025, 6, 2)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        reglages = override_settings(MEDIA_ROOT=media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        admin = User.objects.create_user(
+            username='superviseur', email='superviseur@ete.test', user_type='admin', is_staff=True
+        )
+        zone = ZoneCollecte.objects.create(
+            nom_zone='Zone', code_zone='Z1', coordonnees_zone=[], responsable=admin
+        )
+        self.client_ete = Client.objects.create(
+            user=User.objects.create_user(username='client', email='client@ete.test'),
+            code_client='CLI-1', type_client='particulier', service_address='Rue',
+            service_city='Ville', service_postal_code='1000', latitude=0, longitude=0, zone_collecte=zone
+        )
+        self.agent = User.objects.create_user(username='agent', email='agent@ete.test', user_type='agent_ramassage')
+        chef = Agent.objects.create(
+            user=self.agent, matricule='AG-1', poste='ramasseur_ordures', date_embauche=date(2024, 1, 1)
+        )
+        vehicule = Vehicule.objects.create(
+            numero_plaque='PL-1', marque='Marque', modele='Modèle', annee=2020,
+            type_vehicule='camion_benne', capacite_charge=1000, capacite_volume=10
+        )
+        equipe = Equipe.objects.create(
+            nom_equipe='Équipe', chef_equipe=chef, vehicule_assigne=vehicule,
+            heure_debut=time(7), heure_fin=time(15)
+        )
+        tournee = Tournee.objects.create(
+            nom_tournee='Tournée', date_tournee=self.JOUR, heure_debut_prevue=time(7),
+            heure_fin_prevue=time(15), equipe_assignee=equipe, vehicule_assigne=vehicule, zone_collecte=zone
+        )
+        self.collecte = Collecte.objects.create(
+            tournee=tournee, client=self.client_ete, heure_passage_prevue=time(8), ordre_passage=1
+        )
+        self.api = APIClient(HTTP_HOST='localhost')
+        self.api.force_authenticate(self.agent)
+
+    def _journee(self, **entetes):
+        return self.api.get('/api/collectes/ma-journee/', {'date': '2025-06-02'}, **entetes)
+
+    def test_etag_et_304(self):
+        reponse = self._journee()
+        self.assertEqual(reponse.status_code, 200)
+        tournees = reponse.json()['tournees']
+        self.assertEqual([collecte['id'] for collecte in tournees[0]['collectes']], [self.collecte.id])
+
+        # Journée inchangée : 304 sans requête
+        with self.assertNumQueries(0):
+            reponse_304 = self._journee(HTTP_IF_NONE_MATCH=reponse['ETag'])
+        self.assertEqual(reponse_304.status_code, 304)
+
+    def test_modifications_perimant_la_journee(self):
+        etag = self._journee()['ETag']
+        self.client_ete.service_address = 'Avenue'
+        self.client_ete.save()
+        reponse = self._journee(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(reponse.json()['tournees'][0]['collectes'][0]['client']['service_address'], 'Avenue')
+
+        etag = reponse['ETag']
+        self.collecte.status = 'en_cours'
+        self.collecte.save()
+        reponse = self._journee(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(reponse.json()['tournees'][0]['collectes'][0]['status'], 'en_cours')
+
+    def test_acces(self):
+        self.assertEqual(
+            self.api.get('/api/collectes/ma-journee/', {'date': '2024-02-30'}).status_code, 400
+        )
+        self.api.force_authenticate(self.client_ete.user)
+        self.assertEqual(self._journee().status_code, 403)
+
+
+class TourneeAccesTest(TestCase):
+    """Tournées visibles selon le rôle, modification réservée aux superviseurs"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        reglages = override_settings(MEDIA_ROOT=media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+        self.admin = User.objects.create_user(
+            username='superviseur', email='superviseur@ete.test', user_type='admin', is_staff=True
+        )
+        zone = ZoneCollecte.objects.create(
+            nom_zone='Zone', code_zone='Z1', coordonnees_zone=[], responsable=self.admin
+        )
+        self.client_user = User.objects.create_user(username='client', email='client@ete.test')
+        self.tournees = []
+        self.agents = []
+        for n in range(2):
+            user = User.objects.create_user(
+                username=f'agent-{n}', email=f'agent-{n}@ete.test', user_type='agent_ramassage'
+            )
+            chef = Agent.objects.create(
+                user=user, matricule=f'AG-{n}', poste='ramasseur_ordures', date_embauche=date(2024, 1, 1)
+            )
+            vehicule = Vehicule.objects.create(
+                numero_plaque=f'PL-{n}', marque='Marque', modele='Modèle', annee=2020,
+                type_vehicule='camion_benne', capacite_charge=1000, capacite_volume=10
+            )
+            equipe = Equipe.objects.create(
+                nom_equipe=f'Équipe {n}', chef_equipe=chef, vehicule_assigne=vehicule,
+                heure_debut=time(7), heure_fin=time(15)
+            )
+            self.agents.append(user)
+            self.tournees.append(Tournee.objects.create(
+                nom_tournee=f'Tournée {n}', date_tournee=date(2025, 6, 2), heure_debut_prevue=time(7),
+                heure_fin_prevue=time(15), equipe_assignee=equipe, vehicule_assigne=vehicule, zone_collecte=zone
+            ))
+        self.api = APIClient(HTTP_HOST='localhost')
+
+    def _ids(self, user):
+        self.api.force_authenticate(user)
+        reponse = self.api.get('/api/collectes/tournees/')
+        self.assertEqual(reponse.status_code, 200)
+        resultats = reponse.data['results'] if isinstance(reponse.data, dict) else reponse.data
+        return sorted(tournee['id'] for tournee in resultats)
+
+    def test_liste_selon_le_role(self):
+        self.assertEqual(self._ids(self.admin), sorted(tournee.id for tournee in self.tournees))
+        self.assertEqual(self._ids(self.agents[0]), [self.tournees[0].id])
+        self.assertEqual(self._ids(self.client_user), [])
+
+    def test_detail_hors_perimetre(self):
+        self.api.force_authenticate(self.client_user)
+        for suffixe in ('', 'collectes/', 'remplissage/'):
+            with self.subTest(suffixe=suffixe):
+                reponse = self.api.get(f'/api/collectes/tournees/{self.tournees[0].id}/{suffixe}')
+                self.assertEqual(reponse.status_code, 404)
+        self.api.force_authenticate(self.agents[0])
+        reponse = self.api.get(f'/api/collectes/tournees/{self.tournees[1].id}/collectes/')
+        self.assertEqual(reponse.status_code, 404)
+
+    def test_modification_reservee(self):
+        url = f'/api/collectes/tournees/{self.tournees[0].id}/'
+        self.api.force_authenticate(self.agents[0])
+        self.assertEqual(self.api.patch(url, {'nom_tournee': 'Autre'}, format='json').status_code, 403)
+        self.assertEqual(self.api.delete(url).status_code, 403)
+        self.api.force_authenticate(self.admin)
+        self.assertEqual(self.api.patch(url, {'nom_tournee': 'Autre'}, format='json').status_code, 200)
+
+
+class RepartitionCapaciteTest(TestCase):
+    """Zone en dépassement répartie entre véhicules, sans double réservation"""
+
+    LUNDI = date(2025, 6, 2)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        reglages = override_settings(MEDIA_ROOT=media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+        admin = User.objects.create_user(
+            username='superviseur', email='superviseur@ete.test', user_type='admin', is_staff=True
+        )
+        self.zone = ZoneCollecte.objects.create(
+            nom_zone='Zone', code_zone='Z1', coordonnees_zone=[], responsable=admin
+        )
+        # 45 kg utiles par petit camion ; chaque client pèse environ 29 kg (bac par défaut)
+        self.petit = self._vehicule('PL-A', 50)
+        self.libre = self._vehicule('PL-L', 50)
+        self.attitre = self._vehicule('PL-C', 5000)
+        equipe = self._equipe('a', self.petit, [self.zone])
+        self._equipe('c', self.attitre, [])
+        self.tournee = Tournee.objects.create(
+            nom_tournee='Tournée', date_tournee=self.LUNDI, heure_debut_prevue=time(7),
+            heure_fin_prevue=time(15), equipe_assignee=equipe, vehicule_assigne=self.petit, zone_collecte=self.zone
+        )
+        for n, (lat, lng) in enumerate([(36.80, 10.10), (36.90, 10.30)]):
+            client = Client.objects.create(
+                user=User.objects.create_user(username=f'client-{n}', email=f'client-{n}@ete.test'),
+                code_client=f'CLI-{n}', type_client='particulier', service_address='Rue',
+                service_city='Ville', service_postal_code='1000', latitude=lat, longitude=lng, zone_collecte=self.zone
+            )
+            Collecte.objects.create(
+                tournee=self.tournee, client=client, heure_passage_prevue=time(8), ordre_passage=n + 1
+            )
+
+    def _vehicule(self, plaque, kg):
+        return Vehicule.objects.create(
+            numero_plaque=plaque, marque='Marque', modele='Modèle', annee=2020,
+            type_vehicule='camion_benne', capacite_charge=kg, capacite_volume=10
+        )
+
+    def _equipe(self, suffixe, vehicule, zones):
+        chef = Agent.objects.create(
+            user=User.objects.create_user(
+                username=f'agent-{suffixe}', email=f'agent-{suffixe}@ete.test', user_type='agent_ramassage'
+            ),
+            matricule=f'AG-{suffixe}', poste='ramasseur_ordures', date_embauche=date(2024, 1, 1)
+        )
+        equipe = Equipe.objects.create(
+            nom_equipe=f'Équipe {suffixe}', chef_equipe=chef, vehicule_assigne=vehicule,
+            heure_debut=time(7), heure_fin=time(15)
+        )
+        equipe.zones_intervention.set(zones)
+        return equipe
+
+    def test_repartir_arrets_selon_la_capacite(self):
+        charges = [(10, 0.1)] * 4
+        groupes = repartir_arrets([0, 0, 1, 1], [0, 1, 0, 1], charges, [(25, 1), (25, 1)], (0.5, 0.5))
+        self.assertEqual(sorted(arret for groupe in groupes for arret in groupe), [0, 1, 2, 3])
+        self.assertEqual([len(groupe) for groupe in groupes], [2, 2])
+
+    def test_vehicule_libre_pour_une_equipe_sans_tournee(self):
+        self._equipe('b', None, [self.zone])
+        resultat = repartir_tournees(self.LUNDI)
+        self.assertEqual(resultat['tournees_creees'], 1)
+        nouvelle = Tournee.objects.exclude(id=self.tournee.id).get()
+        # Le grand camion attitré d'une autre équipe n'est pas proposé
+        self.assertEqual(nouvelle.vehicule_assigne, self.libre)
+        self.assertEqual(nouvelle.nombre_clients_prevus, 1)
+        self.tournee.refresh_from_db()
+        self.assertEqual(self.tournee.nombre_clients_prevus, 1)
+        self.assertTrue(all(rapport['arret_plein'] is None for rapport in resultat['tournees']))
+
+    def test_sans_equipe_libre_la_zone_reste_en_surcharge(self):
+        resultat = repartir_tournees(self.LUNDI)
+        self.assertEqual(resultat['tournees_creees'], 0)
+        self.assertEqual(Tournee.objects.count(), 1)
+        self.assertEqual(resultat['tournees'][0]['arret_plein'], 2)
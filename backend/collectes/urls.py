@@ -1,8 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .views import TourneeViewSet, MaJourneeView, ResultatsCollectesView
 
 router = DefaultRouter()
+router.register(r'tournees', TourneeViewSet)
 
 urlpatterns = [
+    path('ma-journee/', MaJourneeView.as_view(), name='ma_journee'),
+    path('resultats/', ResultatsCollectesView.as_view(), name='resultats_collectes'),
     path('', include(router.urls)),
-]
\ No newline at end of file
+]
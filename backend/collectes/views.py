@@ -1,3 +1,215 @@
-from django.shortcuts import render
+from rest_framework import viewsets, status, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.views import APIView
+from django.db.models import Q
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
 
-# Create your views here.
+from .models import Tournee
+from .serializers import TourneeSerializer, CollecteSerializer
+from .journee import est_agent, get_journee
+from .resultats import TAILLE_LOT_MAX, appliquer_resultats
+from .optimisation import optimiser_tournee
+from .planification import planifier_tournees
+from .capacite import remplissage_tournee, repartir_tournees
+
+class EstSuperviseur(permissions.BasePermission):
+    """Staff et agents de supervision"""
+    
+    message = 'Permission refusée'
+    
+    def has_permission(self, request, view):
+        return request.user.is_staff or request.user.user_type == 'agent_supervision'
+
+class TourneeViewSet(viewsets.ModelViewSet):
+    """ViewSet pour la gestion des tournées"""
+    
+    queryset = Tournee.objects.select_related('equipe_assignee', 'vehicule_assigne', 'zone_collecte')
+    serializer_class = TourneeSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_fields = ['date_tournee', 'status', 'zone_collecte', 'equipe_assignee']
+    search_fields = ['nom_tournee', 'zone_collecte__nom_zone']
+    ordering = ['-date_tournee', 'heure_debut_prevue']
+    
+    def get_permissions(self):
+        """Permissions selon l'action"""
+        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+            # Modification réservée au staff et aux superviseurs
+            return [permissions.IsAuthenticated(), EstSuperviseur()]
+        return [permissions.IsAuthenticated()]
+    
+    def get_queryset(self):
+        """Filtrer selon le type d'utilisateur (détail, collectes et remplissage compris)"""
+        queryset = super().get_queryset()
+        user = self.request.user
+        
+        if user.is_staff or user.user_type == 'agent_supervision':
+            return queryset
+        # Les clients ne voient aucune tournée
+        if user.user_type == 'client':
+            return queryset.none()
+        # Les agents ne voient que les tournées de leurs équipes
+        return queryset.filter(
+            Q(equipe_assignee__membres__user=user) | Q(equipe_assignee__chef_equipe__user=user)
+        ).distinct()
+    
+    @action(detail=True, methods=['get'])
+    def collectes(self, request, pk=None):
+        """Collectes de la tournée dans l'ordre de passage"""
+        tournee = self.get_object()
+        collectes = tournee.collectes.select_related('client', 'client__user').order_by('ordre_passage')
+        serializer = CollecteSerializer(collectes, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=True, methods=['post'])
+    def optimiser(self, request, pk=None):
+        """Recalculer l'ordre et les heures de passage de la tournée"""
+        if not (request.user.is_staff or request.user.user_type == 'agent_supervision'):
+            return Response(
+                {'error': 'Permission refusée'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        tournee = self.get_object()
+        if tournee.status not in ['planifiee', 'en_cours']:
+            return Response(
+                {'error': 'Seules les tournées planifiées ou en cours peuvent être optimisées'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        resultat = optimiser_tournee(tournee)
+        
+        return Response({
+            'message': 'Tournée optimisée avec succès',
+            **resultat
+        })
+    
+    @action(detail=False, methods=['post'])
+    def planifier(self, request):
+        """Générer les tournées et collectes des contrats actifs sur un horizon"""
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Permission refusée'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        try:
+            date_debut = parse_date(str(request.data.get('date_debut', '')))
+        except ValueError:
+            date_debut = None  # date impossible (ex. 2024-02-30)
+        try:
+            jours = int(request.data.get('jours', 7))
+        except (TypeError, ValueError):
+            jours = 0
+        if date_debut is None or not 1 <= jours <= 31:
+            return Response(
+                {'error': 'date_debut (AAAA-MM-JJ) et jours (1 à 31) sont requis'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        resultat = planifier_tournees(date_debut, jours)
+        
+        return Response({
+            'message': 'Planification terminée',
+            **resultat
+        })
+    
+    @action(detail=True, methods=['get'])
+    def remplissage(self, request, pk=None):
+        """Courbe de remplissage prévue du véhicule au fil des arrêts"""
+        return Response(remplissage_tournee(self.get_object()))
+    
+    @action(detail=False, methods=['post'])
+    def repartir_capacite(self, request):
+        """Répartir entre véhicules les tournées du jour qui dépassent leur capacité"""
+        if not (request.user.is_staff or request.user.user_type == 'agent_supervision'):
+            return Response(
+                {'error': 'Permission refusée'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        try:
+            jour = parse_date(str(request.data.get('date', '')))
+        except ValueError:
+            jour = None  # date impossible (ex. 2024-02-30)
+        if jour is None:
+            return Response(
+                {'error': 'date (AAAA-MM-JJ) est requise'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            zone_id = int(request.data['zone']) if request.data.get('zone') else None
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'zone invalide'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        simulation = str(request.data.get('simulation', '')).lower() in ('1', 'true')
+        
+        resultat = repartir_tournees(jour, zone_id, appliquer=not simulation)
+        
+        return Response({
+            'message': 'Répartition terminée',
+            **resultat
+        })
+
+class MaJourneeView(APIView):
+    """Journée de l'agent connecté en une réponse, avec ETag (304 si rien n'a changé)"""
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        if not est_agent(request.user):
+            return Response(
+                {'error': 'Permission refusée'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        jour = timezone.localdate()
+        if 'date' in request.query_params:
+            try:
+                jour = parse_date(request.query_params['date'])
+            except ValueError:
+                jour = None  # date impossible (ex. 2024-02-30)
+            if jour is None:
+                return Response(
+                    {'error': 'date invalide (AAAA-MM-JJ)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        journee = get_journee(request.user, jour)
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if journee['etag'] in etags or '*' in etags:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(journee['contenu'], content_type='application/json')
+        response['ETag'] = journee['etag']
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+class ResultatsCollectesView(APIView):
+    """Résultats de collecte saisis hors ligne, envoyés par lots (rejeu sans effet grâce aux UUID)"""
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        if not (request.user.is_staff or hasattr(request.user, 'agent_profile')):
+            return Response(
+                {'error': 'Permission refusée'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        resultats = request.data.get('resultats') if isinstance(request.data, dict) else None
+        if not isinstance(resultats, list) or not 1 <= len(resultats) <= TAILLE_LOT_MAX:
+            return Response(
+                {'error': f'resultats doit être une liste de 1 à {TAILLE_LOT_MAX} éléments'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(appliquer_resultats(request.user, resultats))
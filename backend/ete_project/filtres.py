@@ -0,0 +1,30 @@
+"""
+Filtres partagés par les viewsets
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .geo import parser_bbox
+from .geohash import filtre_bbox
+
+
+class FiltreBoiteEnglobante(BaseFilterBackend):
+    """
+    `?bbox=min_lng,min_lat,max_lng,max_lat` : seulement les lignes dont la
+    position est dans la boîte (carte limitée à la zone affichée). La vue
+    déclare ses champs de position dans `champs_position` ; la recherche passe
+    par l'index sur le geohash.
+    """
+
+    bbox_query_param = 'bbox'
+
+    def filter_queryset(self, request, queryset, view):
+        valeur = request.query_params.get(self.bbox_query_param)
+        champs = getattr(view, 'champs_position', None)
+        if not valeur or champs is None:
+            return queryset
+        try:
+            bbox = parser_bbox(valeur)
+        except ValueError as e:
+            raise ValidationError({self.bbox_query_param: str(e)})
+        return queryset.filter(filtre_bbox(bbox, *champs))
@@ -0,0 +1,100 @@
+"""
+Outils géographiques partagés (distances vectorisées, simplification de traces)
+"""
+import numpy as np
+
+RAYON_TERRE_KM = 6371.0088
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Distance orthodromique en km (scalaires ou tableaux NumPy, avec broadcasting)"""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lng1, lat2, lng2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def matrice_distances(lats, lngs):
+    """Matrice (n, n) des distances haversine entre tous les points, en km"""
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    return haversine_km(lats[:, None], lngs[:, None], lats[None, :], lngs[None, :])
+
+
+def projeter_metres(lats, lngs):
+    """Projection équirectangulaire locale (x, y) en mètres, suffisante à l'échelle d'une ville"""
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    lat0 = np.radians(lats.mean()) if len(lats) else 0.0
+    metres_par_degre = np.radians(1.0) * RAYON_TERRE_KM * 1000
+    return lngs * metres_par_degre * np.cos(lat0), lats * metres_par_degre
+
+
+def longueur_trace_km(lats, lngs):
+    """Longueur d'une trace (somme des tronçons successifs), en km"""
+    if len(lats) < 2:
+        return 0.0
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    return float(haversine_km(lats[:-1], lngs[:-1], lats[1:], lngs[1:]).sum())
+
+
+def douglas_peucker(lats, lngs, tolerance_m):
+    """
+    Masque des points conservés par Douglas-Peucker (tolérance en mètres).
+    Version itérative : une pile d'intervalles, et pour chacun les distances
+    de tous ses points au segment calculées d'un coup.
+    """
+    n = len(lats)
+    garder = np.zeros(n, dtype=bool)
+    if n <= 2:
+        garder[:] = True
+        return garder
+    x, y = projeter_metres(lats, lngs)
+    garder[[0, -1]] = True
+
+    pile = [(0, n - 1)]
+    while pile:
+        debut, fin = pile.pop()
+        if fin - debut < 2:
+            continue
+        dx, dy = x[fin] - x[debut], y[fin] - y[debut]
+        px, py = x[debut + 1:fin] - x[debut], y[debut + 1:fin] - y[debut]
+        longueur2 = dx * dx + dy * dy
+        if longueur2 == 0:
+            distances = np.hypot(px, py)
+        else:
+            # Distance au segment (et non à la droite) : les allers-retours sont conservés
+            t = np.clip((px * dx + py * dy) / longueur2, 0.0, 1.0)
+            distances = np.hypot(px - t * dx, py - t * dy)
+        rang = int(distances.argmax())
+        if distances[rang] > tolerance_m:
+            milieu = debut + 1 + rang
+            garder[milieu] = True
+            pile.append((debut, milieu))
+            pile.append((milieu, fin))
+    return garder
+
+
+def parser_bbox(valeur):
+    """
+    Boîte `min_lng,min_lat,max_lng,max_lat` (ordre GeoJSON) d'un paramètre de requête.
+    Lève ValueError si elle est mal formée.
+    """
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in valeur.split(','))
+    except (AttributeError, ValueError):
+        raise ValueError('bbox doit être de la forme min_lng,min_lat,max_lng,max_lat')
+    if not (-180 <= min_lng <= max_lng <= 180 and -90 <= min_lat <= max_lat <= 90):
+        raise ValueError('bbox hors limites')
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def bbox_tuile(z, x, y):
+    """Boîte (min_lng, min_lat, max_lng, max_lat) de la tuile z/x/y (schéma XYZ, Web Mercator)"""
+    n = 2 ** z
+    def latitude(rang):
+        return float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * rang / n)))))
+    return x / n * 360 - 180, latitude(y + 1), (x + 1) / n * 360 - 180, latitude(y)
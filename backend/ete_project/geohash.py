@@ -0,0 +1,142 @@
+"""
+Geohash des positions et requêtes par boîte englobante
+
+Chaque modèle géolocalisé garde le geohash de sa position (9 caractères,
+cellules d'environ 5 m) dans une colonne indexée. Les cellules proches ont
+des geohash proches dans l'ordre alphabétique : une boîte englobante se
+traduit en quelques intervalles [début, fin) de geohash, lus par des range
+scans sur l'index, puis affinés par les coordonnées exactes.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+
+ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION_GEOHASH = 9
+MAX_CELLULES = 64
+TAILLE_LOT = 5000
+
+_CARACTERES = np.array(list(ALPHABET))
+
+
+def _bits(precision):
+    """Nombre de bits de longitude et de latitude d'un geohash de `precision` caractères"""
+    total = 5 * precision
+    return (total + 1) // 2, total // 2
+
+
+def dimensions_cellule(precision):
+    """Largeur (longitude) et hauteur (latitude) en degrés d'une cellule de `precision` caractères"""
+    bits_lng, bits_lat = _bits(precision)
+    return 360 / (1 << bits_lng), 180 / (1 << bits_lat)
+
+
+def _indices(lats, lngs, precision):
+    """Indices (ligne, colonne) des cellules de la grille de `precision` contenant les points"""
+    bits_lng, bits_lat = _bits(precision)
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    i = np.floor((lats + 90) / 180 * (1 << bits_lat)).astype(np.int64)
+    j = np.floor((lngs + 180) / 360 * (1 << bits_lng)).astype(np.int64)
+    return np.clip(i, 0, (1 << bits_lat) - 1), np.clip(j, 0, (1 << bits_lng) - 1)
+
+
+def _codes(i, j, precision):
+    """Entrelace les bits (longitude d'abord) : numéro de la cellule dans l'ordre des geohash"""
+    bits_lng, bits_lat = _bits(precision)
+    codes = np.zeros(np.shape(i), dtype=np.int64)
+    for rang in range(5 * precision):
+        if rang % 2 == 0:
+            bit = (j >> (bits_lng - 1 - rang // 2)) & 1
+        else:
+            bit = (i >> (bits_lat - 1 - rang // 2)) & 1
+        codes = (codes << 1) | bit
+    return codes
+
+
+def _textes(codes, precision):
+    caracteres = [_CARACTERES[(codes >> (5 * (precision - 1 - rang))) & 31] for rang in range(precision)]
+    return [''.join(ligne) for ligne in np.stack(caracteres, axis=-1).reshape(-1, precision)]
+
+
+def encoder_geohashs(lats, lngs, precision=PRECISION_GEOHASH):
+    """Geohash de plusieurs points en une passe vectorisée"""
+    i, j = _indices(lats, lngs, precision)
+    return _textes(_codes(i, j, precision), precision)
+
+
+def geohash_de(lat, lng, precision=PRECISION_GEOHASH):
+    """Geohash d'une position, ou chaîne vide si elle est incomplète"""
+    if lat is None or lng is None:
+        return ''
+    return encoder_geohashs([float(lat)], [float(lng)], precision)[0]
+
+
+def plages_geohash(bbox, max_cellules=MAX_CELLULES, precision_max=PRECISION_GEOHASH):
+    """
+    Intervalles [début, fin) de geohash couvrant la boîte (fin None : jusqu'au bout).
+    La précision est la plus fine (jusqu'à `precision_max`) pour laquelle la boîte
+    tient en `max_cellules` cellules ; les cellules consécutives sont fusionnées
+    en un seul intervalle.
+    """
+    min_lng, min_lat, max_lng, max_lat = bbox
+    for precision in range(precision_max, 0, -1):
+        (i0, i1), (j0, j1) = _indices([min_lat, max_lat], [min_lng, max_lng], precision)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) <= max_cellules:
+            break
+    i, j = np.meshgrid(np.arange(i0, i1 + 1), np.arange(j0, j1 + 1), indexing='ij')
+    codes = np.unique(_codes(i.ravel(), j.ravel(), precision))
+
+    # Une rupture dans la suite des numéros ferme un intervalle
+    ruptures = np.flatnonzero(np.diff(codes) != 1) + 1
+    debuts = np.concatenate([codes[:1], codes[ruptures]])
+    fins = np.concatenate([codes[ruptures - 1], codes[-1:]]) + 1
+
+    dernier = 1 << (5 * precision)
+    textes_debuts = _textes(debuts, precision)
+    textes_fins = _textes(np.minimum(fins, dernier - 1), precision)
+    return [
+        (debut, fin if code_fin < dernier else None)
+        for debut, fin, code_fin in zip(textes_debuts, textes_fins, fins)
+    ]
+
+
+def filtre_bbox(bbox, champ_lat='latitude', champ_lng='longitude', champ_geohash='geohash',
+                precision_max=PRECISION_GEOHASH):
+    """
+    Condition « dans la boîte » : intervalles de geohash (index) puis coordonnées exactes.
+    `precision_max` ne doit pas dépasser la longueur des geohash stockés.
+    """
+    plages = Q()
+    for debut, fin in plages_geohash(bbox, precision_max=precision_max):
+        plage = Q(**{f'{champ_geohash}__gte': debut})
+        if fin is not None:
+            plage &= Q(**{f'{champ_geohash}__lt': fin})
+        plages |= plage
+
+    min_lng, min_lat, max_lng, max_lat = bbox
+    return plages & Q(**{
+        f'{champ_lat}__gte': min_lat, f'{champ_lat}__lte': max_lat,
+        f'{champ_lng}__gte': min_lng, f'{champ_lng}__lte': max_lng,
+    })
+
+
+def remplir_geohash(modele, champ_lat, champ_lng, taille_lot=TAILLE_LOT):
+    """Calcule en masse le geohash des lignes positionnées (lots par id croissant)"""
+    dernier_id = 0
+    total = 0
+    while True:
+        lignes = list(
+            modele.objects.filter(id__gt=dernier_id)
+            .exclude(**{f'{champ_lat}__isnull': True}).exclude(**{f'{champ_lng}__isnull': True})
+            .order_by('id').values_list('id', champ_lat, champ_lng)[:taille_lot]
+        )
+        if not lignes:
+            return total
+        dernier_id = lignes[-1][0]
+
+        geohashs = encoder_geohashs([ligne[1] for ligne in lignes], [ligne[2] for ligne in lignes])
+        objets = [modele(id=ligne[0], geohash=geohash) for ligne, geohash in zip(lignes, geohashs)]
+        with transaction.atomic():
+            modele.objects.bulk_update(objets, ['geohash'], batch_size=1000)
+        total += len(objets)
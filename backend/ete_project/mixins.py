@@ -0,0 +1,164 @@
+"""
+Mixins partagés par les viewsets et les serializers
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parametre_liste(request, nom):
+    """Valeurs d'un paramètre de requête séparées par des virgules (`?fields=id,nom`)"""
+    valeurs = request.query_params.get(nom, '')
+    return {valeur.strip() for valeur in valeurs.split(',') if valeur.strip()}
+
+
+def relations_utiles(champs, relations):
+    """Relations de `relations` ({relation: champs qui la lisent}) utiles aux champs représentés"""
+    return [
+        relation for relation, noms in relations.items()
+        if champs is None or champs & set(noms)
+    ]
+
+
+class ChampsDynamiquesMixin:
+    """
+    Serializer dont la représentation se choisit par la requête.
+
+    `?fields=a,b` restreint la réponse aux champs demandés ; les relations
+    imbriquées listées dans `Meta.champs_expansibles` ne sont représentées
+    (et chargées) qu'avec `?expand=a,b`. Sans requête dans le contexte
+    (usage interne), ou pour une écriture, la représentation reste complète.
+
+    `preparer_queryset` ne lit alors que les colonnes utiles via `.only()` ;
+    les propriétés du modèle déclarent les colonnes qu'elles lisent dans
+    `Meta.colonnes_proprietes`.
+    """
+
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        self.champs_dynamiques = request is not None and request.method in SAFE_METHODS
+        if not self.champs_dynamiques:
+            return
+
+        demandes = parametre_liste(request, self.fields_query_param)
+        expansions = parametre_liste(request, self.expand_query_param)
+        expansibles = set(getattr(self.Meta, 'champs_expansibles', ()))
+        for nom in list(self.fields):
+            if nom in expansibles:
+                garder = nom in expansions
+            else:
+                garder = not demandes or nom in demandes
+            if not garder:
+                self.fields.pop(nom)
+
+    @classmethod
+    def optimiser_queryset(cls, queryset, champs=None):
+        """Relations à joindre ou précharger pour les champs représentés (aucune par défaut)"""
+        return queryset
+
+    def colonnes_lues(self, queryset):
+        """Colonnes du modèle lues par les champs représentés, ou None si on ne peut le savoir"""
+        modele = self.Meta.model
+        proprietes = getattr(self.Meta, 'colonnes_proprietes', {})
+        colonnes = {modele._meta.pk.name}
+
+        for nom, champ in self.fields.items():
+            if champ.write_only:
+                continue
+            if nom in proprietes:
+                colonnes.update(proprietes[nom])
+                continue
+            if isinstance(champ, (serializers.BaseSerializer, serializers.SerializerMethodField)):
+                # Relations imbriquées : préchargées par optimiser_queryset
+                continue
+            if champ.source == '*':
+                return None
+            source = champ.source_attrs[0]
+            if source in queryset.query.annotations:
+                continue
+            try:
+                champ_modele = modele._meta.get_field(source)
+            except FieldDoesNotExist:
+                # Propriété sans colonnes déclarées : pas de restriction
+                return None
+            if champ_modele.concrete:
+                colonnes.add(source)
+
+        # Une relation jointe doit être lue, sans quoi Django refuse la jointure
+        if isinstance(queryset.query.select_related, dict):
+            colonnes.update(queryset.query.select_related)
+        return colonnes
+
+    def preparer_queryset(self, queryset, colonnes_supplementaires=()):
+        """Relations des champs représentés, et seulement leurs colonnes pour une lecture"""
+        queryset = self.optimiser_queryset(queryset, set(self.fields))
+        if not self.champs_dynamiques:
+            return queryset
+        colonnes = self.colonnes_lues(queryset)
+        if colonnes is None:
+            return queryset
+        return queryset.only(*colonnes, *colonnes_supplementaires)
+
+
+class ChargementOptimiseMixin:
+    """
+    Applique au queryset du viewset les relations déclarées par son serializer.
+
+    Un serializer qui définit `optimiser_queryset(queryset, champs=None)` y
+    indique ses select_related / prefetch_related / comptes annotés ; le nombre
+    de requêtes d'une liste ne dépend alors plus du nombre de lignes.
+
+    `serializer_liste_class` donne la représentation compacte de l'action
+    `list` ; elle est remplacée par le serializer complet dès que `?fields=`
+    ou `?expand=` choisit les champs.
+    """
+
+    serializer_liste_class = None
+
+    def get_serializer_class(self):
+        parametres = {ChampsDynamiquesMixin.fields_query_param, ChampsDynamiquesMixin.expand_query_param}
+        if (
+            self.action == 'list'
+            and self.serializer_liste_class is not None
+            and not parametres & set(self.request.query_params)
+        ):
+            return self.serializer_liste_class
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        return self.preparer_queryset(super().get_queryset())
+
+    def colonnes_de_tri(self):
+        """Colonnes du tri (lues par la pagination par curseur)"""
+        modele = self.queryset.model
+        tri = list(getattr(self, 'ordering', None) or [])
+        tri += self.request.query_params.get('ordering', '').split(',')
+        colonnes = set()
+        for champ in tri:
+            nom = champ.strip().lstrip('-')
+            try:
+                if nom and modele._meta.get_field(nom).concrete:
+                    colonnes.add(nom)
+            except FieldDoesNotExist:
+                continue
+        return colonnes
+
+    def preparer_queryset(self, queryset):
+        """Queryset préparé pour le serializer de l'action courante"""
+        return optimiser_queryset(self.get_serializer(), queryset, self.colonnes_de_tri())
+
+
+def optimiser_queryset(serializer, queryset, colonnes_supplementaires=()):
+    """
+    Queryset préparé pour `serializer` (inchangé si le serializer ne déclare rien).
+    Une instance à champs dynamiques restreint aussi les colonnes lues.
+    """
+    preparer = getattr(serializer, 'preparer_queryset', None)
+    if preparer is not None and not isinstance(serializer, type):
+        return preparer(queryset, colonnes_supplementaires)
+    optimiser = getattr(serializer, 'optimiser_queryset', None)
+    return optimiser(queryset) if optimiser else queryset
@@ -0,0 +1,199 @@
+"""
+Pagination des API
+
+Par défaut, pagination par numéro de page (COUNT + OFFSET). Les clients qui
+parcourent de longues listes (applications mobiles, synchronisation) peuvent
+demander une pagination par curseur avec `?pagination=curseur` : le curseur
+contient la clé de tri complète du dernier élément (départagée par l'id), et
+la page suivante est lue par une condition sur cette clé, servie par l'index
+correspondant, en temps constant quelle que soit la profondeur.
+
+Les clés de tri qui peuvent être NULL sont triées avec NULL comme plus
+grande valeur (en fin d'ordre croissant, en tête d'ordre décroissant, comme
+PostgreSQL par défaut) quel que soit le SGBD, et la condition sur la clé
+traite explicitement les NULL.
+"""
+import base64
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CurseurEncoder(DjangoJSONEncoder):
+    """Comme DjangoJSONEncoder, mais sans tronquer les microsecondes (la clé doit rester exacte)"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CurseurPagination(BasePagination):
+    """Pagination par clé (keyset) sur l'ordre de tri du viewset"""
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Curseur invalide'
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    def get_ordering(self, request, queryset, view):
+        """Ordre du filtre OrderingFilter, sinon du viewset, complété par l'id"""
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = ordering or getattr(view, 'ordering', None) or queryset.query.order_by or ['-id']
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        ordering = [champ.replace('pk', 'id') if champ.lstrip('-') == 'pk' else champ for champ in ordering]
+
+        # Départage stable des égalités sur la clé de tri
+        if not {'id', '-id'} & set(ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            return json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        encoded = base64.urlsafe_b64encode(json.dumps(position, cls=CurseurEncoder).encode('utf-8'))
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded.decode('ascii'))
+
+    @staticmethod
+    def nullable(model, champ):
+        """La clé de tri (éventuellement à travers des relations) peut-elle être NULL ?"""
+        for partie in champ.lstrip('-').split('__'):
+            try:
+                field = model._meta.get_field(partie)
+            except FieldDoesNotExist:
+                return True  # annotation : rien ne garantit une valeur
+            if field.null or (field.is_relation and not field.concrete):
+                return True
+            if field.is_relation:
+                model = field.related_model
+        return False
+
+    @staticmethod
+    def expression_tri(champ, nullable):
+        """Tri du champ, NULL placé comme la plus grande valeur"""
+        if not nullable:
+            return champ
+        if champ.startswith('-'):
+            return F(champ[1:]).desc(nulls_first=True)
+        return F(champ).asc(nulls_last=True)
+
+    def filtre_apres(self, ordering, position, nullables=()):
+        """
+        Condition « strictement après `position` » dans l'ordre lexicographique
+        de `ordering` ; `nullables` : champs triés avec NULL comme plus grande valeur.
+        """
+        if len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        egalites = Q()
+        for champ, valeur in zip(ordering, position):
+            nom = champ.lstrip('-')
+            decroissant = champ.startswith('-')
+            if valeur is None:
+                # Après NULL : rien en ordre croissant, toutes les valeurs non nulles en décroissant
+                if decroissant:
+                    condition |= egalites & Q(**{f'{nom}__isnull': False})
+                egalites &= Q(**{f'{nom}__isnull': True})
+                continue
+            apres = Q(**{f'{nom}__{"lt" if decroissant else "gt"}': valeur})
+            if champ in nullables and not decroissant:
+                apres |= Q(**{f'{nom}__isnull': True})
+            condition |= egalites & apres
+            egalites &= Q(**{nom: valeur})
+        return condition
+
+    @staticmethod
+    def valeur(instance, champ):
+        """Valeur de la clé de tri sur une instance (id pour une clé étrangère)"""
+        parties = champ.lstrip('-').split('__')
+        for attribut in parties[:-1]:
+            instance = getattr(instance, attribut, None)
+            if instance is None:
+                return None
+        return instance.serializable_value(parties[-1])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = remove_query_param(request.build_absolute_uri(), self.cursor_query_param)
+        self.page_size = self.get_page_size(request)
+        ordering = self.get_ordering(request, queryset, view)
+        position = self.decode_cursor(request)
+
+        nullables = {champ for champ in ordering if self.nullable(queryset.model, champ)}
+        queryset = queryset.order_by(*[self.expression_tri(champ, champ in nullables) for champ in ordering])
+        if position is not None:
+            queryset = queryset.filter(self.filtre_apres(ordering, position, nullables))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        self.next_position = None
+        if self.has_next:
+            dernier = self.page[-1]
+            self.next_position = [self.valeur(dernier, champ) for champ in ordering]
+        return self.page
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class PaginationHybride(PageNumberPagination):
+    """Pagination par numéro de page, ou par curseur sur demande (`?pagination=curseur`)"""
+
+    mode_query_param = 'pagination'
+    curseur_pagination_class = CurseurPagination
+
+    def mode_curseur(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'curseur'
+            or self.curseur_pagination_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.curseur = None
+        if self.mode_curseur(request):
+            self.curseur = self.curseur_pagination_class(self.page_size)
+            return self.curseur.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.curseur is not None:
+            return self.curseur.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -44,6 +44,9 @@ LOCAL_APPS = [
     'collectes',
     'paiements',
     'notifications',
+    'rapports',
+    'synchronisation',
+    'temps_reel',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -111,6 +114,18 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Cache (compteurs du tableau de bord, indicateurs)
+# Cache local au processus : les versions d'index et de cache (zones, journées,
+# tuiles) ne sont partagées qu'entre les requêtes d'un même processus. Avec
+# plusieurs workers, configurer un cache partagé (Redis, Memcached).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ete-cache',
+    }
+}
+
+
 # Internationalization
 LANGUAGE_CODE = 'fr-fr'
 TIME_ZONE = 'Africa/Tunis'
@@ -141,7 +156,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'ete_project.pagination.PaginationHybride',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
 }
@@ -173,4 +188,9 @@ ETE_CONFIG = {
         'lng': 10.1815
     },
     'DEFAULT_MAP_ZOOM': 12,
+    # Dépôt de départ des véhicules (optimisation des tournées)
+    'DEPOT': {
+        'lat': 36.8065,
+        'lng': 10.1815
+    },
 }
@@ -0,0 +1,95 @@
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from clients.models import CelluleCarte
+from .geohash import encoder_geohashs, geohash_de, plages_geohash
+from .pagination import CurseurPagination
+
+
+class CurseurPaginationNullTest(TestCase):
+    """Le parcours par curseur renvoie chaque ligne une fois, y compris avec des clés de tri NULL"""
+
+    OBJETS = [None, 3, None, 1, 2, None, 3, 1]
+
+    def setUp(self):
+        for n, objet_id in enumerate(self.OBJETS):
+            CelluleCarte.objects.create(
+                couche='clients', precision=8, geohash=f'sbcdefg{n}', nombre=1,
+                latitude=0, longitude=0, objet_id=objet_id
+            )
+
+    def _parcourir(self, ordering, taille=2):
+        """Identifiants de toutes les pages, dans l'ordre de lecture"""
+        vue = type('Vue', (), {'ordering': ordering, 'filter_backends': []})()
+        factory = APIRequestFactory()
+        parametres, ids = {}, []
+        while True:
+            pagination = CurseurPagination(taille)
+            requete = Request(factory.get('/cellules/', parametres))
+            page = pagination.paginate_queryset(CelluleCarte.objects.all(), requete, vue)
+            ids.extend(cellule.id for cellule in page)
+            suivante = pagination.get_next_link()
+            if suivante is None:
+                return ids
+            parametres = {'cursor': parse_qs(urlparse(suivante).query)['cursor'][0]}
+
+    def _attendu(self, decroissant):
+        # NULL est la plus grande valeur, départage par id dans le sens du tri
+        cellules = CelluleCarte.objects.values_list('id', 'objet_id')
+        cle = lambda cellule: (cellule[1] is None, cellule[1] or 0, cellule[0])
+        return [cellule[0] for cellule in sorted(cellules, key=cle, reverse=decroissant)]
+
+    def test_ordre_croissant(self):
+        self.assertEqual(self._parcourir(['objet_id']), self._attendu(decroissant=False))
+
+    def test_ordre_decroissant(self):
+        self.assertEqual(self._parcourir(['-objet_id']), self._attendu(decroissant=True))
+
+    def test_pages_d_une_ligne(self):
+        for ordering in (['objet_id'], ['-objet_id']):
+            with self.subTest(ordering=ordering):
+                ids = self._parcourir(ordering, taille=1)
+                self.assertEqual(sorted(ids), sorted(CelluleCarte.objects.values_list('id', flat=True)))
+                self.assertEqual(len(ids), len(set(ids)))
+
+    def test_cle_non_nullable_sans_condition_null(self):
+        pagination = CurseurPagination(2)
+        condition = pagination.filtre_apres(['precision', 'id'], [8, 5], nullables=set())
+        self.assertNotIn('isnull', str(condition))
+
+
+class GeohashTest(SimpleTestCase):
+    """Geohash de référence et intervalles couvrant une boîte"""
+
+    def test_valeurs_de_reference(self):
+        self.assertEqual(geohash_de(42.6, -5.6, precision=5), 'ezs42')
+        self.assertEqual(geohash_de(57.64911, 10.40744, precision=11), 'u4pruydqqvj')
+        self.assertEqual(encoder_geohashs([-90, 90], [-180, 180]), ['000000000', 'zzzzzzzzz'])
+        self.assertEqual(geohash_de(None, 10.18), '')
+
+    def test_boite_dans_une_cellule(self):
+        # Cellule snx1r : l'intervalle s'arrête à la cellule suivante dans l'ordre des geohash
+        self.assertEqual(geohash_de(36.801, 10.181, 5), 'snx1r')
+        self.assertEqual(plages_geohash((10.181, 36.801, 10.18101, 36.80101), precision_max=5), [('snx1r', 'snx1s')])
+
+    def test_monde_entier(self):
+        # 32 cellules consécutives : un seul intervalle ouvert jusqu'au bout
+        self.assertEqual(plages_geohash((-180, -90, 180, 90)), [('0', None)])
+
+    def test_intervalles_couvrent_la_boite(self):
+        bbox = (10.1, 36.75, 10.3, 36.9)
+        plages = plages_geohash(bbox)
+        self.assertEqual(plages, sorted(plages))
+        for (_, fin), (debut_suivant, _) in zip(plages, plages[1:]):
+            self.assertLess(fin, debut_suivant)
+
+        aleatoire = np.random.default_rng(3)
+        lngs, lats = aleatoire.uniform(10.1, 10.3, 300), aleatoire.uniform(36.75, 36.9, 300)
+        for geohash in encoder_geohashs(lats, lngs):
+            self.assertTrue(any(
+                debut <= geohash and (fin is None or geohash < fin) for debut, fin in plages
+            ), geohash)
@@ -56,6 +56,8 @@ urlpatterns = [
     path('api/collectes/', include('collectes.urls')),
     path('api/paiements/', include('paiements.urls')),
     path('api/notifications/', include('notifications.urls')),
+    path('api/sync/', include('synchronisation.urls')),
+    path('api/temps-reel/', include('temps_reel.urls')),
 ]
 
 # Configuration pour les fichiers media en développement
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_notification', models.CharField(choices=[('collecte', 'Collecte'), ('paiement', 'Paiement'), ('client', 'Client'), ('systeme', 'Système')], max_length=15)),
+                ('priorite', models.CharField(choices=[('haute', 'Haute'), ('moyenne', 'Moyenne'), ('basse', 'Basse')], default='moyenne', max_length=10)),
+                ('canal', models.CharField(choices=[('application', 'Application'), ('sms', 'SMS'), ('email', 'Email')], default='application', max_length=15)),
+                ('titre', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('lue', models.BooleanField(default=False)),
+                ('date_lecture', models.DateTimeField(blank=True, null=True)),
+                ('envoyee', models.BooleanField(default=False)),
+                ('date_envoi', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('destinataire', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Notification',
+                'verbose_name_plural': 'Notifications',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['destinataire', 'lue'], name='notificatio_destina_d40d57_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,54 @@
 from django.db import models
+from django.contrib.auth import get_user_model
 
-# Create your models here.
+User = get_user_model()
+
+class Notification(models.Model):
+    """Notifications envoyées aux utilisateurs (application, SMS, email)"""
+    
+    TYPE_CHOICES = (
+        ('collecte', 'Collecte'),
+        ('paiement', 'Paiement'),
+        ('client', 'Client'),
+        ('systeme', 'Système'),
+    )
+    
+    PRIORITE_CHOICES = (
+        ('haute', 'Haute'),
+        ('moyenne', 'Moyenne'),
+        ('basse', 'Basse'),
+    )
+    
+    CANAL_CHOICES = (
+        ('application', 'Application'),
+        ('sms', 'SMS'),
+        ('email', 'Email'),
+    )
+    
+    destinataire = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    type_notification = models.CharField(max_length=15, choices=TYPE_CHOICES)
+    priorite = models.CharField(max_length=10, choices=PRIORITE_CHOICES, default='moyenne')
+    canal = models.CharField(max_length=15, choices=CANAL_CHOICES, default='application')
+    
+    titre = models.CharField(max_length=200)
+    message = models.TextField()
+    reference = models.CharField(max_length=100, blank=True)  # Ex : numéro de facture concerné
+    
+    # Suivi
+    lue = models.BooleanField(default=False)
+    date_lecture = models.DateTimeField(blank=True, null=True)
+    envoyee = models.BooleanField(default=False)
+    date_envoi = models.DateTimeField(blank=True, null=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Notification'
+        verbose_name_plural = 'Notifications'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['destinataire', 'lue']),
+        ]
+    
+    def __str__(self):
+        return f"{self.titre} - {self.destinataire}"
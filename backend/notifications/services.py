@@ -0,0 +1,12 @@
+"""
+Envoi de notifications en masse
+"""
+from .models import Notification
+
+TAILLE_LOT = 1000
+
+
+def notifier_en_masse(notifications, taille_lot=TAILLE_LOT):
+    """Enregistre une liste de Notification non sauvegardées par bulk_create"""
+    Notification.objects.bulk_create(notifications, batch_size=taille_lot)
+    return len(notifications)
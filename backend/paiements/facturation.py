@@ -0,0 +1,236 @@
+"""
+Facturation récurrente des contrats actifs
+
+Les montants sont calculés en centimes (entiers NumPy) pour tout un lot de
+contrats à la fois : pas d'arrondi flottant, et un arrondi au centime
+supérieur à partir du demi-centime, identique pour chaque facture.
+Les factures sont insérées par bulk_create, un lot de contrats par
+transaction ; une facture existe au plus une fois par (contrat, période),
+si bien qu'un run interrompu peut simplement être relancé.
+
+Les passages réalisés sont rattachés à un seul contrat du client (celui qui
+prévoyait ce passage), pour qu'un client ayant plusieurs contrats ne voie pas
+le même passage sur chacune de ses factures.
+"""
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Sum, Q
+from django.utils import timezone
+
+from clients.models import Contrat, ZoneCollecte
+from collectes.models import Collecte
+from collectes.planification import dates_planifiees, numeros_jours
+from .models import Facture
+
+TAILLE_LOT = 2000
+DELAI_PAIEMENT_JOURS = 30
+
+MOIS_PAR_PERIODE = {
+    'mensuel': 1,
+    'trimestriel': 3,
+    'semestriel': 6,
+    'annuel': 12,
+}
+
+
+def bornes_periode(debut, periode='mensuel'):
+    """Premier et dernier jour de la période commençant au mois de `debut`"""
+    debut = debut.replace(day=1)
+    mois = debut.month - 1 + MOIS_PAR_PERIODE[periode]
+    annee, mois = debut.year + mois // 12, mois % 12 + 1
+    return debut, date(annee, mois, 1) - timedelta(days=1)
+
+
+def en_centimes(valeurs):
+    """Decimal -> centimes entiers (int64), sans passer par les flottants"""
+    return np.array([int(Decimal(v or 0).scaleb(2).to_integral_value()) for v in valeurs], dtype=np.int64)
+
+
+def diviser_arrondi(numerateur, denominateur):
+    """Division entière arrondie au plus proche (demi vers le haut), vectorisée"""
+    return (2 * numerateur + denominateur) // (2 * denominateur)
+
+
+def calculer_montants(tarifs_mensuels, jours_factures, jours_periode, nombre_mois, taux_tva):
+    """
+    Montants HT, TVA et TTC en centimes pour un lot de contrats.
+    Le tarif mensuel est proratisé sur les jours couverts par le contrat.
+    """
+    tarifs = en_centimes(tarifs_mensuels)
+    jours_factures = np.asarray(jours_factures, dtype=np.int64)
+    ht = diviser_arrondi(tarifs * nombre_mois * jours_factures, np.int64(jours_periode))
+    # Taux en points de base : 18.00 % -> 1800
+    taux = en_centimes(taux_tva)
+    tva = diviser_arrondi(ht * taux, np.int64(10000))
+    return ht, tva, ht + tva
+
+
+def _centimes_en_decimal(valeur):
+    return Decimal(int(valeur)).scaleb(-2)
+
+
+def _numero_facture(debut, contrat_id):
+    """Numéro déterministe : relancer un run ne crée pas de doublon"""
+    return f"ETE-{debut:%Y}-{debut:%m}{contrat_id:06d}"
+
+
+def _realise_par_contrat(client_ids, debut, fin):
+    """
+    Passages réalisés et quantité collectée par contrat. Chaque jour de passage
+    d'un client revient à un seul de ses contrats actifs ce jour-là : le plus
+    ancien qui prévoyait ce jour, à défaut le plus ancien actif. Tous les
+    contrats actifs des clients sont lus, y compris ceux d'un autre lot ou
+    déjà facturés, pour que le rattachement ne dépende pas du découpage.
+    """
+    contrats = defaultdict(list)
+    for contrat_id, client_id, frequence, jours, contrat_debut, contrat_fin in Contrat.objects.filter(
+        client_id__in=client_ids, status='actif', date_debut__lte=fin, date_fin__gte=debut
+    ).order_by('id').values_list('id', 'client_id', 'frequence_collecte', 'jours_collecte', 'date_debut', 'date_fin'):
+        prevus = set(dates_planifiees(
+            frequence, numeros_jours(jours), max(debut, contrat_debut), min(fin, contrat_fin)
+        ))
+        contrats[client_id].append((contrat_id, contrat_debut, contrat_fin, prevus))
+
+    lignes = Collecte.objects.filter(
+        client_id__in=client_ids,
+        tournee__date_tournee__range=[debut, fin],
+        status='completee',
+    ).values('client_id', 'tournee__date_tournee').annotate(
+        passages=Count('id'), quantite=Sum('quantite_estimee')
+    ).order_by()
+
+    realise = {}
+    for ligne in lignes:
+        jour = ligne['tournee__date_tournee']
+        actifs = [contrat for contrat in contrats[ligne['client_id']] if contrat[1] <= jour <= contrat[2]]
+        if not actifs:
+            continue
+        contrat_id = next((contrat[0] for contrat in actifs if jour in contrat[3]), actifs[0][0])
+        passages, quantite = realise.get(contrat_id, (0, Decimal('0.00')))
+        realise[contrat_id] = (passages + ligne['passages'], quantite + (ligne['quantite'] or Decimal('0.00')))
+    return realise
+
+
+def facturer_lot(contrats, debut, fin, periode, date_emission):
+    """Crée les factures d'un lot de contrats (tuples issus de `contrats_a_facturer`)"""
+    if not contrats:
+        return 0
+
+    jours_periode = (fin - debut).days + 1
+    jours_factures = [
+        (min(fin, contrat_fin) - max(debut, contrat_debut)).days + 1
+        for _, _, _, _, _, contrat_debut, contrat_fin in contrats
+    ]
+    taux_tva = Facture._meta.get_field('taux_tva').default
+    ht, tva, ttc = calculer_montants(
+        [contrat[2] for contrat in contrats], jours_factures, jours_periode,
+        MOIS_PAR_PERIODE[periode], [taux_tva] * len(contrats)
+    )
+    realise = _realise_par_contrat({contrat[1] for contrat in contrats}, debut, fin)
+    date_echeance = date_emission + timedelta(
+        days=settings.ETE_CONFIG.get('DELAI_PAIEMENT_JOURS', DELAI_PAIEMENT_JOURS)
+    )
+
+    factures = []
+    for i, (contrat_id, client_id, _, frequence, jours, contrat_debut, contrat_fin) in enumerate(contrats):
+        passages_prevus = len(dates_planifiees(
+            frequence, numeros_jours(jours), max(debut, contrat_debut), min(fin, contrat_fin)
+        ))
+        passages_realises, quantite = realise.get(contrat_id, (0, Decimal('0.00')))
+        factures.append(Facture(
+            numero_facture=_numero_facture(debut, contrat_id),
+            client_id=client_id,
+            contrat_id=contrat_id,
+            periode_facturation=periode,
+            date_debut_periode=debut,
+            date_fin_periode=fin,
+            montant_ht=_centimes_en_decimal(ht[i]),
+            taux_tva=taux_tva,
+            montant_tva=_centimes_en_decimal(tva[i]),
+            montant_ttc=_centimes_en_decimal(ttc[i]),
+            nombre_passages_prevu=passages_prevus,
+            nombre_passages_realise=passages_realises,
+            quantite_collectee=quantite,
+            status='emise',
+            date_emission=date_emission,
+            date_echeance=date_echeance,
+            generee_automatiquement=True,
+        ))
+
+    # ignore_conflicts saute les factures déjà créées (run concurrent ou relancé) :
+    # seules les lignes réellement insérées sont comptées
+    deja_facturees = Facture.objects.filter(
+        contrat_id__in=[contrat[0] for contrat in contrats], date_debut_periode=debut
+    )
+    with transaction.atomic():
+        avant = deja_facturees.count()
+        Facture.objects.bulk_create(factures, batch_size=500, ignore_conflicts=True)
+        return deja_facturees.count() - avant
+
+
+def contrats_a_facturer(debut, fin, zone_ids=None, sans_zone=False):
+    """Contrats actifs sur la période, hors ceux déjà facturés, triés par id"""
+    contrats = Contrat.objects.filter(
+        status='actif', date_debut__lte=fin, date_fin__gte=debut
+    ).exclude(
+        id__in=Facture.objects.filter(date_debut_periode=debut).values('contrat_id')
+    )
+    if zone_ids is not None:
+        filtre = Q(client__zone_collecte_id__in=zone_ids)
+        if sans_zone:
+            filtre |= Q(client__zone_collecte__isnull=True)
+        contrats = contrats.filter(filtre)
+    return contrats.order_by('id').values_list(
+        'id', 'client_id', 'tarif_mensuel', 'frequence_collecte',
+        'jours_collecte', 'date_debut', 'date_fin'
+    )
+
+
+def facturer_periode(debut, periode='mensuel', date_emission=None, zone_ids=None, sans_zone=False):
+    """
+    Facture tous les contrats actifs de la période (éventuellement restreints à des zones).
+    Chaque lot est validé séparément : un run interrompu reprend là où il s'était arrêté.
+    """
+    debut, fin = bornes_periode(debut, periode)
+    date_emission = date_emission or timezone.localdate()
+    contrats = contrats_a_facturer(debut, fin, zone_ids, sans_zone)
+    total = 0
+    dernier_id = 0
+    while True:
+        # Pagination par clé : chaque lot relit les contrats restants après le précédent
+        lot = list(contrats.filter(id__gt=dernier_id)[:TAILLE_LOT])
+        if not lot:
+            return total
+        total += facturer_lot(lot, debut, fin, periode, date_emission)
+        dernier_id = lot[-1][0]
+
+
+def _facturer_zones(arguments):
+    """Point d'entrée d'un processus du pool"""
+    debut, periode, date_emission, zone_ids, sans_zone = arguments
+    try:
+        return facturer_periode(debut, periode, date_emission, zone_ids, sans_zone)
+    finally:
+        connections.close_all()
+
+
+def facturer_periode_parallele(debut, periode='mensuel', date_emission=None, processus=4):
+    """Répartit les zones de collecte entre plusieurs processus"""
+    date_emission = date_emission or timezone.localdate()
+    zone_ids = list(ZoneCollecte.objects.order_by('id').values_list('id', flat=True))
+    groupes = [zone_ids[i::processus] for i in range(processus)]
+    taches = [
+        (debut, periode, date_emission, groupe, i == 0)
+        for i, groupe in enumerate(groupes) if groupe or i == 0
+    ]
+
+    # Les processus fils ne doivent pas hériter des connexions du parent
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=processus) as pool:
+        return sum(pool.map(_facturer_zones, taches))
@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from paiements.facturation import MOIS_PAR_PERIODE, facturer_periode, facturer_periode_parallele
+
+
+class Command(BaseCommand):
+    help = "Génère les factures de la période pour tous les contrats actifs (relançable sans doublon)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mois', help="Mois facturé (AAAA-MM, défaut : mois précédent)")
+        parser.add_argument('--periode', choices=list(MOIS_PAR_PERIODE), default='mensuel')
+        parser.add_argument('--processus', type=int, default=1, help="Nombre de processus (répartition par zone)")
+
+    def handle(self, *args, **options):
+        if options['mois']:
+            try:
+                debut = parse_date(f"{options['mois']}-01")
+            except ValueError:
+                debut = None  # mois impossible (ex. 2024-13)
+            if debut is None:
+                raise CommandError("Mois invalide, format attendu : AAAA-MM")
+        else:
+            debut = (timezone.localdate().replace(day=1) - timedelta(days=1)).replace(day=1)
+
+        if options['processus'] > 1:
+            total = facturer_periode_parallele(debut, options['periode'], processus=options['processus'])
+        else:
+            total = facturer_periode(debut, options['periode'])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} facture(s) générée(s) à partir du {debut:%d/%m/%Y}"))
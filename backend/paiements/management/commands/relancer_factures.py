@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from paiements.relances import executer_relances
+
+
+class Command(BaseCommand):
+    help = "Passe en retard les factures échues, envoie les rappels et met à jour la synthèse par zone"
+
+    def handle(self, *args, **options):
+        resultat = executer_relances()
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultat['factures_en_retard']} facture(s) passée(s) en retard, "
+            f"{resultat['relances_envoyees']} relance(s) envoyée(s)"
+        ))
+        for ligne in resultat['retards_par_zone']:
+            self.stdout.write(f"  {ligne['zone']} : {ligne['nombre']} facture(s), {ligne['montant_restant']} restant dû")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:46
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_demandeprospection_zone_collecte'),
+        ('paiements', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='facture',
+            unique_together={('contrat', 'date_debut_periode')},
+        ),
+    ]
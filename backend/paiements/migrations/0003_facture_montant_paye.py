@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:47
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def remplir_montant_paye(apps, schema_editor):
+    Facture = apps.get_model('paiements', 'Facture')
+    Paiement = apps.get_model('paiements', 'Paiement')
+    total = Paiement.objects.filter(
+        facture=models.OuterRef('pk'), status='valide'
+    ).values('facture').annotate(total=models.Sum('montant')).values('total')
+    Facture.objects.update(montant_paye=Coalesce(
+        models.Subquery(total, output_field=models.DecimalField(max_digits=10, decimal_places=2)),
+        Decimal('0.00')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paiements', '0002_facture_unique_periode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='facture',
+            name='montant_paye',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10),
+        ),
+        migrations.RunPython(remplir_montant_paye, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_demandeprospection_zone_collecte'),
+        ('paiements', '0003_facture_montant_paye'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='facture',
+            name='date_derniere_relance',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='facture',
+            name='nombre_relances',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='facture',
+            index=models.Index(fields=['status', 'date_echeance'], name='paiements_f_status_94455b_idx'),
+        ),
+    ]
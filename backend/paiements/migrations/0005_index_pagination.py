@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0003_index_pagination'),
+        ('paiements', '0004_facture_relances'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='facture',
+            index=models.Index(fields=['date_emission', 'id'], name='paiements_f_date_em_afa478_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paiement',
+            index=models.Index(fields=['date_paiement', 'id'], name='paiements_p_date_pa_47bc0d_idx'),
+        ),
+    ]
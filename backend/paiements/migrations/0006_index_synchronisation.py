@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0004_index_synchronisation'),
+        ('paiements', '0005_index_pagination'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='facture',
+            index=models.Index(fields=['updated_at', 'id'], name='paiements_f_updated_a637e6_idx'),
+        ),
+    ]
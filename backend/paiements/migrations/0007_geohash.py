@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+from ete_project.geohash import remplir_geohash
+
+
+def remplir_geohashs(apps, schema_editor):
+    remplir_geohash(apps.get_model('paiements', 'Paiement'), 'latitude_paiement', 'longitude_paiement')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0005_geohash'),
+        ('paiements', '0006_index_synchronisation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paiement',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='paiement',
+            index=models.Index(fields=['geohash', 'id'], name='paiements_p_geohash_069242_idx'),
+        ),
+        migrations.RunPython(remplir_geohashs, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,60 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from decimal import Decimal
 import uuid
 
 User = get_user_model()
 
+
+def _total_paye():
+    """Somme des paiements validés de la facture courante (sous-requête corrélée)"""
+    total = Paiement.objects.filter(
+        facture=models.OuterRef('pk'), status='valide'
+    ).values('facture').annotate(total=models.Sum('montant')).values('total')
+    return Coalesce(
+        models.Subquery(total, output_field=models.DecimalField(max_digits=10, decimal_places=2)),
+        Decimal('0.00')
+    )
+
+
+class FactureQuerySet(models.QuerySet):
+    """Requêtes sur les factures avec calcul des soldes en SQL"""
+    
+    def avec_soldes(self):
+        """Annote total_paye et montant_restant (une sous-requête, pas de requête par facture)"""
+        return self.annotate(
+            total_paye=_total_paye(),
+        ).annotate(
+            montant_restant=models.ExpressionWrapper(
+                models.F('montant_ttc') - models.F('total_paye'),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2)
+            )
+        )
+    
+    def mettre_a_jour_soldes(self):
+        """Recalcule le solde dénormalisé (montant_paye) et le statut de paiement des factures"""
+        maintenant = timezone.now()
+        ids = list(self.values_list('id', flat=True))
+        factures = Facture.objects.filter(id__in=ids)
+        factures.update(
+            montant_paye=_total_paye(),
+            updated_at=maintenant
+        )
+        
+        actives = factures.exclude(status__in=['brouillon', 'annulee'])
+        actives.filter(montant_paye__gte=models.F('montant_ttc')).exclude(status='payee').update(
+            status='payee', date_paiement_complet=maintenant, updated_at=maintenant
+        )
+        actives.filter(
+            montant_paye__gt=0, montant_paye__lt=models.F('montant_ttc'), status__in=['emise', 'payee']
+        ).update(status='partiellement_payee', date_paiement_complet=None, updated_at=maintenant)
+        actives.filter(
+            montant_paye__lte=0, status__in=['payee', 'partiellement_payee']
+        ).update(status='emise', date_paiement_complet=None, updated_at=maintenant)
+
+
 class Facture(models.Model):
     """Factures générées automatiquement selon la période de service"""
     
@@ -38,6 +88,7 @@ class Facture(models.Model):
     taux_tva = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal('18.00'))
     montant_tva = models.DecimalField(max_digits=10, decimal_places=2)
     montant_ttc = models.DecimalField(max_digits=10, decimal_places=2)
+    montant_paye = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))  # Paiements validés
     
     # Détails services
     nombre_passages_prevu = models.IntegerField()
@@ -50,16 +101,28 @@ class Facture(models.Model):
     date_echeance = models.DateField()
     date_paiement_complet = models.DateTimeField(blank=True, null=True)
     
+    # Relances
+    nombre_relances = models.IntegerField(default=0)
+    date_derniere_relance = models.DateField(blank=True, null=True)
+    
     # Génération automatique
     generee_automatiquement = models.BooleanField(default=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = FactureQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Facture'
         verbose_name_plural = 'Factures'
         ordering = ['-date_emission']
+        unique_together = ['contrat', 'date_debut_periode']
+        indexes = [
+            models.Index(fields=['status', 'date_echeance']),
+            models.Index(fields=['date_emission', 'id']),
+            models.Index(fields=['updated_at', 'id']),
+        ]
     
     def __str__(self):
         return f"Facture {self.numero_facture} - {self.client.display_name}"
@@ -78,9 +141,14 @@ class Facture(models.Model):
     
     @property
     def montant_restant(self):
-        """Calcule le montant restant à payer"""
-        total_paye = sum(p.montant for p in self.paiements.filter(status='valide'))
-        return self.montant_ttc - total_paye
+        """Montant restant à payer (valeur annotée par avec_soldes(), sinon solde dénormalisé)"""
+        if hasattr(self, '_montant_restant'):
+            return self._montant_restant
+        return self.montant_ttc - self.montant_paye
+    
+    @montant_restant.setter
+    def montant_restant(self, valeur):
+        self._montant_restant = valeur
     
     @property
     def is_en_retard(self):
@@ -135,6 +203,8 @@ class Paiement(models.Model):
     # Géolocalisation du paiement
     latitude_paiement = models.DecimalField(max_digits=10, decimal_places=8, blank=True, null=True)
     longitude_paiement = models.DecimalField(max_digits=11, decimal_places=8, blank=True, null=True)
+    # Geohash de la position (requêtes par boîte englobante)
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
     
     # Références externes
     reference_transaction = models.CharField(max_length=100, blank=True)  # Pour mobile money, MyPayBF
@@ -161,6 +231,10 @@ class Paiement(models.Model):
         verbose_name = 'Paiement'
         verbose_name_plural = 'Paiements'
         ordering = ['-date_paiement']
+        indexes = [
+            models.Index(fields=['date_paiement', 'id']),
+            models.Index(fields=['geohash', 'id']),
+        ]
     
     def __str__(self):
         return f"Paiement {self.numero_paiement} - {self.client.display_name}"
@@ -0,0 +1,122 @@
+"""
+Relance des factures impayées
+
+Le passage en retard est une seule requête UPDATE ; les rappels sont créés
+par lots via l'application notifications, au plus une fois par intervalle
+de relance et par facture. La synthèse par zone est mise en cache pour que
+le tableau de bord n'ait pas à parcourir les factures.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum, F, Q
+from django.utils import timezone
+
+from notifications.models import Notification
+from notifications.services import notifier_en_masse
+from .models import Facture
+
+TAILLE_LOT = 1000
+INTERVALLE_RELANCE_JOURS = 7
+RETARDS_CACHE_KEY = 'paiements:retards_par_zone'
+RETARDS_CACHE_TIMEOUT = 60 * 60 * 24
+
+STATUTS_NON_RELANCES = ['payee', 'annulee', 'brouillon']
+
+
+def marquer_factures_en_retard(aujourdhui=None):
+    """Passe en retard toutes les factures échues non réglées (une seule requête UPDATE)"""
+    aujourdhui = aujourdhui or timezone.localdate()
+    return Facture.objects.filter(
+        date_echeance__lt=aujourdhui
+    ).exclude(
+        status__in=STATUTS_NON_RELANCES + ['en_retard']
+    ).update(status='en_retard', updated_at=timezone.now())
+
+
+def _message_relance(numero, restant, echeance):
+    return (
+        f"Votre facture {numero} est échue depuis le {echeance:%d/%m/%Y}. "
+        f"Montant restant dû : {restant:.2f}. Merci de régulariser votre situation."
+    )
+
+
+def relancer_factures_en_retard(aujourdhui=None):
+    """Crée les rappels des factures en retard non relancées depuis INTERVALLE_RELANCE_JOURS"""
+    aujourdhui = aujourdhui or timezone.localdate()
+    limite = aujourdhui - timedelta(days=INTERVALLE_RELANCE_JOURS)
+    factures = Facture.objects.filter(status='en_retard').filter(
+        Q(date_derniere_relance__isnull=True) | Q(date_derniere_relance__lte=limite)
+    ).order_by('id').values_list(
+        'id', 'numero_facture', 'client__user_id', 'montant_ttc', 'montant_paye', 'date_echeance'
+    )
+
+    total = 0
+    dernier_id = 0
+    while True:
+        lot = list(factures.filter(id__gt=dernier_id)[:TAILLE_LOT])
+        if not lot:
+            return total
+        notifications = [
+            Notification(
+                destinataire_id=user_id,
+                type_notification='paiement',
+                priorite='haute',
+                titre=f"Facture {numero} en retard",
+                message=_message_relance(numero, montant_ttc - montant_paye, echeance),
+                reference=numero,
+            )
+            for _, numero, user_id, montant_ttc, montant_paye, echeance in lot
+        ]
+        with transaction.atomic():
+            notifier_en_masse(notifications)
+            Facture.objects.filter(id__in=[ligne[0] for ligne in lot]).update(
+                nombre_relances=F('nombre_relances') + 1,
+                date_derniere_relance=aujourdhui,
+                updated_at=timezone.now()
+            )
+        total += len(lot)
+        dernier_id = lot[-1][0]
+
+
+def calculer_retards_par_zone():
+    """Nombre de factures en retard et montant restant dû, par zone (une requête GROUP BY)"""
+    lignes = Facture.objects.filter(status='en_retard').values(
+        'client__zone_collecte_id', 'client__zone_collecte__nom_zone'
+    ).annotate(
+        nombre=Count('id'),
+        montant_restant=Sum(F('montant_ttc') - F('montant_paye')),
+    ).order_by('-montant_restant')
+    return [
+        {
+            'zone_id': ligne['client__zone_collecte_id'],
+            'zone': ligne['client__zone_collecte__nom_zone'] or 'Sans zone',
+            'nombre': ligne['nombre'],
+            'montant_restant': Decimal(ligne['montant_restant'] or 0).quantize(Decimal('0.01')),
+        }
+        for ligne in lignes
+    ]
+
+
+def get_retards_par_zone():
+    """Synthèse des retards par zone (cache rafraîchi par le job de relance)"""
+    retards = cache.get(RETARDS_CACHE_KEY)
+    if retards is None:
+        retards = calculer_retards_par_zone()
+        cache.set(RETARDS_CACHE_KEY, retards, RETARDS_CACHE_TIMEOUT)
+    return retards
+
+
+def executer_relances(aujourdhui=None):
+    """Job planifié : passage en retard, rappels puis synthèse par zone"""
+    en_retard = marquer_factures_en_retard(aujourdhui)
+    relances = relancer_factures_en_retard(aujourdhui)
+    retards = calculer_retards_par_zone()
+    cache.set(RETARDS_CACHE_KEY, retards, RETARDS_CACHE_TIMEOUT)
+    return {
+        'factures_en_retard': en_retard,
+        'relances_envoyees': relances,
+        'retards_par_zone': retards,
+    }
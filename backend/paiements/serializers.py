@@ -0,0 +1,25 @@
+from rest_framework import serializers
+from .models import Facture
+
+class FactureSerializer(serializers.ModelSerializer):
+    """Serializer pour les factures"""
+    
+    client_name = serializers.CharField(source='client.display_name', read_only=True)
+    numero_contrat = serializers.CharField(source='contrat.numero_contrat', read_only=True)
+    montant_restant = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    is_en_retard = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = Facture
+        fields = [
+            'id', 'numero_facture', 'client', 'client_name', 'contrat',
+            'numero_contrat', 'periode_facturation', 'date_debut_periode',
+            'date_fin_periode', 'montant_ht', 'taux_tva', 'montant_tva',
+            'montant_ttc', 'montant_paye', 'montant_restant',
+            'nombre_passages_prevu', 'nombre_passages_realise',
+            'quantite_collectee', 'status', 'is_en_retard', 'date_emission',
+            'date_echeance', 'date_paiement_complet', 'generee_automatiquement',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = ['numero_facture', 'montant_tva', 'montant_ttc', 'montant_paye']
+
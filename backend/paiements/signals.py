@@ -0,0 +1,28 @@
+from django.core.cache import cache
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from ete_project.geohash import geohash_de
+from .models import Facture, Paiement
+from .relances import RETARDS_CACHE_KEY
+
+@receiver(pre_save, sender=Paiement)
+def noter_facture_precedente(sender, instance, **kwargs):
+    """Facture actuellement en base, pour recalculer aussi son solde si le paiement en change"""
+    instance._facture_precedente_id = None
+    if instance.pk is not None:
+        instance._facture_precedente_id = Paiement.objects.filter(
+            pk=instance.pk
+        ).values_list('facture_id', flat=True).first()
+
+@receiver(post_save, sender=Paiement)
+@receiver(post_delete, sender=Paiement)
+def mettre_a_jour_solde_facture(sender, instance, **kwargs):
+    """Maintient le solde dénormalisé de la facture (et de l'ancienne s'il a changé de facture)"""
+    factures = {instance.facture_id, getattr(instance, '_facture_precedente_id', None)} - {None}
+    Facture.objects.filter(id__in=factures).mettre_a_jour_soldes()
+    cache.delete(RETARDS_CACHE_KEY)
+
+@receiver(pre_save, sender=Paiement)
+def calculer_geohash(sender, instance, **kwargs):
+    """Geohash à jour avec la position du paiement"""
+    instance.geohash = geohash_de(instance.latitude_paiement, instance.longitude_paiement)
@@ -1,3 +1,214 @@
-from django.test import TestCase
+import tempfile
+from datetime import date, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from agents.models import Agent, Equipe, Vehicule
+from clients.models import Client, Contrat, ZoneCollecte
+from collectes.models import Tournee, Collecte
+from .facturation import bornes_periode, calculer_montants, diviser_arrondi, facturer_periode
+from notifications.models import Notification
+from .models import Facture, Paiement
+from .relances import executer_relances, get_retards_par_zone
+
+User = get_user_model()
+
+
+class MontantsTest(SimpleTestCase):
+    """Montants en centimes, arrondis au demi-centime supérieur"""
+
+    def test_diviser_arrondi(self):
+        # 2,5 -> 3 ; 3,5 -> 4 ; 2 -> 2
+        self.assertEqual(diviser_arrondi(np.array([5, 7, 4]), 2).tolist(), [3, 4, 2])
+
+    def test_tva_arrondie_au_centime(self):
+        ht, tva, ttc = calculer_montants([Decimal('10.03')], [30], 30, 1, [Decimal('18.00')])
+        # 10,03 × 18 % = 1,8054 -> 1,81
+        self.assertEqual((int(ht[0]), int(tva[0]), int(ttc[0])), (1003, 181, 1184))
+
+    def test_prorata(self):
+        ht, _, _ = calculer_montants([Decimal('10.01')], [1], 30, 1, [Decimal('18.00')])
+        # 10,01 / 30 = 0,3337 -> 0,33
+        self.assertEqual(int(ht[0]), 33)
+        ht, _, _ = calculer_montants([Decimal('100.00')], [15], 30, 3, [Decimal('18.00')])
+        self.assertEqual(int(ht[0]), 15000)
+
+    def test_bornes_periode(self):
+        self.assertEqual(bornes_periode(date(2025, 11, 20), 'trimestriel'), (date(2025, 11, 1), date(2026, 1, 31)))
+        self.assertEqual(bornes_periode(date(2024, 2, 10)), (date(2024, 2, 1), date(2024, 2, 29)))
+
+
+class FacturationTest(TestCase):
+    """Facturation d'un client à deux contrats, relance sans doublon"""
+
+    JUIN = date(2025, 6, 1)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        reglages = override_settings(MEDIA_ROOT=media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+        admin = User.objects.create_user(
+            username='superviseur', email='superviseur@ete.test', user_type='admin', is_staff=True
+        )
+        zone = ZoneCollecte.objects.create(
+            nom_zone='Zone', code_zone='Z1', coordonnees_zone=[], responsable=admin
+        )
+        self.client_ete = Client.objects.create(
+            user=User.objects.create_user(username='client', email='client@ete.test'),
+            code_client='CLI-1', type_client='entreprise', service_address='Rue',
+            service_city='Ville', service_postal_code='1000', latitude=0, longitude=0, zone_collecte=zone
+        )
+        self.lundi, self.jeudi = [
+            Contrat.objects.create(
+                client=self.client_ete, numero_contrat=f'CTR-{jour}', date_debut=date(2025, 1, 1),
+                date_fin=date(2030, 12, 31), frequence_collecte='hebdomadaire',
+                jours_collecte=[jour], heure_passage=time(8), tarif_mensuel=Decimal('100.00')
+            )
+            for jour in ('lundi', 'jeudi')
+        ]
+        chef = Agent.objects.create(
+            user=User.objects.create_user(username='agent', email='agent@ete.test', user_type='agent_ramassage'),
+            matricule='AG-1', poste='ramasseur_ordures', date_embauche=date(2024, 1, 1)
+        )
+        vehicule = Vehicule.objects.create(
+            numero_plaque='PL-1', marque='Marque', modele='Modèle', annee=2020,
+            type_vehicule='camion_benne', capacite_charge=1000, capacite_volume=10
+        )
+        equipe = Equipe.objects.create(
+            nom_equipe='Équipe', chef_equipe=chef, vehicule_assigne=vehicule,
+            heure_debut=time(7), heure_fin=time(15)
+        )
+        # Lundi 2 et jeudi 5 juin : un passage réalisé pour chaque contrat
+        for jour, quantite in ((date(2025, 6, 2), Decimal('12.00')), (date(2025, 6, 5), Decimal('30.00'))):
+            tournee = Tournee.objects.create(
+                nom_tournee=f'Tournée {jour}', date_tournee=jour, heure_debut_prevue=time(7),
+                heure_fin_prevue=time(15), equipe_assignee=equipe, vehicule_assigne=vehicule, zone_collecte=zone
+            )
+            Collecte.objects.create(
+                tournee=tournee, client=self.client_ete, heure_passage_prevue=time(8), ordre_passage=1,
+                status='completee', quantite_estimee=quantite
+            )
+
+    def test_passages_rattaches_a_un_seul_contrat(self):
+        self.assertEqual(facturer_periode(self.JUIN, date_emission=date(2025, 7, 1)), 2)
+        factures = {facture.contrat_id: facture for facture in Facture.objects.all()}
+        self.assertEqual(factures[self.lundi.id].nombre_passages_realise, 1)
+        self.assertEqual(factures[self.lundi.id].quantite_collectee, Decimal('12.00'))
+        self.assertEqual(factures[self.jeudi.id].nombre_passages_realise, 1)
+        self.assertEqual(factures[self.jeudi.id].quantite_collectee, Decimal('30.00'))
+        self.assertEqual(factures[self.lundi.id].nombre_passages_prevu, 5)
+        self.assertEqual(factures[self.lundi.id].montant_ttc, Decimal('118.00'))
+
+    def test_relance_sans_doublon(self):
+        facturer_periode(self.JUIN, date_emission=date(2025, 7, 1))
+        self.assertEqual(facturer_periode(self.JUIN, date_emission=date(2025, 7, 1)), 0)
+        self.assertEqual(Facture.objects.count(), 2)
+
+
+class FacturesTestCase(TestCase):
+    """Un client et ses factures de mai et de juin, émises"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        reglages = override_settings(MEDIA_ROOT=media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        admin = User.objects.create_user(
+            username='superviseur', email='superviseur@ete.test', user_type='admin', is_staff=True
+        )
+        zone = ZoneCollecte.objects.create(
+            nom_zone='Zone', code_zone='Z1', coordonnees_zone=[], responsable=admin
+        )
+        self.client_ete = Client.objects.create(
+            user=User.objects.create_user(username='client', email='client@ete.test'),
+            code_client='CLI-1', type_client='particulier', service_address='Rue',
+            service_city='Ville', service_postal_code='1000', latitude=0, longitude=0, zone_collecte=zone
+        )
+        contrat = Contrat.objects.create(
+            client=self.client_ete, numero_contrat='CTR-1', date_debut=date(2025, 1, 1),
+            date_fin=date(2030, 12, 31), frequence_collecte='hebdomadaire',
+            jours_collecte=['lundi'], heure_passage=time(8), tarif_mensuel=Decimal('100.00')
+        )
+        self.mai, self.juin = [
+            Facture.objects.create(
+                client=self.client_ete, contrat=contrat, date_debut_periode=debut,
+                date_fin_periode=debut + timedelta(days=29), montant_ht=Decimal('100.00'),
+                nombre_passages_prevu=4, status='emise', date_emission=debut, date_echeance=debut + timedelta(days=30)
+            )
+            for debut in (date(2025, 5, 1), date(2025, 6, 1))
+        ]
+
+    def _payer(self, facture, montant, statut='valide'):
+        return Paiement.objects.create(
+            facture=facture, client=self.client_ete, montant=Decimal(montant),
+            mode_paiement='espece', status=statut, date_paiement=timezone.now()
+        )
+
+
+class SoldesTest(FacturesTestCase):
+    """Solde dénormalisé (montant_paye) et statut tenus à jour par les paiements"""
+
+    def test_solde_et_statut(self):
+        self._payer(self.mai, '50.00')
+        self._payer(self.mai, '500.00', statut='refuse')
+        self.mai.refresh_from_db()
+        self.assertEqual((self.mai.montant_paye, self.mai.status), (Decimal('50.00'), 'partiellement_payee'))
+
+        self._payer(self.mai, '68.00')
+        facture = Facture.objects.avec_soldes().get(id=self.mai.id)
+        self.assertEqual((facture.status, facture.montant_restant), ('payee', Decimal('0.00')))
+
+    def test_paiement_deplace(self):
+        paiement = self._payer(self.mai, '50.00')
+        paiement.facture = self.juin
+        paiement.save()
+        self.mai.refresh_from_db()
+        self.juin.refresh_from_db()
+        self.assertEqual((self.mai.montant_paye, self.mai.status), (Decimal('0.00'), 'emise'))
+        self.assertEqual((self.juin.montant_paye, self.juin.status), (Decimal('50.00'), 'partiellement_payee'))
+
+        paiement.delete()
+        self.juin.refresh_from_db()
+        self.assertEqual((self.juin.montant_paye, self.juin.status), (Decimal('0.00'), 'emise'))
+
+
+class RelancesTest(FacturesTestCase):
+    """Passage en retard, un rappel par intervalle de relance, synthèse par zone"""
+
+    def test_relances(self):
+        jour = date(2025, 6, 5)
+        resultat = executer_relances(jour)
+        self.assertEqual((resultat['factures_en_retard'], resultat['relances_envoyees']), (1, 1))
+        self.assertEqual(Facture.objects.get(id=self.mai.id).status, 'en_retard')
+        self.assertEqual(Facture.objects.get(id=self.juin.id).status, 'emise')
+        self.assertEqual(Notification.objects.get().destinataire_id, self.client_ete.user_id)
+
+        # Relancée au plus une fois par intervalle
+        self.assertEqual(executer_relances(jour + timedelta(days=3))['relances_envoyees'], 0)
+        self.assertEqual(executer_relances(jour + timedelta(days=7))['relances_envoyees'], 1)
+        self.assertEqual(Facture.objects.get(id=self.mai.id).nombre_relances, 2)
+
+    def test_synthese_par_zone(self):
+        executer_relances(date(2025, 6, 5))
+        self.assertEqual(
+            [(ligne['nombre'], ligne['montant_restant']) for ligne in get_retards_par_zone()],
+            [(1, Decimal('118.00'))]
+        )
+        # Un paiement périme la synthèse ; réglée, la facture sort des retards
+        self._payer(self.mai, '18.00')
+        self.assertEqual(get_retards_par_zone()[0]['montant_restant'], Decimal('100.00'))
+        self._payer(self.mai, '100.00')
+        self.assertEqual(Facture.objects.get(id=self.mai.id).status, 'payee')
+        self.assertEqual(get_retards_par_zone(), [])
@@ -1,3 +1,42 @@
-from django.shortcuts import render
+from rest_framework import viewsets, status, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import SearchFilter, OrderingFilter
 
-# Create your views here.
+from .models import Facture
+from .serializers import FactureSerializer
+from .relances import get_retards_par_zone
+
+class FactureViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet de consultation des factures (soldes calculés en SQL)"""
+    
+    queryset = Facture.objects.select_related('client', 'client__user', 'contrat').avec_soldes()
+    serializer_class = FactureSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_fields = ['status', 'client', 'contrat', 'periode_facturation', 'date_debut_periode']
+    search_fields = ['numero_facture', 'client__code_client', 'client__company_name']
+    ordering_fields = ['date_emission', 'date_echeance', 'montant_ttc', 'montant_restant']
+    ordering = ['-date_emission']
+    
+    def get_queryset(self):
+        """Filtrer selon le type d'utilisateur"""
+        queryset = super().get_queryset()
+        
+        # Les clients ne voient que leurs propres factures
+        if self.request.user.user_type == 'client' and not self.request.user.is_staff:
+            queryset = queryset.filter(client__user=self.request.user)
+        
+        return queryset
+    
+    @action(detail=False, methods=['get'], url_path='retards-par-zone')
+    def retards_par_zone(self, request):
+        """Factures en retard et montant restant dû par zone"""
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Permission refusée'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        return Response(get_retards_par_zone())
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from rapports.rollup import executer_rollup
+
+
+class Command(BaseCommand):
+    help = "Met à jour la table des indicateurs journaliers (jours touchés depuis la dernière exécution)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--complet', action='store_true', help="Recalcule toute la plage au lieu des seuls jours touchés")
+        parser.add_argument('--date-debut', help="Début de la plage à recalculer (AAAA-MM-JJ), avec --complet")
+        parser.add_argument('--date-fin', help="Fin de la plage à recalculer (AAAA-MM-JJ), avec --complet")
+
+    def handle(self, *args, **options):
+        try:
+            date_debut = parse_date(options['date_debut']) if options['date_debut'] else None
+            date_fin = parse_date(options['date_fin']) if options['date_fin'] else None
+        except ValueError:
+            raise CommandError("Date invalide, format attendu : AAAA-MM-JJ")
+        if date_debut and date_fin and date_debut > date_fin:
+            raise CommandError("La date de début doit précéder la date de fin.")
+
+        jours = executer_rollup(complet=options['complet'], date_debut=date_debut, date_fin=date_fin)
+        self.stdout.write(self.style.SUCCESS(f"{jours} jour(s) recalculé(s)"))
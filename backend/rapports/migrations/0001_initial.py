@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:37
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('clients', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EtatRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=50, unique=True)),
+                ('derniere_execution', models.DateTimeField(blank=True, null=True)),
+                ('jours_traites', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'État de rollup',
+                'verbose_name_plural': 'États de rollup',
+            },
+        ),
+        migrations.CreateModel(
+            name='IndicateurJournalier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('montant_encaisse', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('nombre_paiements', models.IntegerField(default=0)),
+                ('montant_facture', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('collectes_prevues', models.IntegerField(default=0)),
+                ('collectes_realisees', models.IntegerField(default=0)),
+                ('collectes_ratees', models.IntegerField(default=0)),
+                ('collectes_ponctuelles', models.IntegerField(default=0)),
+                ('quantite_collectee', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('reclamations', models.IntegerField(default=0)),
+                ('somme_notes_satisfaction', models.IntegerField(default=0)),
+                ('nombre_notes_satisfaction', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='indicateurs_journaliers', to=settings.AUTH_USER_MODEL)),
+                ('zone_collecte', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='indicateurs_journaliers', to='clients.zonecollecte')),
+            ],
+            options={
+                'verbose_name': 'Indicateur journalier',
+                'verbose_name_plural': 'Indicateurs journaliers',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date', 'zone_collecte'], name='rapports_in_date_d9d0c8_idx'), models.Index(fields=['date', 'agent'], name='rapports_in_date_6aad7f_idx')],
+            },
+        ),
+    ]
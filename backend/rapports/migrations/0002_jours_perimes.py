@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rapports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JourIndicateurPerime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Jour à recalculer',
+                'verbose_name_plural': 'Jours à recalculer',
+            },
+        ),
+    ]
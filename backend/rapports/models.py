@@ -0,0 +1,87 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+from decimal import Decimal
+
+User = get_user_model()
+
+class IndicateurJournalier(models.Model):
+    """Table de faits quotidienne (jour, zone, agent) alimentée par le rollup incrémental"""
+
+    date = models.DateField()
+    zone_collecte = models.ForeignKey(
+        'clients.ZoneCollecte',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='indicateurs_journaliers'
+    )
+    # Agent collecteur pour les paiements, chef d'équipe de la tournée pour les collectes
+    agent = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='indicateurs_journaliers'
+    )
+
+    # Paiements et facturation
+    montant_encaisse = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    nombre_paiements = models.IntegerField(default=0)
+    montant_facture = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    # Collectes
+    collectes_prevues = models.IntegerField(default=0)
+    collectes_realisees = models.IntegerField(default=0)
+    collectes_ratees = models.IntegerField(default=0)
+    collectes_ponctuelles = models.IntegerField(default=0)
+    quantite_collectee = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))  # en kg
+
+    # Qualité
+    reclamations = models.IntegerField(default=0)
+    somme_notes_satisfaction = models.IntegerField(default=0)
+    nombre_notes_satisfaction = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Indicateur journalier'
+        verbose_name_plural = 'Indicateurs journaliers'
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date', 'zone_collecte']),
+            models.Index(fields=['date', 'agent']),
+        ]
+
+    def __str__(self):
+        return f"Indicateurs {self.date} - zone {self.zone_collecte_id} - agent {self.agent_id}"
+
+
+class EtatRollup(models.Model):
+    """Filigrane des traitements incrémentaux (dernière exécution réussie)"""
+
+    nom = models.CharField(max_length=50, unique=True)
+    derniere_execution = models.DateTimeField(blank=True, null=True)
+    jours_traites = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'État de rollup'
+        verbose_name_plural = 'États de rollup'
+
+    def __str__(self):
+        return f"{self.nom} - {self.derniere_execution}"
+
+
+class JourIndicateurPerime(models.Model):
+    """Jour quitté par une donnée source (date modifiée ou ligne supprimée), à recalculer au prochain rollup"""
+
+    date = models.DateField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Jour à recalculer'
+        verbose_name_plural = 'Jours à recalculer'
+
+    def __str__(self):
+        return f"{self.date}"
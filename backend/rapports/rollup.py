@@ -0,0 +1,193 @@
+"""
+Rollup incrémental des indicateurs quotidiens (jour, zone, agent)
+
+Seuls les jours touchés depuis la dernière exécution sont recalculés : les
+jours où se trouvent les lignes modifiées (updated_at des paiements,
+factures, tournées, collectes et réclamations) et les jours qu'une ligne a
+quittés, notés par signaux dans JourIndicateurPerime quand sa date change
+ou qu'elle est supprimée.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum, Q, F, ExpressionWrapper, DurationField
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from collectes.models import Tournee, Collecte, ReclamationCollecte
+from paiements.models import Paiement, Facture
+from .models import IndicateurJournalier, EtatRollup, JourIndicateurPerime
+
+ROLLUP_NOM = 'indicateurs_journaliers'
+JOURS_PAR_LOT = 31
+
+# Une collecte est ponctuelle si l'agent arrive au plus tard 15 min après l'heure prévue
+TOLERANCE_PONCTUALITE = timedelta(minutes=15)
+
+CHAMPS_INDICATEURS = (
+    'montant_encaisse', 'nombre_paiements', 'montant_facture',
+    'collectes_prevues', 'collectes_realisees', 'collectes_ratees',
+    'collectes_ponctuelles', 'quantite_collectee', 'reclamations',
+    'somme_notes_satisfaction', 'nombre_notes_satisfaction',
+)
+
+
+def jours_touches(depuis):
+    """Ensemble des jours dont les données sources ont changé depuis `depuis`"""
+    jours = set()
+    jours.update(
+        Paiement.objects.filter(updated_at__gte=depuis)
+        .annotate(jour=TruncDate('date_paiement')).values_list('jour', flat=True).distinct()
+    )
+    jours.update(
+        Facture.objects.filter(updated_at__gte=depuis)
+        .values_list('date_emission', flat=True).distinct()
+    )
+    jours.update(
+        Tournee.objects.filter(updated_at__gte=depuis)
+        .values_list('date_tournee', flat=True).distinct()
+    )
+    jours.update(
+        Collecte.objects.filter(updated_at__gte=depuis)
+        .values_list('tournee__date_tournee', flat=True).distinct()
+    )
+    jours.update(
+        ReclamationCollecte.objects.filter(updated_at__gte=depuis)
+        .annotate(jour=TruncDate('date_ouverture')).values_list('jour', flat=True).distinct()
+    )
+    jours.discard(None)
+    return jours
+
+
+def marquer_jour_perime(jour):
+    """Note un jour quitté par une donnée source pour le prochain rollup incrémental"""
+    if jour is None:
+        return
+    if isinstance(jour, datetime):
+        jour = timezone.localdate(jour)
+    if not JourIndicateurPerime.objects.filter(date=jour).exists():
+        JourIndicateurPerime.objects.create(date=jour)
+
+
+def calculer_indicateurs(jours):
+    """Agrège les tables sources pour les jours donnés (une requête GROUP BY par table)"""
+    faits = defaultdict(lambda: {champ: 0 for champ in CHAMPS_INDICATEURS})
+
+    paiements = Paiement.objects.filter(
+        status='valide', date_paiement__date__in=jours
+    ).annotate(jour=TruncDate('date_paiement')).values(
+        'jour', 'client__zone_collecte_id', 'agent_collecteur_id'
+    ).annotate(total=Sum('montant'), nombre=Count('id')).order_by()
+    for row in paiements:
+        fait = faits[(row['jour'], row['client__zone_collecte_id'], row['agent_collecteur_id'])]
+        fait['montant_encaisse'] = row['total'] or Decimal('0')
+        fait['nombre_paiements'] = row['nombre']
+
+    factures = Facture.objects.filter(
+        date_emission__in=jours
+    ).exclude(status__in=['brouillon', 'annulee']).values(
+        'date_emission', 'client__zone_collecte_id'
+    ).annotate(total=Sum('montant_ttc')).order_by()
+    for row in factures:
+        fait = faits[(row['date_emission'], row['client__zone_collecte_id'], None)]
+        fait['montant_facture'] = row['total'] or Decimal('0')
+
+    collectes = Collecte.objects.filter(
+        tournee__date_tournee__in=jours
+    ).alias(
+        retard=ExpressionWrapper(F('heure_arrivee') - F('heure_passage_prevue'), output_field=DurationField())
+    ).values(
+        'tournee__date_tournee', 'tournee__zone_collecte_id', 'tournee__equipe_assignee__chef_equipe__user_id'
+    ).annotate(
+        prevues=Count('id'),
+        realisees=Count('id', filter=Q(status='completee')),
+        ratees=Count('id', filter=Q(status='ratee')),
+        ponctuelles=Count('id', filter=Q(status='completee', retard__lte=TOLERANCE_PONCTUALITE)),
+        quantite=Sum('quantite_estimee', filter=Q(status='completee')),
+    ).order_by()
+    for row in collectes:
+        fait = faits[(
+            row['tournee__date_tournee'],
+            row['tournee__zone_collecte_id'],
+            row['tournee__equipe_assignee__chef_equipe__user_id'],
+        )]
+        fait['collectes_prevues'] = row['prevues']
+        fait['collectes_realisees'] = row['realisees']
+        fait['collectes_ratees'] = row['ratees']
+        fait['collectes_ponctuelles'] = row['ponctuelles']
+        fait['quantite_collectee'] = row['quantite'] or Decimal('0')
+
+    reclamations = ReclamationCollecte.objects.filter(
+        date_ouverture__date__in=jours
+    ).annotate(jour=TruncDate('date_ouverture')).values(
+        'jour', 'collecte__tournee__zone_collecte_id', 'collecte__tournee__equipe_assignee__chef_equipe__user_id'
+    ).annotate(
+        nombre=Count('id'),
+        somme_notes=Sum('note_satisfaction'),
+        nombre_notes=Count('note_satisfaction'),
+    ).order_by()
+    for row in reclamations:
+        fait = faits[(
+            row['jour'],
+            row['collecte__tournee__zone_collecte_id'],
+            row['collecte__tournee__equipe_assignee__chef_equipe__user_id'],
+        )]
+        fait['reclamations'] = row['nombre']
+        fait['somme_notes_satisfaction'] = row['somme_notes'] or 0
+        fait['nombre_notes_satisfaction'] = row['nombre_notes']
+
+    return faits
+
+
+def recalculer_jours(jours):
+    """Remplace les lignes de faits des jours donnés, par lots transactionnels"""
+    jours = sorted(jours)
+    total = 0
+    for i in range(0, len(jours), JOURS_PAR_LOT):
+        lot = jours[i:i + JOURS_PAR_LOT]
+        faits = calculer_indicateurs(lot)
+        with transaction.atomic():
+            IndicateurJournalier.objects.filter(date__in=lot).delete()
+            IndicateurJournalier.objects.bulk_create([
+                IndicateurJournalier(date=jour, zone_collecte_id=zone_id, agent_id=agent_id, **valeurs)
+                for (jour, zone_id, agent_id), valeurs in faits.items()
+            ], batch_size=1000)
+        total += len(lot)
+    return total
+
+
+def executer_rollup(complet=False, date_debut=None, date_fin=None):
+    """
+    Exécute le rollup incrémental et avance le filigrane.
+
+    complet=True recalcule toute la plage [date_debut, date_fin] au lieu
+    des seuls jours touchés (utile après une migration ou une correction
+    directe en base, qui ne passent pas par les signaux).
+    """
+    etat, _ = EtatRollup.objects.get_or_create(nom=ROLLUP_NOM)
+    debut_execution = timezone.now()
+    perimes = dict(JourIndicateurPerime.objects.values_list('id', 'date'))
+
+    if complet or etat.derniere_execution is None:
+        date_fin = date_fin or timezone.localdate(debut_execution)
+        if date_debut is None:
+            premiere_tournee = Tournee.objects.order_by('date_tournee').values_list('date_tournee', flat=True).first()
+            premier_paiement = Paiement.objects.order_by('date_paiement').values_list('date_paiement', flat=True).first()
+            candidats = [premiere_tournee, premier_paiement and timezone.localdate(premier_paiement)]
+            candidats = [d for d in candidats if d]
+            date_debut = min(candidats) if candidats else date_fin
+        jours = {date_debut + timedelta(days=n) for n in range((date_fin - date_debut).days + 1)}
+    else:
+        jours = jours_touches(etat.derniere_execution) | set(perimes.values())
+
+    traites = recalculer_jours(jours)
+    # Seuls les jours lus ici sont retirés : ceux notés pendant l'exécution restent pour la suivante
+    JourIndicateurPerime.objects.filter(id__in=perimes).delete()
+
+    # Les modifications faites pendant l'exécution seront reprises au prochain passage
+    etat.derniere_execution = debut_execution
+    etat.jours_traites = traites
+    etat.save()
+    return traites
@@ -0,0 +1,343 @@
+"""
+Services de calcul des indicateurs pour l'administration ETE
+"""
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+
+from accounts.models import CustomUser
+from clients.models import Client, ZoneCollecte
+from agents.models import Agent
+from collectes.models import Tournee, Collecte, ReclamationCollecte
+from paiements.models import Paiement
+from .models import IndicateurJournalier
+from .rollup import calculer_indicateurs
+
+# Cache des compteurs du tableau de bord (invalidé par signaux, voir signals.py)
+COMPTEURS_CACHE_KEY = 'rapports:compteurs_dashboard'
+COMPTEURS_CACHE_TIMEOUT = 300  # Filet de sécurité pour les compteurs relatifs à la date
+# Faits du jour en cours recalculés au plus une fois par minute
+FAITS_DU_JOUR_CACHE_TIMEOUT = 60
+
+
+def calculer_compteurs():
+    """Calcule tous les compteurs avec une seule requête agrégée par table"""
+    now = timezone.now()
+
+    clients = Client.objects.aggregate(
+        total=Count('id'),
+        actifs=Count('id', filter=Q(status='actif')),
+        nouveaux_mois=Count('id', filter=Q(date_inscription__gte=now - timedelta(days=30))),
+    )
+
+    agents = Agent.objects.aggregate(
+        actifs=Count('id', filter=Q(status='actif')),
+        actifs_connectables=Count('id', filter=Q(status='actif', user__is_active=True)),
+        inactifs=Count('id', filter=Q(user__last_login__lt=now - timedelta(days=3))),
+    )
+
+    tournees = Tournee.objects.aggregate(
+        en_attente=Count('id', filter=Q(status__in=['planifiee', 'en_cours'])),
+    )
+
+    zones = ZoneCollecte.objects.aggregate(total=Count('id'))
+
+    paiements = Paiement.objects.aggregate(
+        en_attente=Count('id', filter=Q(status='en_attente')),
+    )
+
+    return {
+        # Sidebar
+        'clients_count': clients['actifs'],
+        'agents_count': agents['actifs'],
+        'collectes_pending': tournees['en_attente'],
+        'zones_count': zones['total'],
+        'paiements_pending': paiements['en_attente'],
+        # Dashboard
+        'total_clients': clients['total'],
+        'new_clients_month': clients['nouveaux_mois'],
+        'agents_active': agents['actifs_connectables'],
+        'agents_inactifs': agents['inactifs'],
+    }
+
+
+def get_compteurs():
+    """Compteurs du tableau de bord, servis depuis le cache"""
+    compteurs = cache.get(COMPTEURS_CACHE_KEY)
+    if compteurs is None:
+        compteurs = calculer_compteurs()
+        cache.set(COMPTEURS_CACHE_KEY, compteurs, COMPTEURS_CACHE_TIMEOUT)
+    return compteurs
+
+
+def invalider_compteurs():
+    """Force le recalcul des compteurs au prochain accès"""
+    cache.delete(COMPTEURS_CACHE_KEY)
+
+
+AGENT_TERRAIN_TYPES = ['agent_ramassage', 'agent_collecte']
+
+
+def performances_agents(date_debut=None, date_fin=None, user_ids=None):
+    """
+    Performances de tous les agents sur une période, indexées par id utilisateur.
+    
+    Nombre de requêtes constant (une requête GROUP BY par table),
+    quel que soit le nombre d'agents.
+    """
+    collectes = Collecte.objects.all()
+    reclamations = ReclamationCollecte.objects.all()
+    paiements = Paiement.objects.filter(status='valide')
+
+    if date_debut and date_fin:
+        collectes = collectes.filter(tournee__date_tournee__range=[date_debut, date_fin])
+        reclamations = reclamations.filter(collecte__tournee__date_tournee__range=[date_debut, date_fin])
+        paiements = paiements.filter(date_paiement__date__range=[date_debut, date_fin])
+
+    membre = 'tournee__equipe_assignee__membres__user_id'
+    if user_ids is not None:
+        collectes = collectes.filter(**{f'{membre}__in': user_ids})
+        reclamations = reclamations.filter(**{f'collecte__{membre}__in': user_ids})
+        paiements = paiements.filter(agent_collecteur_id__in=user_ids)
+
+    resultats = {}
+
+    def ligne(user_id):
+        return resultats.setdefault(user_id, {
+            'collectes_prevues': 0,
+            'collectes_realisees': 0,
+            'nombre_tournees': 0,
+            'incidents': 0,
+            'paiements_collectes': Decimal('0'),
+        })
+
+    for row in collectes.values(membre).annotate(
+        prevues=Count('id', distinct=True),
+        realisees=Count('id', filter=Q(status='completee'), distinct=True),
+        tournees=Count('tournee', distinct=True),
+    ).order_by():
+        if row[membre] is None:
+            continue
+        stats = ligne(row[membre])
+        stats['collectes_prevues'] = row['prevues']
+        stats['collectes_realisees'] = row['realisees']
+        stats['nombre_tournees'] = row['tournees']
+
+    for row in reclamations.values(f'collecte__{membre}').annotate(
+        total=Count('id', distinct=True)
+    ).order_by():
+        if row[f'collecte__{membre}'] is None:
+            continue
+        ligne(row[f'collecte__{membre}'])['incidents'] = row['total']
+
+    for row in paiements.values('agent_collecteur_id').annotate(
+        total=Sum('montant')
+    ).order_by():
+        if row['agent_collecteur_id'] is None:
+            continue
+        ligne(row['agent_collecteur_id'])['paiements_collectes'] = row['total'] or Decimal('0')
+
+    for stats in resultats.values():
+        prevues = stats['collectes_prevues']
+        stats['taux_completion'] = round(stats['collectes_realisees'] * 100 / prevues, 2) if prevues else 0
+
+    return resultats
+
+
+def tableau_performances_agents(date_debut, date_fin):
+    """Lignes du tableau 'Performance des agents' de la page rapports"""
+    agents = CustomUser.objects.filter(
+        user_type__in=AGENT_TERRAIN_TYPES
+    ).values(
+        'id', 'username', 'first_name', 'last_name', 'user_type',
+        'agent_profile__zone_principale__nom_zone',
+    )
+
+    performances = performances_agents(date_debut, date_fin)
+    vide = {
+        'collectes_prevues': 0,
+        'collectes_realisees': 0,
+        'paiements_collectes': Decimal('0'),
+        'taux_completion': 0,
+    }
+
+    lignes = []
+    for agent in agents:
+        stats = performances.get(agent['id'], vide)
+        nom = f"{agent['first_name']} {agent['last_name']}".strip()
+        lignes.append({
+            'nom': nom or agent['username'],
+            'type_agent': agent['user_type'],
+            'zone': agent['agent_profile__zone_principale__nom_zone'],
+            'collectes_realisees': stats['collectes_realisees'],
+            'collectes_prevues': stats['collectes_prevues'],
+            'paiements_collectes': stats['paiements_collectes'],
+            'performance': stats['taux_completion'],
+        })
+    return lignes
+
+
+def _pourcentage(numerateur, denominateur):
+    return round(float(numerateur) * 100 / float(denominateur), 1) if denominateur else 0
+
+
+def faits_du_jour():
+    """
+    Faits du jour en cours, calculés en direct sur les tables sources (quatre
+    requêtes) : la table de faits ne sert qu'aux jours clos, le jour en cours
+    n'attend pas le prochain rollup.
+    """
+    aujourd_hui = timezone.localdate()
+    cle = f'rapports:faits_du_jour:{aujourd_hui:%Y%m%d}'
+    faits = cache.get(cle)
+    if faits is None:
+        faits = [dict(fait) for fait in calculer_indicateurs([aujourd_hui]).values()]
+        cache.set(cle, faits, FAITS_DU_JOUR_CACHE_TIMEOUT)
+    return faits
+
+
+def _jours_clos(date_debut, date_fin):
+    """Fin de la plage lue dans la table de faits, et présence du jour en cours"""
+    aujourd_hui = timezone.localdate()
+    return min(date_fin, aujourd_hui - timedelta(days=1)), date_debut <= aujourd_hui <= date_fin
+
+
+# Totaux de période -> champ de la table de faits
+CHAMPS_PERIODE = {
+    'montant_encaisse': 'montant_encaisse',
+    'montant_facture': 'montant_facture',
+    'collectes_prevues': 'collectes_prevues',
+    'collectes_realisees': 'collectes_realisees',
+    'collectes_ponctuelles': 'collectes_ponctuelles',
+    'reclamations': 'reclamations',
+    'somme_notes': 'somme_notes_satisfaction',
+    'nombre_notes': 'nombre_notes_satisfaction',
+}
+
+
+def indicateurs_periode(date_debut, date_fin):
+    """Totaux d'une période : table de faits pour les jours clos, jour en cours en direct"""
+    fin_close, avec_aujourd_hui = _jours_clos(date_debut, date_fin)
+    totaux = IndicateurJournalier.objects.filter(
+        date__range=[date_debut, fin_close]
+    ).aggregate(
+        montant_encaisse=Sum('montant_encaisse'),
+        montant_facture=Sum('montant_facture'),
+        collectes_prevues=Sum('collectes_prevues'),
+        collectes_realisees=Sum('collectes_realisees'),
+        collectes_ponctuelles=Sum('collectes_ponctuelles'),
+        reclamations=Sum('reclamations'),
+        somme_notes=Sum('somme_notes_satisfaction'),
+        nombre_notes=Sum('nombre_notes_satisfaction'),
+    )
+    totaux = {cle: valeur or 0 for cle, valeur in totaux.items()}
+    if avec_aujourd_hui:
+        for fait in faits_du_jour():
+            for cle, champ in CHAMPS_PERIODE.items():
+                totaux[cle] += fait[champ]
+
+    totaux['taux_realisation'] = _pourcentage(totaux['collectes_realisees'], totaux['collectes_prevues'])
+    totaux['indicateurs'] = {
+        'ponctualite': _pourcentage(totaux['collectes_ponctuelles'], totaux['collectes_realisees']),
+        'reclamations': _pourcentage(totaux['reclamations'], totaux['collectes_realisees']),
+        'recouvrement': _pourcentage(totaux['montant_encaisse'], totaux['montant_facture']),
+        # Notes de 1 à 5 ramenées sur 100
+        'satisfaction': _pourcentage(totaux['somme_notes'], totaux['nombre_notes'] * 5),
+    }
+    return totaux
+
+
+def croissance_revenus(date_debut, date_fin):
+    """Évolution (%) des encaissements par rapport à la période précédente de même durée"""
+    duree = (date_fin - date_debut).days + 1
+    precedente = indicateurs_periode(date_debut - timedelta(days=duree), date_debut - timedelta(days=1))
+    courante = indicateurs_periode(date_debut, date_fin)
+    if not precedente['montant_encaisse']:
+        return 0
+    return round(
+        (float(courante['montant_encaisse']) - float(precedente['montant_encaisse']))
+        * 100 / float(precedente['montant_encaisse']), 1
+    )
+
+
+def evolution_revenus(date_debut, date_fin):
+    """Série des encaissements par jour, semaine ou mois selon la durée de la période"""
+    duree = (date_fin - date_debut).days + 1
+    if duree <= 14:
+        tronque, format_label = TruncDay('date'), '%d/%m'
+    elif duree <= 92:
+        tronque, format_label = TruncWeek('date'), 'Sem. %d/%m'
+    else:
+        tronque, format_label = TruncMonth('date'), '%m/%Y'
+
+    serie = IndicateurJournalier.objects.filter(
+        date__range=[date_debut, date_fin]
+    ).annotate(periode=tronque).values('periode').annotate(
+        total=Sum('montant_encaisse')
+    ).order_by('periode')
+
+    return {
+        'labels': [row['periode'].strftime(format_label) for row in serie],
+        'data': [float(row['total'] or 0) for row in serie],
+    }
+
+
+JOURS_COURTS = ['Lun', 'Mar', 'Mer', 'Jeu', 'Ven', 'Sam', 'Dim']
+
+
+def collectes_par_jour(date_debut, date_fin):
+    """Collectes réalisées par jour de la période (graphique du tableau de bord)"""
+    fin_close, avec_aujourd_hui = _jours_clos(date_debut, date_fin)
+    par_jour = dict(
+        IndicateurJournalier.objects.filter(
+            date__range=[date_debut, fin_close]
+        ).values('date').annotate(
+            total=Sum('collectes_realisees')
+        ).order_by().values_list('date', 'total')
+    )
+    if avec_aujourd_hui:
+        par_jour[timezone.localdate()] = sum(fait['collectes_realisees'] for fait in faits_du_jour())
+
+    jours = [date_debut + timedelta(days=n) for n in range((date_fin - date_debut).days + 1)]
+    maximum = max(par_jour.values(), default=0)
+    return [
+        {
+            'day_short': JOURS_COURTS[jour.weekday()],
+            'count': par_jour.get(jour, 0),
+            'percentage': round(par_jour.get(jour, 0) * 100 / maximum) if maximum else 0,
+        }
+        for jour in jours
+    ]
+
+
+def top_zones_periode(date_debut, date_fin, limite=5):
+    """Zones les plus performantes (encaissements) sur la période"""
+    zones = list(
+        IndicateurJournalier.objects.filter(
+            date__range=[date_debut, date_fin],
+            zone_collecte__isnull=False
+        ).values('zone_collecte_id', 'zone_collecte__nom_zone').annotate(
+            revenus=Sum('montant_encaisse'),
+            prevues=Sum('collectes_prevues'),
+            realisees=Sum('collectes_realisees'),
+        ).order_by('-revenus')[:limite]
+    )
+
+    clients_par_zone = dict(
+        Client.objects.filter(
+            zone_collecte_id__in=[zone['zone_collecte_id'] for zone in zones]
+        ).values('zone_collecte_id').annotate(total=Count('id')).order_by().values_list('zone_collecte_id', 'total')
+    )
+
+    return [
+        {
+            'nom': zone['zone_collecte__nom_zone'],
+            'clients_count': clients_par_zone.get(zone['zone_collecte_id'], 0),
+            'revenus': zone['revenus'] or 0,
+            'taux_collecte': _pourcentage(zone['realisees'] or 0, zone['prevues'] or 0),
+        }
+        for zone in zones
+    ]
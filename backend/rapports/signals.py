@@ -0,0 +1,58 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from accounts.models import CustomUser
+from clients.models import Client, ZoneCollecte
+from agents.models import Agent
+from collectes.models import Tournee, Collecte, ReclamationCollecte
+from paiements.models import Paiement, Facture
+from .rollup import marquer_jour_perime
+from .services import invalider_compteurs
+
+# Les écritures en masse (planification, résultats hors ligne, répartition des
+# tournées) ne déclenchent pas ces signaux et appellent invalider_compteurs elles-mêmes
+COMPTEURS_SENDERS = (CustomUser, Client, Agent, Tournee, ZoneCollecte, Paiement)
+
+
+def invalider_compteurs_dashboard(sender, **kwargs):
+    """Invalide le cache des compteurs quand une table comptée change"""
+    invalider_compteurs()
+
+
+for model in COMPTEURS_SENDERS:
+    post_save.connect(invalider_compteurs_dashboard, sender=model, dispatch_uid=f'compteurs_save_{model.__name__}')
+    post_delete.connect(invalider_compteurs_dashboard, sender=model, dispatch_uid=f'compteurs_delete_{model.__name__}')
+
+
+# Sources du rollup : (champ qui place la ligne dans un jour, chemin du jour)
+SOURCES_ROLLUP = {
+    Tournee: ('date_tournee', 'date_tournee'),
+    Collecte: ('tournee_id', 'tournee__date_tournee'),
+    Paiement: ('date_paiement', 'date_paiement'),
+    Facture: ('date_emission', 'date_emission'),
+    ReclamationCollecte: ('date_ouverture', 'date_ouverture'),
+}
+
+
+def noter_jour_quitte(sender, instance, raw=False, **kwargs):
+    """Le jour d'une ligne change : l'ancien jour devra être recalculé (le nouveau l'est via updated_at)"""
+    if raw or instance.pk is None:
+        return
+    champ, chemin = SOURCES_ROLLUP[sender]
+    ancien = sender.objects.filter(pk=instance.pk).values_list(champ, chemin).first()
+    if ancien is not None and ancien[0] != getattr(instance, champ):
+        marquer_jour_perime(ancien[1])
+
+
+def noter_jour_supprime(sender, instance, **kwargs):
+    """Une ligne supprimée n'a plus d'updated_at : son jour est noté pour le rollup"""
+    if sender is Collecte:
+        marquer_jour_perime(
+            Tournee.objects.filter(id=instance.tournee_id).values_list('date_tournee', flat=True).first()
+        )
+    else:
+        marquer_jour_perime(getattr(instance, SOURCES_ROLLUP[sender][1]))
+
+
+for model in SOURCES_ROLLUP:
+    pre_save.connect(noter_jour_quitte, sender=model, dispatch_uid=f'rollup_save_{model.__name__}')
+    post_delete.connect(noter_jour_supprime, sender=model, dispatch_uid=f'rollup_delete_{model.__name__}')
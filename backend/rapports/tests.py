@@ -0,0 +1,141 @@
+import tempfile
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from agents.models import Agent, Equipe, Vehicule
+from clients.models import Client, ZoneCollecte
+from collectes.models import Tournee, Collecte
+from .models import IndicateurJournalier
+from .rollup import executer_rollup
+from .services import collectes_par_jour, get_compteurs, indicateurs_periode
+
+User = get_user_model()
+
+
+class CompteursTest(TestCase):
+    """Compteurs servis depuis le cache et recalculés après une écriture"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        reglages = override_settings(MEDIA_ROOT=media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        admin = User.objects.create_user(
+            username='superviseur', email='superviseur@ete.test', user_type='admin', is_staff=True
+        )
+        self.zone = ZoneCollecte.objects.create(
+            nom_zone='Zone', code_zone='Z1', coordonnees_zone=[], responsable=admin
+        )
+        self.agent = Agent.objects.create(
+            user=User.objects.create_user(username='agent', email='agent@ete.test', user_type='agent_ramassage'),
+            matricule='AG-1', poste='ramasseur_ordures', date_embauche=date(2024, 1, 1)
+        )
+
+    def test_cache(self):
+        compteurs = get_compteurs()
+        self.assertEqual((compteurs['zones_count'], compteurs['agents_active']), (1, 1))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_compteurs(), compteurs)
+
+    def test_invalidation(self):
+        get_compteurs()
+        Client.objects.create(
+            user=User.objects.create_user(username='client', email='client@ete.test'),
+            code_client='CLI-1', type_client='particulier', service_address='Rue',
+            service_city='Ville', service_postal_code='1000', latitude=0, longitude=0, zone_collecte=self.zone
+        )
+        self.assertEqual(get_compteurs()['total_clients'], 1)
+
+        # Compte utilisateur désactivé : l'agent n'est plus connectable
+        self.agent.user.is_active = False
+        self.agent.user.save()
+        self.assertEqual(get_compteurs()['agents_active'], 0)
+
+
+class IndicateursTest(TestCase):
+    """Jour en cours calculé en direct, jours clos lus dans la table de faits"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        reglages = override_settings(MEDIA_ROOT=media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        admin = User.objects.create_user(
+            username='superviseur', email='superviseur@ete.test', user_type='admin', is_staff=True
+        )
+        self.zone = ZoneCollecte.objects.create(
+            nom_zone='Zone', code_zone='Z1', coordonnees_zone=[], responsable=admin
+        )
+        chef = Agent.objects.create(
+            user=User.objects.create_user(username='agent', email='agent@ete.test', user_type='agent_ramassage'),
+            matricule='AG-1', poste='ramasseur_ordures', date_embauche=date(2024, 1, 1)
+        )
+        self.vehicule = Vehicule.objects.create(
+            numero_plaque='PL-1', marque='Marque', modele='Modèle', annee=2020,
+            type_vehicule='camion_benne', capacite_charge=1000, capacite_volume=10
+        )
+        self.equipe = Equipe.objects.create(
+            nom_equipe='Équipe', chef_equipe=chef, vehicule_assigne=self.vehicule,
+            heure_debut=time(7), heure_fin=time(15)
+        )
+        self.clients = [
+            Client.objects.create(
+                user=User.objects.create_user(username=f'client-{n}', email=f'client-{n}@ete.test'),
+                code_client=f'CLI-{n}', type_client='particulier', service_address='Rue',
+                service_city='Ville', service_postal_code='1000', latitude=0, longitude=0, zone_collecte=self.zone
+            )
+            for n in range(2)
+        ]
+        self.aujourd_hui = timezone.localdate()
+
+    def _tournee(self, jour, statuts):
+        tournee = Tournee.objects.create(
+            nom_tournee=f'Tournée {jour}', date_tournee=jour, heure_debut_prevue=time(7),
+            heure_fin_prevue=time(15), equipe_assignee=self.equipe, vehicule_assigne=self.vehicule,
+            zone_collecte=self.zone
+        )
+        for client, statut in zip(self.clients, statuts):
+            Collecte.objects.create(
+                tournee=tournee, client=client, heure_passage_prevue=time(8), ordre_passage=1, status=statut
+            )
+        return tournee
+
+    def test_jour_en_cours_sans_rollup(self):
+        self._tournee(self.aujourd_hui, ['completee', 'planifiee'])
+        totaux = indicateurs_periode(self.aujourd_hui, self.aujourd_hui)
+        self.assertEqual((totaux['collectes_prevues'], totaux['collectes_realisees']), (2, 1))
+        self.assertEqual(collectes_par_jour(self.aujourd_hui, self.aujourd_hui)[0]['count'], 1)
+
+    def test_jours_clos_depuis_la_table_de_faits(self):
+        hier = self.aujourd_hui - timedelta(days=1)
+        IndicateurJournalier.objects.create(date=hier, zone_collecte=self.zone, collectes_prevues=4, collectes_realisees=3)
+        # Ligne périmée du jour en cours : ignorée au profit du calcul direct
+        IndicateurJournalier.objects.create(date=self.aujourd_hui, collectes_prevues=9, collectes_realisees=9)
+        self._tournee(self.aujourd_hui, ['completee', 'completee'])
+        totaux = indicateurs_periode(hier, self.aujourd_hui)
+        self.assertEqual((totaux['collectes_prevues'], totaux['collectes_realisees']), (6, 5))
+        self.assertEqual([jour['count'] for jour in collectes_par_jour(hier, self.aujourd_hui)], [3, 2])
+
+    def test_rollup_reprend_le_jour_quitte(self):
+        jour = self.aujourd_hui - timedelta(days=3)
+        tournee = self._tournee(jour, ['completee', 'completee'])
+        executer_rollup()
+        self.assertEqual(indicateurs_periode(jour, jour)['collectes_realisees'], 2)
+
+        tournee.date_tournee = jour + timedelta(days=1)
+        tournee.save()
+        executer_rollup()
+        self.assertEqual(indicateurs_periode(jour, jour)['collectes_realisees'], 0)
+        self.assertEqual(indicateurs_periode(jour + timedelta(days=1), jour + timedelta(days=1))['collectes_realisees'], 2)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SynchronisationConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'synchronisation'
+    
+    def ready(self):
+        import synchronisation.signals
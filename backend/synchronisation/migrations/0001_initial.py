@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Suppression',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entite', models.CharField(max_length=20)),
+                ('objet_id', models.BigIntegerField()),
+                ('zone_collecte_id', models.BigIntegerField(blank=True, null=True)),
+                ('date_suppression', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Suppression',
+                'verbose_name_plural': 'Suppressions',
+                'indexes': [models.Index(fields=['entite', 'id'], name='synchronisa_entite_ddf2e9_idx')],
+            },
+        ),
+    ]
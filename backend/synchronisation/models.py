@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class Suppression(models.Model):
+    """Trace d'une ligne supprimée, transmise aux applications lors de la synchronisation"""
+    
+    entite = models.CharField(max_length=20)
+    objet_id = models.BigIntegerField()
+    zone_collecte_id = models.BigIntegerField(blank=True, null=True)
+    date_suppression = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Suppression'
+        verbose_name_plural = 'Suppressions'
+        indexes = [
+            models.Index(fields=['entite', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.entite} #{self.objet_id}"
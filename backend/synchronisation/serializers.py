@@ -0,0 +1,72 @@
+from rest_framework import serializers
+from clients.models import Client, Contrat, BacPoubelle
+from collectes.models import Tournee, Collecte
+from paiements.models import Facture
+
+class ClientSyncSerializer(serializers.ModelSerializer):
+    """Client tel que stocké hors ligne par l'application (relations en identifiants)"""
+    
+    class Meta:
+        model = Client
+        fields = [
+            'id', 'user', 'code_client', 'type_client', 'status',
+            'company_name', 'contact_person', 'secondary_phone',
+            'service_address', 'service_city', 'service_postal_code',
+            'latitude', 'longitude', 'zone_collecte', 'notes', 'updated_at'
+        ]
+
+class ContratSyncSerializer(serializers.ModelSerializer):
+    """Contrat tel que stocké hors ligne par l'application"""
+    
+    class Meta:
+        model = Contrat
+        fields = [
+            'id', 'client', 'numero_contrat', 'date_debut', 'date_fin',
+            'frequence_collecte', 'jours_collecte', 'heure_passage',
+            'types_dechets', 'status', 'conditions_particulieres', 'updated_at'
+        ]
+
+class BacPoubelleSyncSerializer(serializers.ModelSerializer):
+    """Bac tel que stocké hors ligne par l'application"""
+    
+    class Meta:
+        model = BacPoubelle
+        fields = [
+            'id', 'client', 'numero_bac', 'type_bac', 'capacite_litres',
+            'status', 'date_derniere_collecte', 'emplacement_description',
+            'updated_at'
+        ]
+
+class TourneeSyncSerializer(serializers.ModelSerializer):
+    """Tournée telle que stockée hors ligne par l'application"""
+    
+    class Meta:
+        model = Tournee
+        fields = [
+            'id', 'nom_tournee', 'date_tournee', 'heure_debut_prevue',
+            'heure_fin_prevue', 'equipe_assignee', 'vehicule_assigne',
+            'zone_collecte', 'status', 'nombre_clients_prevus',
+            'nombre_clients_realises', 'notes', 'updated_at'
+        ]
+
+class CollecteSyncSerializer(serializers.ModelSerializer):
+    """Collecte telle que stockée hors ligne par l'application"""
+    
+    class Meta:
+        model = Collecte
+        fields = [
+            'id', 'tournee', 'client', 'heure_passage_prevue', 'ordre_passage',
+            'heure_arrivee', 'heure_depart', 'status', 'raison_echec',
+            'quantite_estimee', 'nombre_contenants', 'updated_at'
+        ]
+
+class FactureSyncSerializer(serializers.ModelSerializer):
+    """Facture telle que stockée hors ligne par l'application"""
+    
+    class Meta:
+        model = Facture
+        fields = [
+            'id', 'numero_facture', 'client', 'contrat', 'date_debut_periode',
+            'date_fin_periode', 'montant_ttc', 'montant_paye', 'status',
+            'date_emission', 'date_echeance', 'updated_at'
+        ]
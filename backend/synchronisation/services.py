@@ -0,0 +1,304 @@
+"""
+Synchronisation différentielle des applications de terrain
+
+Pour chaque entité, l'application garde un curseur opaque : la clé
+(updated_at, id) de la dernière ligne reçue, l'id de la dernière
+suppression reçue, les zones de l'agent et le début de la fenêtre
+d'historique. Une synchronisation ne renvoie que les lignes des zones de
+l'agent modifiées depuis, page par page dans l'ordre (updated_at, id), et
+les identifiants sortis de son périmètre depuis :
+- lignes supprimées ;
+- lignes passées dans une autre zone (client ou tournée changé de zone,
+  avec leurs contrats, bacs, factures et collectes), notées comme une
+  suppression dans l'ancienne zone ; leurs lignes dépendantes voient leur
+  updated_at avancé pour parvenir à la nouvelle zone ;
+- lignes sorties de la fenêtre d'historique.
+Une suppression n'est pas transmise si la ligne est encore dans le
+périmètre de l'agent (agent couvrant l'ancienne et la nouvelle zone). Si
+les zones de l'agent ont changé, l'entité repart de zéro avec
+`reinitialiser` : l'application vide sa table avant d'appliquer la page.
+
+Les lignes modifiées après le début de la plus ancienne transaction encore
+ouverte (PostgreSQL), et dans tous les cas dans les dernières secondes,
+sont gardées pour la synchronisation suivante : une transaction validée
+plus tard pourrait sinon écrire une ligne dont l'updated_at précède un
+curseur déjà distribué.
+
+La représentation d'une ligne est mise en cache par (entité, id, updated_at) :
+une ligne inchangée n'est sérialisée qu'une fois, quel que soit le nombre
+d'agents de la zone qui la reçoivent.
+
+Les tournées, collectes et factures anciennes ne sont pas envoyées : seules
+celles de l'historique utile sur le terrain (en jours) sont synchronisées.
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from clients.models import Client, Contrat, BacPoubelle
+from collectes.models import Tournee, Collecte
+from ete_project.pagination import CurseurEncoder
+from paiements.models import Facture
+from .models import Suppression
+from .serializers import (
+    ClientSyncSerializer, ContratSyncSerializer, BacPoubelleSyncSerializer,
+    TourneeSyncSerializer, CollecteSyncSerializer, FactureSyncSerializer
+)
+
+MARGE_SECONDES = 5
+TAILLE_LOT_ZONES = 1000
+TAILLE_PAGE = 500
+TAILLE_PAGE_MAX = 1000
+REPRESENTATION_CACHE_TIMEOUT = 60 * 60 * 24
+HISTORIQUE_TOURNEES_JOURS = 7
+HISTORIQUE_FACTURES_JOURS = 365
+
+
+class Entite:
+    """Table synchronisée : modèle, représentation et chemin vers la zone de collecte"""
+
+    def __init__(self, nom, modele, serializer_class, chemin_zone, champ_date=None, jours_historique=None):
+        self.nom = nom
+        self.modele = modele
+        self.serializer_class = serializer_class
+        self.chemin_zone = chemin_zone
+        self.champ_date = champ_date
+        self.jours_historique = jours_historique
+
+    def debut_historique(self):
+        """Premier jour synchronisé (None : pas de fenêtre d'historique)"""
+        if not self.champ_date:
+            return None
+        return timezone.localdate() - timedelta(days=self.jours_historique)
+
+    def queryset(self, zones):
+        queryset = self.modele.objects.filter(**{f'{self.chemin_zone}__in': zones})
+        if self.champ_date:
+            queryset = queryset.filter(**{f'{self.champ_date}__gte': self.debut_historique()})
+        return queryset
+
+    def expirees(self, zones, depuis, jusqu_a):
+        """Lignes des zones sorties de la fenêtre d'historique entre les deux dates"""
+        return self.modele.objects.filter(**{
+            f'{self.chemin_zone}__in': zones,
+            f'{self.champ_date}__gte': depuis,
+            f'{self.champ_date}__lt': jusqu_a,
+        }).order_by('id').values_list('id', flat=True)
+
+    def zone_de(self, instance):
+        """Zone d'une instance (au moment de sa suppression)"""
+        relation, _, reste = self.chemin_zone.partition('__')
+        if not reste:
+            return getattr(instance, f'{relation}_id')
+        parent = self.modele._meta.get_field(relation).related_model
+        return parent.objects.filter(
+            pk=getattr(instance, f'{relation}_id')
+        ).values_list(reste, flat=True).first()
+
+    def cle_cache(self, objet_id, updated_at):
+        return f'synchronisation:{self.nom}:{objet_id}:{updated_at.isoformat()}'
+
+    def representer(self, cles):
+        """Représentations des lignes (id, updated_at), sérialisées seulement si absentes du cache"""
+        cles_cache = {objet_id: self.cle_cache(objet_id, updated_at) for objet_id, updated_at in cles}
+        en_cache = cache.get_many(list(cles_cache.values()))
+        representations = {
+            objet_id: en_cache[cle] for objet_id, cle in cles_cache.items() if cle in en_cache
+        }
+
+        manquants = [objet_id for objet_id in cles_cache if objet_id not in representations]
+        if manquants:
+            objets = list(self.modele.objects.filter(id__in=manquants))
+            nouvelles = {}
+            for objet, donnees in zip(objets, self.serializer_class(objets, many=True).data):
+                representations[objet.id] = dict(donnees)
+                nouvelles[self.cle_cache(objet.id, objet.updated_at)] = dict(donnees)
+            cache.set_many(nouvelles, REPRESENTATION_CACHE_TIMEOUT)
+
+        # Une ligne supprimée entre-temps n'a plus de représentation : sa suppression suivra
+        return [representations[objet_id] for objet_id in cles_cache if objet_id in representations]
+
+
+ENTITES = {
+    entite.nom: entite for entite in [
+        Entite('clients', Client, ClientSyncSerializer, 'zone_collecte'),
+        Entite('contrats', Contrat, ContratSyncSerializer, 'client__zone_collecte'),
+        Entite('bacs', BacPoubelle, BacPoubelleSyncSerializer, 'client__zone_collecte'),
+        Entite(
+            'tournees', Tournee, TourneeSyncSerializer, 'zone_collecte',
+            'date_tournee', HISTORIQUE_TOURNEES_JOURS
+        ),
+        Entite(
+            'collectes', Collecte, CollecteSyncSerializer, 'tournee__zone_collecte',
+            'tournee__date_tournee', HISTORIQUE_TOURNEES_JOURS
+        ),
+        Entite(
+            'factures', Facture, FactureSyncSerializer, 'client__zone_collecte',
+            'date_emission', HISTORIQUE_FACTURES_JOURS
+        ),
+    ]
+}
+
+
+# Lignes dépendantes d'un client ou d'une tournée qui change de zone : (entité, champ vers le parent)
+SUIVI_ZONES = {
+    Client: [('clients', 'id'), ('contrats', 'client_id'), ('bacs', 'client_id'), ('factures', 'client_id')],
+    Tournee: [('tournees', 'id'), ('collectes', 'tournee_id')],
+}
+
+
+def noter_changements_zone(modele, anciennes_zones):
+    """
+    Lignes de `modele` passées dans une autre zone ({id: ancienne zone}) : une
+    suppression est notée dans l'ancienne zone pour elles et leurs lignes
+    dépendantes, dont l'updated_at est avancé pour la nouvelle zone.
+    """
+    anciennes_zones = {objet_id: zone_id for objet_id, zone_id in anciennes_zones.items() if zone_id}
+    if modele not in SUIVI_ZONES or not anciennes_zones:
+        return
+    maintenant = timezone.now()
+    parents = list(anciennes_zones)
+    for i in range(0, len(parents), TAILLE_LOT_ZONES):
+        lot = parents[i:i + TAILLE_LOT_ZONES]
+        traces = []
+        for nom, champ in SUIVI_ZONES[modele]:
+            lignes = ENTITES[nom].modele.objects.filter(**{f'{champ}__in': lot})
+            traces.extend(
+                Suppression(entite=nom, objet_id=objet_id, zone_collecte_id=anciennes_zones[parent_id])
+                for objet_id, parent_id in lignes.values_list('id', champ)
+            )
+            if champ != 'id':
+                lignes.update(updated_at=maintenant)
+        Suppression.objects.bulk_create(traces, batch_size=TAILLE_LOT_ZONES)
+
+
+def encoder_curseur(modification, suppression, zones, debut):
+    position = {'m': modification, 's': suppression, 'z': sorted(zones), 'd': debut}
+    return base64.urlsafe_b64encode(json.dumps(position, cls=CurseurEncoder).encode('utf-8')).decode('ascii')
+
+
+def decoder_curseur(curseur):
+    """
+    (updated_at, id) de la dernière ligne reçue (ou None), id de la dernière
+    suppression reçue, zones de l'agent (None pour un curseur d'avant leur
+    enregistrement) et début de la fenêtre d'historique (ou None)
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(curseur.encode('ascii')).decode('utf-8'))
+        modification = position['m']
+        if modification is not None:
+            date, objet_id = modification
+            date = parse_datetime(date)
+            if date is None:
+                raise ValueError(curseur)
+            modification = (date, int(objet_id))
+        zones = position.get('z')
+        if zones is not None:
+            zones = sorted(int(zone_id) for zone_id in zones)
+        debut = position.get('d')
+        if debut is not None:
+            debut = parse_date(debut)
+            if debut is None:
+                raise ValueError(curseur)
+        return modification, int(position['s']), zones, debut
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise ValueError('Curseur invalide')
+
+
+def limite_synchronisation():
+    """
+    Date avant laquelle toutes les écritures sont validées : il y a quelques
+    secondes, et au plus tard le début de la plus ancienne transaction
+    encore ouverte sur PostgreSQL (sur SQLite, les écritures sont sérialisées
+    et brèves : seule la marge s'applique).
+    """
+    limite = timezone.now() - timedelta(seconds=MARGE_SECONDES)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as curseur:
+            curseur.execute(
+                "SELECT min(xact_start) FROM pg_stat_activity "
+                "WHERE datname = current_database() AND backend_type = 'client backend' "
+                "AND xact_start IS NOT NULL AND pid <> pg_backend_pid()"
+            )
+            debut = curseur.fetchone()[0]
+        if debut is not None:
+            limite = min(limite, debut - timedelta(seconds=MARGE_SECONDES))
+    return limite
+
+
+def synchroniser_entite(entite, zones, curseur, limite, taille=TAILLE_PAGE):
+    """Une page de modifications et de suppressions d'une entité depuis `curseur`"""
+    zones = sorted(zones)
+    debut = entite.debut_historique()
+    reinitialiser, expirees = False, []
+    if curseur:
+        modification, derniere_suppression, zones_curseur, debut_curseur = decoder_curseur(curseur)
+        if zones_curseur != zones:
+            # Zones de l'agent changées : les lignes d'une nouvelle zone peuvent précéder le
+            # curseur et celles d'une zone perdue n'ont pas de suppression
+            reinitialiser = True
+        elif debut is not None and debut_curseur is not None and debut_curseur < debut:
+            expirees = list(entite.expirees(zones, debut_curseur, debut)[:taille + 1])
+            if len(expirees) > taille:
+                reinitialiser, expirees = True, []
+
+    if not curseur or reinitialiser:
+        # Première synchronisation : tout l'existant, et seulement les suppressions à venir
+        modification = None
+        derniere_suppression = Suppression.objects.filter(
+            entite=entite.nom
+        ).aggregate(dernier=Max('id'))['dernier'] or 0
+
+    lignes = entite.queryset(zones).filter(updated_at__lt=limite)
+    if modification is not None:
+        date, objet_id = modification
+        lignes = lignes.filter(Q(updated_at__gt=date) | Q(updated_at=date, id__gt=objet_id))
+    cles = list(lignes.order_by('updated_at', 'id').values_list('id', 'updated_at')[:taille + 1])
+
+    suppressions = list(Suppression.objects.filter(
+        entite=entite.nom, id__gt=derniere_suppression, date_suppression__lt=limite
+    ).filter(
+        Q(zone_collecte_id__in=zones) | Q(zone_collecte_id__isnull=True)
+    ).order_by('id').values_list('id', 'objet_id')[:taille + 1])
+
+    complet = len(cles) <= taille and len(suppressions) <= taille
+    cles, suppressions = cles[:taille], suppressions[:taille]
+    if cles:
+        objet_id, date = cles[-1]
+        modification = (date, objet_id)
+    if suppressions:
+        derniere_suppression = suppressions[-1][0]
+    # Une ligne encore dans le périmètre (agent des deux zones) n'est pas retirée
+    visibles = set(entite.queryset(zones).filter(
+        id__in=[objet_id for _, objet_id in suppressions]
+    ).values_list('id', flat=True)) if suppressions else set()
+
+    return {
+        'modifications': entite.representer(cles),
+        'suppressions': expirees + [objet_id for _, objet_id in suppressions if objet_id not in visibles],
+        'curseur': encoder_curseur(modification, derniere_suppression, zones, debut),
+        'complet': complet,
+        'reinitialiser': reinitialiser,
+    }
+
+
+def synchroniser(agent, curseurs, taille=TAILLE_PAGE):
+    """
+    Modifications depuis les curseurs ({entité: curseur ou None}) dans les zones de l'agent.
+    Tant qu'une entité n'est pas `complet`, l'application rappelle avec le nouveau curseur.
+    """
+    zones = agent.zones_couvertes_ids()
+    limite = limite_synchronisation()
+    return {
+        'horodatage': limite,
+        'entites': {
+            nom: synchroniser_entite(ENTITES[nom], zones, curseur, limite, taille)
+            for nom, curseur in curseurs.items()
+        },
+    }
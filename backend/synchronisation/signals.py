@@ -0,0 +1,38 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from .models import Suppression
+from .services import ENTITES, SUIVI_ZONES, noter_changements_zone
+
+
+def enregistrer_suppression(sender, instance, **kwargs):
+    """Garde la trace d'une ligne supprimée pour les applications qui l'ont synchronisée"""
+    entite = next(entite for entite in ENTITES.values() if entite.modele is sender)
+    Suppression.objects.create(
+        entite=entite.nom,
+        objet_id=instance.pk,
+        zone_collecte_id=entite.zone_de(instance),
+    )
+
+
+for entite in ENTITES.values():
+    post_delete.connect(enregistrer_suppression, sender=entite.modele, dispatch_uid=f'suppression_{entite.nom}')
+
+
+def noter_zone_precedente(sender, instance, raw=False, **kwargs):
+    """Zone actuellement en base, pour retirer la ligne de l'ancienne zone si elle change"""
+    instance._zone_synchronisation = None
+    if not raw and instance.pk is not None:
+        instance._zone_synchronisation = sender.objects.filter(
+            pk=instance.pk
+        ).values_list('zone_collecte_id', flat=True).first()
+
+
+def retirer_de_l_ancienne_zone(sender, instance, created=False, raw=False, **kwargs):
+    ancienne = getattr(instance, '_zone_synchronisation', None)
+    if not created and not raw and ancienne is not None and ancienne != instance.zone_collecte_id:
+        noter_changements_zone(sender, {instance.pk: ancienne})
+
+
+for modele in SUIVI_ZONES:
+    pre_save.connect(noter_zone_precedente, sender=modele, dispatch_uid=f'zone_precedente_{modele.__name__}')
+    post_save.connect(retirer_de_l_ancienne_zone, sender=modele, dispatch_uid=f'changement_zone_{modele.__name__}')
@@ -0,0 +1,149 @@
+import tempfile
+from datetime import date, time, timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from agents.models import Agent, Equipe, Vehicule
+from clients.models import Client, Contrat, ZoneCollecte
+from clients.zonage import reaffecter_zones
+from collectes.models import Tournee
+from .services import ENTITES, synchroniser_entite
+
+User = get_user_model()
+
+
+class SynchronisationDifferentielleTest(TestCase):
+    """Modifications, suppressions et sorties de périmètre transmises par curseur"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        reglages = override_settings(MEDIA_ROOT=media.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+        self.admin = User.objects.create_user(
+            username='superviseur', email='superviseur@ete.test', user_type='admin', is_staff=True
+        )
+        carre = lambda lat: [[lat, 0], [lat, 1], [lat + 1, 1], [lat + 1, 0]]
+        self.zone_a = ZoneCollecte.objects.create(
+            nom_zone='Zone A', code_zone='ZA', coordonnees_zone=carre(0), responsable=self.admin
+        )
+        self.zone_b = ZoneCollecte.objects.create(
+            nom_zone='Zone B', code_zone='ZB', coordonnees_zone=carre(10), responsable=self.admin
+        )
+        self.agent_a = self._agent('a', self.zone_a)
+        self.agent_b = self._agent('b', self.zone_b)
+
+        client_user = User.objects.create_user(username='client', email='client@ete.test')
+        self.client_a = Client.objects.create(
+            user=client_user, code_client='CLI-1', type_client='particulier',
+            service_address='Rue', service_city='Ville', service_postal_code='1000',
+            latitude=0.5, longitude=0.5, zone_collecte=self.zone_a
+        )
+        self.contrat = Contrat.objects.create(
+            client=self.client_a, numero_contrat='CTR-1', date_debut=date(2025, 1, 1),
+            date_fin=date(2030, 12, 31), frequence_collecte='hebdomadaire',
+            jours_collecte=['lundi'], heure_passage=time(8), tarif_mensuel=100
+        )
+
+    def _agent(self, suffixe, zone):
+        user = User.objects.create_user(
+            username=f'agent-{suffixe}', email=f'agent-{suffixe}@ete.test', user_type='agent_ramassage'
+        )
+        return Agent.objects.create(
+            user=user, matricule=f'AG-{suffixe}', poste='ramasseur_ordures',
+            date_embauche=date(2024, 1, 1), zone_principale=zone
+        )
+
+    def _synchroniser(self, agent, nom, curseur=None):
+        # Limite dans le futur : les lignes créées par le test sont toutes visibles
+        limite = timezone.now() + timedelta(seconds=1)
+        return synchroniser_entite(ENTITES[nom], agent.zones_couvertes_ids(), curseur, limite)
+
+    def test_delta_apres_curseur(self):
+        page = self._synchroniser(self.agent_a, 'clients')
+        self.assertEqual([ligne['id'] for ligne in page['modifications']], [self.client_a.id])
+        self.assertTrue(page['complet'])
+
+        suivante = self._synchroniser(self.agent_a, 'clients', page['curseur'])
+        self.assertEqual(suivante['modifications'], [])
+
+        self.client_a.service_address = 'Autre rue'
+        self.client_a.save()
+        suivante = self._synchroniser(self.agent_a, 'clients', suivante['curseur'])
+        self.assertEqual([ligne['id'] for ligne in suivante['modifications']], [self.client_a.id])
+
+    def test_suppression(self):
+        page = self._synchroniser(self.agent_a, 'contrats')
+        contrat_id = self.contrat.id
+        self.contrat.delete()
+        suivante = self._synchroniser(self.agent_a, 'contrats', page['curseur'])
+        self.assertEqual(suivante['suppressions'], [contrat_id])
+
+    def test_client_change_de_zone(self):
+        curseurs_a = {nom: self._synchroniser(self.agent_a, nom)['curseur'] for nom in ('clients', 'contrats')}
+        curseurs_b = {nom: self._synchroniser(self.agent_b, nom)['curseur'] for nom in ('clients', 'contrats')}
+
+        self.client_a.zone_collecte = self.zone_b
+        self.client_a.save()
+
+        page = self._synchroniser(self.agent_a, 'clients', curseurs_a['clients'])
+        self.assertEqual(page['suppressions'], [self.client_a.id])
+        page = self._synchroniser(self.agent_a, 'contrats', curseurs_a['contrats'])
+        self.assertEqual(page['suppressions'], [self.contrat.id])
+
+        # Le contrat, inchangé, parvient quand même aux agents de la nouvelle zone
+        page = self._synchroniser(self.agent_b, 'contrats', curseurs_b['contrats'])
+        self.assertEqual([ligne['id'] for ligne in page['modifications']], [self.contrat.id])
+        self.assertEqual(page['suppressions'], [])
+
+    def test_reaffectation_en_masse(self):
+        curseur = self._synchroniser(self.agent_a, 'clients')['curseur']
+        Client.objects.filter(id=self.client_a.id).update(latitude=10.5, longitude=0.5)
+        reaffecter_zones()
+        page = self._synchroniser(self.agent_a, 'clients', curseur)
+        self.assertEqual(page['suppressions'], [self.client_a.id])
+
+    def test_agent_des_deux_zones_garde_la_ligne(self):
+        self.agent_a.zones_affectees.add(self.zone_b)
+        curseur = self._synchroniser(self.agent_a, 'clients')['curseur']
+        self.client_a.zone_collecte = self.zone_b
+        self.client_a.save()
+        page = self._synchroniser(self.agent_a, 'clients', curseur)
+        self.assertEqual(page['suppressions'], [])
+        self.assertEqual([ligne['id'] for ligne in page['modifications']], [self.client_a.id])
+
+    def test_zones_de_l_agent_modifiees(self):
+        curseur = self._synchroniser(self.agent_a, 'clients')['curseur']
+        self.agent_a.zones_affectees.add(self.zone_b)
+        page = self._synchroniser(self.agent_a, 'clients', curseur)
+        self.assertTrue(page['reinitialiser'])
+        self.assertEqual([ligne['id'] for ligne in page['modifications']], [self.client_a.id])
+
+    def test_sortie_de_la_fenetre_d_historique(self):
+        vehicule = Vehicule.objects.create(
+            numero_plaque='PL-1', marque='Marque', modele='Modèle', annee=2020,
+            type_vehicule='camion_benne', capacite_charge=1000, capacite_volume=10
+        )
+        equipe = Equipe.objects.create(
+            nom_equipe='Équipe', chef_equipe=self.agent_a, vehicule_assigne=vehicule,
+            heure_debut=time(7), heure_fin=time(15)
+        )
+        aujourd_hui = timezone.localdate()
+        tournee = Tournee.objects.create(
+            nom_tournee='Tournée', date_tournee=aujourd_hui - timedelta(days=ENTITES['tournees'].jours_historique),
+            heure_debut_prevue=time(7), heure_fin_prevue=time(15), equipe_assignee=equipe,
+            vehicule_assigne=vehicule, zone_collecte=self.zone_a
+        )
+        page = self._synchroniser(self.agent_a, 'tournees')
+        self.assertEqual([ligne['id'] for ligne in page['modifications']], [tournee.id])
+
+        with mock.patch('synchronisation.services.timezone.localdate', return_value=aujourd_hui + timedelta(days=1)):
+            suivante = self._synchroniser(self.agent_a, 'tournees', page['curseur'])
+            self.assertEqual(suivante['suppressions'], [tournee.id])
+            # Transmise une seule fois
+            self.assertEqual(self._synchroniser(self.agent_a, 'tournees', suivante['curseur'])['suppressions'], [])
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import SynchronisationView
+
+urlpatterns = [
+    path('', SynchronisationView.as_view(), name='synchronisation'),
+]
@@ -0,0 +1,52 @@
+from rest_framework import status, permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ete_project.mixins import parametre_liste
+from .services import ENTITES, TAILLE_PAGE, TAILLE_PAGE_MAX, synchroniser
+
+class SynchronisationView(APIView):
+    """
+    Synchronisation différentielle des données de terrain de l'agent connecté.
+    
+    `?entites=clients,tournees` restreint les entités (toutes par défaut),
+    `?clients=<curseur>` reprend depuis le curseur reçu à la synchronisation
+    précédente, `?taille=` fixe la taille des pages (jusqu'à 1000).
+    """
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        if not hasattr(request.user, 'agent_profile'):
+            return Response(
+                {'error': 'Permission refusée'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        noms = parametre_liste(request, 'entites') or set(ENTITES)
+        inconnues = noms - set(ENTITES)
+        if inconnues:
+            return Response(
+                {'error': f"Entités inconnues : {', '.join(sorted(inconnues))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            taille = min(int(request.query_params.get('taille', TAILLE_PAGE)), TAILLE_PAGE_MAX)
+        except ValueError:
+            taille = 0
+        if taille < 1:
+            return Response(
+                {'error': 'taille doit être un entier positif'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        curseurs = {nom: request.query_params.get(nom) for nom in ENTITES if nom in noms}
+        try:
+            resultat = synchroniser(request.user.agent_profile, curseurs, taille)
+        except ValueError:
+            return Response(
+                {'error': 'Curseur invalide, resynchroniser sans curseur'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(resultat)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class TempsReelConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'temps_reel'
+    
+    def ready(self):
+        import temps_reel.signals
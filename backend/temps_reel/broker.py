@@ -0,0 +1,143 @@
+"""
+Broker d'événements en mémoire du processus
+
+Les événements sont publiés sur des sujets (`tournees`, `utilisateur:12`...)
+et distribués aux abonnés de ces sujets, chacun avec sa file bornée. Un
+abonné trop lent ne ralentit ni les autres ni l'émetteur : quand sa file est
+pleine, elle est vidée et remplacée par un unique événement `resynchroniser`
+qui demande au client de recharger son état.
+
+La publication peut se faire depuis n'importe quel thread (vues et signaux
+synchrones) ; la distribution se fait dans la boucle asyncio de chaque
+abonné. Un historique court par sujet permet de reprendre un flux après une
+reconnexion (`Last-Event-ID`). La numérotation part de l'heure de démarrage :
+un identifiant reçu d'un processus précédent (redémarrage) est reconnu et
+le client est invité à se resynchroniser.
+
+Ce broker ne relie que les émetteurs et les clients d'un même processus
+ASGI ; `publier` et `abonner` sont l'interface à conserver pour passer à
+Redis (pub/sub) avec plusieurs processus.
+"""
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+
+TAILLE_FILE = 100
+TAILLE_HISTORIQUE = 200
+
+
+class Evenement:
+    """Événement numéroté (numérotation croissante commune à tous les sujets)"""
+
+    __slots__ = ('id', 'sujet', 'type', 'donnees')
+
+    def __init__(self, id, sujet, type, donnees):
+        self.id = id
+        self.sujet = sujet
+        self.type = type
+        self.donnees = donnees
+
+
+class Abonnement:
+    """File d'événements d'un client abonné à un ensemble de sujets"""
+
+    def __init__(self, sujets, boucle, taille=TAILLE_FILE):
+        self.sujets = frozenset(sujets)
+        self.boucle = boucle
+        self.file = asyncio.Queue(maxsize=taille)
+        self.perdus = 0
+
+    def deposer(self, evenement):
+        """Appelé dans la boucle de l'abonné"""
+        if self.file.full():
+            # Contre-pression : plutôt qu'une file sans fin, le client recharge son état
+            self.perdus += self.file.qsize()
+            while not self.file.empty():
+                self.file.get_nowait()
+            self.file.put_nowait(Evenement(evenement.id, evenement.sujet, 'resynchroniser', {}))
+            return
+        self.file.put_nowait(evenement)
+
+    async def suivant(self, delai=None):
+        """Prochain événement, ou None après `delai` secondes sans événement"""
+        try:
+            return await asyncio.wait_for(self.file.get(), delai)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    """Distribution des événements publiés aux abonnés de leur sujet"""
+
+    def __init__(self, taille_historique=TAILLE_HISTORIQUE):
+        self._verrou = threading.Lock()
+        # Microsecondes au démarrage : croissant d'un processus au suivant
+        self._premier_id = time.time_ns() // 1000
+        self._compteur = itertools.count(self._premier_id)
+        self._dernier_id = self._premier_id - 1
+        self._abonnements = {}
+        self._historiques = {}
+        self._taille_historique = taille_historique
+
+    def publier(self, sujet, type, donnees):
+        with self._verrou:
+            evenement = Evenement(next(self._compteur), sujet, type, donnees)
+            self._dernier_id = evenement.id
+            historique = self._historiques.setdefault(sujet, deque(maxlen=self._taille_historique))
+            historique.append(evenement)
+            abonnements = list(self._abonnements.get(sujet, ()))
+
+        for abonnement in abonnements:
+            try:
+                abonnement.boucle.call_soon_threadsafe(abonnement.deposer, evenement)
+            except RuntimeError:
+                # Boucle fermée : l'abonnement disparaîtra à la fin de sa requête
+                continue
+        return evenement
+
+    def abonner(self, sujets, dernier_id=None):
+        """
+        Abonnement aux sujets dans la boucle courante. Avec `dernier_id`, les
+        événements publiés depuis et encore dans l'historique sont remis en file
+        (ou `resynchroniser` s'ils n'y sont plus tous, ou si `dernier_id` ne
+        vient pas de ce processus).
+        """
+        abonnement = Abonnement(sujets, asyncio.get_running_loop())
+        with self._verrou:
+            for sujet in abonnement.sujets:
+                self._abonnements.setdefault(sujet, set()).add(abonnement)
+            if dernier_id is not None:
+                # Avant le démarrage ou au-delà du dernier événement : numéro d'un autre processus
+                manques = []
+                incomplet = not self._premier_id - 1 <= dernier_id <= self._dernier_id
+                for sujet in abonnement.sujets:
+                    historique = self._historiques.get(sujet)
+                    if historique is None:
+                        # Rien publié sur ce sujet depuis le démarrage
+                        continue
+                    if len(historique) == historique.maxlen and historique[0].id > dernier_id + 1:
+                        incomplet = True
+                    manques.extend(evenement for evenement in historique if evenement.id > dernier_id)
+                if incomplet:
+                    manques = [Evenement(dernier_id, None, 'resynchroniser', {})]
+                for evenement in sorted(manques, key=lambda evenement: evenement.id):
+                    abonnement.deposer(evenement)
+        return abonnement
+
+    def desabonner(self, abonnement):
+        with self._verrou:
+            for sujet in abonnement.sujets:
+                abonnes = self._abonnements.get(sujet)
+                if abonnes is not None:
+                    abonnes.discard(abonnement)
+                    if not abonnes:
+                        del self._abonnements[sujet]
+
+    def nombre_abonnes(self, sujet):
+        with self._verrou:
+            return len(self._abonnements.get(sujet, ()))
+
+
+broker = Broker()
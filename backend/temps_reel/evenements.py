@@ -0,0 +1,95 @@
+"""
+Sujets et contenu des événements poussés aux tableaux de bord et aux clients
+
+Les événements ne sont publiés qu'une fois la transaction validée : un
+abonné ne reçoit jamais une modification annulée ensuite.
+"""
+from django.db import transaction
+
+from .broker import broker
+
+SUJET_TOURNEES = 'tournees'
+SUJET_COLLECTES = 'collectes'
+SUJET_PAIEMENTS = 'paiements'
+SUJET_PROSPECTION = 'prospection'
+
+# Sujets réservés au staff et aux superviseurs
+SUJETS_SUPERVISION = {SUJET_TOURNEES, SUJET_COLLECTES, SUJET_PAIEMENTS, SUJET_PROSPECTION}
+
+
+def sujet_utilisateur(user_id):
+    """Sujet personnel d'un utilisateur (ses collectes et ses paiements)"""
+    return f'utilisateur:{user_id}'
+
+
+def publier_apres_commit(sujets, type, donnees):
+    def publier():
+        for sujet in sujets:
+            broker.publier(sujet, type, donnees)
+    transaction.on_commit(publier)
+
+
+def donnees_tournee(tournee):
+    return {
+        'id': tournee.id,
+        'date_tournee': tournee.date_tournee,
+        'zone_collecte': tournee.zone_collecte_id,
+        'status': tournee.status,
+        'nombre_clients_prevus': tournee.nombre_clients_prevus,
+        'nombre_clients_realises': tournee.nombre_clients_realises,
+        'distance_parcourue': tournee.distance_parcourue,
+    }
+
+
+def donnees_collecte(collecte):
+    return {
+        'id': collecte.id,
+        'tournee': collecte.tournee_id,
+        'client': collecte.client_id,
+        'status': collecte.status,
+        'heure_arrivee': collecte.heure_arrivee,
+        'heure_depart': collecte.heure_depart,
+    }
+
+
+def donnees_paiement(paiement):
+    return {
+        'id': paiement.id,
+        'numero_paiement': paiement.numero_paiement,
+        'facture': paiement.facture_id,
+        'client': paiement.client_id,
+        'montant': paiement.montant,
+        'mode_paiement': paiement.mode_paiement,
+        'status': paiement.status,
+    }
+
+
+def donnees_demande(demande):
+    return {
+        'id': demande.id,
+        'nom_complet': demande.nom_complet,
+        'ville': demande.ville,
+        'zone_collecte': demande.zone_collecte_id,
+        'latitude': demande.latitude,
+        'longitude': demande.longitude,
+        'type_service': demande.type_service,
+        'status': demande.status,
+        'agent_assigne': demande.agent_assigne_id,
+    }
+
+
+def publier_collectes(collectes, clients_users):
+    """
+    Collectes modifiées (et sujets personnels des clients pour les passages
+    terminés) ; `clients_users` associe l'id des clients à celui de leur utilisateur.
+    """
+    for collecte in collectes:
+        sujets = [SUJET_COLLECTES]
+        if collecte.status in ('completee', 'ratee') and collecte.client_id in clients_users:
+            sujets.append(sujet_utilisateur(clients_users[collecte.client_id]))
+        publier_apres_commit(sujets, 'collecte', donnees_collecte(collecte))
+
+
+def publier_tournees(tournees):
+    for tournee in tournees:
+        publier_apres_commit([SUJET_TOURNEES], 'tournee', donnees_tournee(tournee))
@@ -0,0 +1,49 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from clients.models import Client, DemandeProspection
+from collectes.models import Tournee, Collecte
+from paiements.models import Paiement
+from .evenements import (
+    SUJET_PAIEMENTS, SUJET_PROSPECTION, donnees_demande, donnees_paiement,
+    publier_apres_commit, publier_collectes, publier_tournees, sujet_utilisateur
+)
+
+# Les écritures en masse (bulk_update, update) ne passent pas par ces signaux :
+# elles publient elles-mêmes avec publier_collectes / publier_tournees.
+
+
+@receiver(post_save, sender=Tournee)
+def pousser_tournee(sender, instance, **kwargs):
+    """Avancement d'une tournée"""
+    publier_tournees([instance])
+
+
+@receiver(post_save, sender=Collecte)
+def pousser_collecte(sender, instance, **kwargs):
+    """Passage chez un client, poussé aussi au client une fois terminé"""
+    clients_users = {}
+    if instance.status in ('completee', 'ratee'):
+        clients_users = dict(Client.objects.filter(id=instance.client_id).values_list('id', 'user_id'))
+    publier_collectes([instance], clients_users)
+
+
+@receiver(post_save, sender=Paiement)
+def pousser_paiement(sender, instance, created, **kwargs):
+    """Nouveau paiement ou changement de statut (validation, refus)"""
+    user_id = Client.objects.filter(id=instance.client_id).values_list('user_id', flat=True).first()
+    publier_apres_commit(
+        [SUJET_PAIEMENTS, sujet_utilisateur(user_id)],
+        'paiement_nouveau' if created else 'paiement',
+        donnees_paiement(instance)
+    )
+
+
+@receiver(post_save, sender=DemandeProspection)
+def pousser_demande(sender, instance, created, **kwargs):
+    """Nouvelle demande de prospection ou suivi d'une demande"""
+    publier_apres_commit(
+        [SUJET_PROSPECTION],
+        'demande_nouvelle' if created else 'demande',
+        donnees_demande(instance)
+    )
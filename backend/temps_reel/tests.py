@@ -0,0 +1,78 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from .broker import Broker, TAILLE_FILE
+
+
+class BrokerTest(SimpleTestCase):
+    """Distribution, contre-pression et reprise après reconnexion"""
+
+    async def _lire(self, abonnement):
+        # Laisse la boucle exécuter les dépôts programmés par publier()
+        await asyncio.sleep(0)
+        evenements = []
+        while not abonnement.file.empty():
+            evenements.append(abonnement.file.get_nowait())
+        return evenements
+
+    async def test_distribution_par_sujet(self):
+        broker = Broker()
+        abonnement = broker.abonner({'tournees'})
+        broker.publier('tournees', 'tournee', {'id': 1})
+        broker.publier('paiements', 'paiement', {'id': 2})
+        self.assertEqual([evenement.donnees for evenement in await self._lire(abonnement)], [{'id': 1}])
+        broker.desabonner(abonnement)
+        self.assertEqual(broker.nombre_abonnes('tournees'), 0)
+
+    async def test_file_pleine(self):
+        broker = Broker()
+        lent = broker.abonner({'tournees'})
+        for n in range(TAILLE_FILE + 5):
+            broker.publier('tournees', 'tournee', {'id': n})
+        evenements = await self._lire(lent)
+        self.assertEqual(evenements[0].type, 'resynchroniser')
+        # Les événements suivant la vidange sont remis normalement
+        self.assertEqual([evenement.donnees['id'] for evenement in evenements[1:]], [101, 102, 103, 104])
+        self.assertEqual(lent.perdus, TAILLE_FILE)
+
+    async def test_reprise(self):
+        broker = Broker()
+        premier = broker.publier('tournees', 'tournee', {'id': 1})
+        broker.publier('tournees', 'tournee', {'id': 2})
+        broker.publier('paiements', 'paiement', {'id': 3})
+        abonnement = broker.abonner({'tournees', 'paiements', 'utilisateur:1'}, premier.id)
+        self.assertEqual([evenement.donnees['id'] for evenement in await self._lire(abonnement)], [2, 3])
+
+    async def test_reprise_a_jour(self):
+        broker = Broker()
+        dernier = broker.publier('tournees', 'tournee', {'id': 1})
+        abonnement = broker.abonner({'tournees', 'utilisateur:1'}, dernier.id)
+        self.assertEqual(await self._lire(abonnement), [])
+
+    async def test_reprise_hors_historique(self):
+        broker = Broker(taille_historique=2)
+        premier = broker.publier('tournees', 'tournee', {'id': 1})
+        for n in range(2, 5):
+            broker.publier('tournees', 'tournee', {'id': n})
+        abonnement = broker.abonner({'tournees'}, premier.id)
+        self.assertEqual([evenement.type for evenement in await self._lire(abonnement)], ['resynchroniser'])
+
+    async def test_reprise_apres_redemarrage(self):
+        ancien = Broker()
+        avant = ancien.publier('tournees', 'tournee', {'id': 1})
+        nouveau = Broker()
+        # Identifiant du processus précédent, sujet sans historique dans le nouveau
+        abonnement = nouveau.abonner({'tournees'}, avant.id)
+        self.assertEqual([evenement.type for evenement in await self._lire(abonnement)], ['resynchroniser'])
+        # Identifiant au-delà du dernier événement publié
+        dernier = nouveau.publier('tournees', 'tournee', {'id': 2})
+        abonnement = nouveau.abonner({'tournees'}, dernier.id + 1000)
+        self.assertEqual([evenement.type for evenement in await self._lire(abonnement)], ['resynchroniser'])
+
+
+class FluxWsgiTest(SimpleTestCase):
+
+    def test_flux_refuse_sous_wsgi(self):
+        reponse = self.client.get('/api/temps-reel/flux/')
+        self.assertEqual(reponse.status_code, 501)
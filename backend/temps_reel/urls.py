@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import flux_evenements
+
+urlpatterns = [
+    path('flux/', flux_evenements, name='flux_evenements'),
+]
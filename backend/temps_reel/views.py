@@ -0,0 +1,93 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .broker import broker
+from .evenements import SUJETS_SUPERVISION, sujet_utilisateur
+
+INTERVALLE_PING = 15
+DELAI_RECONNEXION_MS = 3000
+
+
+async def authentifier(request):
+    """Utilisateur de la session Django, sinon du jeton JWT (en-tête ou `?token=`)"""
+    user = await request.auser()
+    if user.is_authenticated:
+        return user
+
+    authentification = JWTAuthentication()
+    jeton = request.GET.get('token')
+    if not jeton:
+        entete = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if len(entete) == 2 and entete[0] == 'Bearer':
+            jeton = entete[1]
+    if not jeton:
+        return None
+    try:
+        jeton_valide = authentification.get_validated_token(jeton)
+        return await sync_to_async(authentification.get_user)(jeton_valide)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def format_sse(evenement):
+    donnees = json.dumps(evenement.donnees, cls=DjangoJSONEncoder)
+    return f'id: {evenement.id}\nevent: {evenement.type}\ndata: {donnees}\n\n'
+
+
+async def flux_evenements(request):
+    """
+    Flux Server-Sent Events des sujets demandés (`?sujets=tournees,paiements`,
+    réservés au staff et aux superviseurs) et du sujet personnel de l'utilisateur.
+    Nécessite un serveur ASGI (ete_project.asgi:application) : sous WSGI la
+    réponse serait lue jusqu'au bout avant envoi et ne se terminerait jamais.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'error': 'Flux disponible uniquement via le serveur ASGI (ete_project.asgi:application)'},
+            status=501
+        )
+
+    user = await authentifier(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentification requise'}, status=401)
+
+    demandes = {sujet.strip() for sujet in request.GET.get('sujets', '').split(',') if sujet.strip()}
+    inconnus = demandes - SUJETS_SUPERVISION
+    if inconnus:
+        return JsonResponse({'error': f"Sujets inconnus : {', '.join(sorted(inconnus))}"}, status=400)
+    if demandes and not (user.is_staff or user.user_type == 'agent_supervision'):
+        return JsonResponse({'error': 'Permission refusée'}, status=403)
+
+    try:
+        dernier_id = request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get('dernier_id')
+        dernier_id = int(dernier_id) if dernier_id else None
+    except ValueError:
+        return JsonResponse({'error': 'Last-Event-ID invalide'}, status=400)
+
+    sujets = demandes | {sujet_utilisateur(user.pk)}
+
+    async def evenements():
+        abonnement = broker.abonner(sujets, dernier_id)
+        try:
+            yield f'retry: {DELAI_RECONNEXION_MS}\n\n'
+            while True:
+                evenement = await abonnement.suivant(INTERVALLE_PING)
+                if evenement is None:
+                    # Commentaire SSE : garde la connexion ouverte à travers les proxys
+                    yield ': ping\n\n'
+                    continue
+                yield format_sse(evenement)
+        finally:
+            broker.desabonner(abonnement)
+
+    response = StreamingHttpResponse(evenements(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response